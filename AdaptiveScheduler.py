@@ -0,0 +1,232 @@
+import datetime
+import logging
+import threading
+
+from apscheduler.jobstores.base import JobLookupError
+
+from VehicleClient import ChargeType
+
+
+class PollingPolicy:
+    """
+    Decides when the vehicle should be polled next, from its last known state.
+    Role:
+    - poll often when the data changes fast (driving, DC charging close to a taper point, charge about to end)
+    - back off when parked, and sleep outside the active hours unless the car is charging
+    - never poll faster than the remaining API budget allows
+    """
+
+    def __init__(self, vehicle_client, start_hour: int, end_hour: int, parked_interval: int,
+                 min_interval: int = 300, timezone=None):
+        """
+        :param vehicle_client: VehicleClient holding the vehicle state and the request budget
+        :param start_hour: start of the active hours
+        :param end_hour: end of the active hours
+        :param parked_interval: seconds between cached polls while the car is parked during the active hours
+        :param min_interval: never poll more often than this
+        :param timezone: timezone of the active hours (the scheduler's), local time if None
+        """
+        self.vehicle_client = vehicle_client
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.parked_interval = parked_interval
+        self.min_interval = min_interval
+        self.timezone = timezone
+        self.last_delay = None
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now(self.timezone)
+
+    def is_active(self, now: datetime.datetime = None) -> bool:
+        now = now or self.now()
+        return self.start_hour <= now.hour < self.end_hour
+
+    def seconds_until_active(self, now: datetime.datetime = None) -> int:
+        now = now or self.now()
+        if self.is_active(now):
+            return 0
+        start = now.replace(hour=self.start_hour, minute=0, second=0, microsecond=0)
+        if start <= now:
+            start += datetime.timedelta(days=1)
+        return int((start - now).total_seconds())
+
+    def seconds_until_inactive(self, now: datetime.datetime = None) -> int:
+        now = now or self.now()
+        if not self.is_active(now):
+            return 0
+        end = now.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(hours=self.end_hour)
+        return int((end - now).total_seconds())
+
+    def force_refresh_interval(self) -> int:
+        """
+        Age of the cached data after which the car should be woken up for a forced refresh.
+        While driving or charging every poll is a forced one, parked cars are only woken up every few hours.
+        """
+        client = self.vehicle_client
+        interval = client.interval_in_seconds
+        vehicle = client.vehicle
+        if vehicle and (vehicle.ev_battery_is_charging or vehicle.engine_is_running) and self.last_delay:
+            interval = min(interval, self.last_delay)
+        return interval
+
+    def next_delay(self, calls_per_cycle: int = 1, aux_battery_ok: bool = True, now: datetime.datetime = None):
+        """
+        :param calls_per_cycle: API calls the last poll needed
+        :param aux_battery_ok: False if the 12V battery is too low to wake the car up
+        :return: (seconds until the next poll, reason)
+        """
+        delay, reason = self._next_delay(calls_per_cycle, aux_battery_ok, now or self.now())
+        self.last_delay = delay
+        return delay, reason
+
+    def _next_delay(self, calls_per_cycle: int, aux_battery_ok: bool, now: datetime.datetime):
+        client = self.vehicle_client
+        vehicle = client.vehicle
+        charging = bool(vehicle and vehicle.ev_battery_is_charging)
+        engine_running = bool(vehicle and vehicle.engine_is_running)
+
+        if not charging and not self.is_active(now):
+            return self.seconds_until_active(now), "outside active hours"
+
+        if vehicle is None:
+            delay, reason = self.parked_interval, "no vehicle state yet"
+        elif engine_running and not charging:
+            delay, reason = client.ENGINE_RUNNING_FORCE_REFRESH_INTERVAL, "engine running"
+        elif charging:
+            delay, reason = self._charging_delay(vehicle)
+        else:
+            delay, reason = self.parked_interval, "parked"
+            until_inactive = self.seconds_until_inactive(now)
+            if 0 < until_inactive < delay:
+                # the next poll would fall outside the active hours anyway, wait for the next ones
+                end = now + datetime.timedelta(seconds=until_inactive)
+                return until_inactive + self.seconds_until_active(end), "parked, active hours are over"
+
+        if not aux_battery_ok:
+            delay = max(delay, client.CAR_OFF_FORCE_REFRESH_INTERVAL)
+            reason += ", 12V battery low"
+
+        budget = client.request_budget
+        if budget is not None:
+            # the remaining budget has to last until the end of the active hours (or the day, when charging at night)
+            spread_over = self.seconds_until_inactive(now) or int(
+                (now.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1) - now)
+                .total_seconds())
+            budget_delay = budget.suggested_interval(calls_per_cycle, spread_over=spread_over)
+            if budget_delay > delay:
+                delay = budget_delay
+                reason += ", limited by the request budget"
+
+        return max(self.min_interval, int(delay)), reason
+
+    def _charging_delay(self, vehicle):
+        client = self.vehicle_client
+        soc = vehicle.ev_battery_percentage
+
+        if client.charge_type == ChargeType.DC:
+            delay, reason = client.DC_CHARGE_FORCE_REFRESH_INTERVAL, "DC charging"
+            if soc is not None:
+                steps = list(client.DC_CHARGE_TAPER_SOC_STEPS)
+                if vehicle.ev_charge_limits_dc:
+                    steps.append(vehicle.ev_charge_limits_dc)
+                upcoming = [step for step in steps if step > soc]
+                if upcoming and min(upcoming) - soc <= client.DC_CHARGE_TAPER_SOC_MARGIN:
+                    delay = client.DC_CHARGE_TAPER_REFRESH_INTERVAL
+                    reason = f"DC charging, close to {min(upcoming)}%"
+        else:
+            delay, reason = client.AC_CHARGE_FORCE_REFRESH_INTERVAL, "AC charging"
+
+        # catch the end of the charge session
+        minutes_left = vehicle.ev_estimated_current_charge_duration
+        if minutes_left and minutes_left * 60 + 120 < delay:
+            delay = minutes_left * 60 + 120
+            reason += ", charge ends soon"
+        return delay, reason
+
+
+class AdaptiveScheduler:
+    """
+    Runs a job at a varying interval on an APScheduler scheduler.
+    Instead of a fixed interval trigger, each run schedules the next one as a one-off ('date') job,
+    at the delay returned by the job itself.
+    """
+
+    def __init__(self, scheduler, job, job_id: str = "adaptive_refresh", error_delay: int = 900):
+        """
+        :param scheduler: a started or not yet started APScheduler scheduler
+        :param job: callable returning (seconds until the next run, reason)
+        :param job_id: prefix of the APScheduler job ids
+        :param error_delay: seconds until the next run if the job raised
+        """
+        self.scheduler = scheduler
+        self.job = job
+        self.job_id = job_id
+        self.error_delay = error_delay
+        self.next_run_at = None
+        self.next_run_reason = None
+        self._pending_job = None
+        self._runs = 0
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self, delay: int = 0):
+        self._schedule(delay, "startup")
+
+    def run_soon(self, delay: int = 0, reason: str = "requested"):
+        """Run the job earlier than planned, e.g. after a user action changed the vehicle state"""
+        if self.next_run_at is not None and self.next_run_at <= datetime.datetime.now(self.scheduler.timezone) + \
+                datetime.timedelta(seconds=delay):
+            return
+        self._schedule(delay, reason)
+
+    def _schedule(self, delay: int, reason: str):
+        with self._lock:
+            # every run gets its own job id: APScheduler removes a 'date' job after it fired,
+            # which must not remove the run scheduled from inside that job
+            self._cancel_pending()
+            self._runs += 1
+            self.next_run_at = datetime.datetime.now(self.scheduler.timezone) + datetime.timedelta(seconds=delay)
+            self.next_run_reason = reason
+            run_id = f"{self.job_id}-{self._runs}"
+            self._pending_job = self.scheduler.add_job(self._run, 'date', run_date=self.next_run_at, args=[run_id],
+                                                       id=run_id, misfire_grace_time=300)
+
+    def _cancel_pending(self):
+        if self._pending_job is None:
+            return
+        try:
+            self._pending_job.remove()
+        except JobLookupError:
+            pass  # already fired
+        self._pending_job = None
+
+    def _run(self, run_id: str):
+        with self._lock:
+            # this job fired: the scheduler removes it by itself
+            if self._pending_job is not None and self._pending_job.id == run_id:
+                self._pending_job = None
+        if not self._running.acquire(blocking=False):
+            self.logger.info(f"{self.job_id} is already running, the running one will schedule the next run")
+            return
+        try:
+            try:
+                delay, reason = self.job()
+            except Exception as e:
+                self.logger.error(f"Adaptive job {self.job_id} failed, next run in {self.error_delay}s: {str(e)}")
+                delay, reason = self.error_delay, "previous run failed"
+            self.logger.info(f"Next {self.job_id} in {int(delay)}s ({reason})")
+            self._schedule(delay, reason)
+        finally:
+            self._running.release()
+
+    def stop(self):
+        with self._lock:
+            self._cancel_pending()
+
+    def status(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "reason": self.next_run_reason,
+        }
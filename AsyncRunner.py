@@ -0,0 +1,74 @@
+import asyncio
+import logging
+
+from TokenStore import is_token_valid
+
+
+class AsyncRunner:
+    """
+    Drives the vehicles of many accounts from one event loop, with an AsyncKiaUvoApiEU.
+    Role:
+    - logs each account in once, refreshes its token when it is about to expire, and lists its vehicles
+    - runs an operation on every vehicle of every account, at most max_concurrency API operations at a time
+    - a failed login or vehicle does not stop the others, it is reported in the results
+    The API's connection pool bounds the requests in flight, max_concurrency bounds the work started.
+    """
+
+    TOKEN_REFRESH_MARGIN = 600
+
+    def __init__(self, api, max_concurrency: int = 8):
+        """
+        :param api: AsyncKiaUvoApiEU shared by all accounts (one connection pool)
+        :param max_concurrency: logins and vehicle operations running at the same time
+        """
+        self.api = api
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._accounts = {}
+        self.logger = logging.getLogger(__name__)
+
+    def add_account(self, username: str, password: str, pin: str = None) -> None:
+        self._accounts[username] = {"password": password, "pin": pin, "token": None, "vehicles": None}
+
+    async def _login(self, username: str) -> dict:
+        account = self._accounts[username]
+        async with self._semaphore:
+            if account["token"] is None:
+                account["token"] = await self.api.login(username, account["password"], account["pin"])
+            elif not is_token_valid(account["token"], self.TOKEN_REFRESH_MARGIN):
+                account["token"] = await self.api.refresh_access_token(account["token"])
+            if account["vehicles"] is None:
+                account["vehicles"] = await self.api.get_vehicles(account["token"])
+        return account
+
+    async def _run_vehicle(self, username: str, token, vehicle, operation) -> dict:
+        result = {"username": username, "vehicle_id": vehicle.id, "vehicle": vehicle, "result": None, "error": None}
+        async with self._semaphore:
+            try:
+                result["result"] = await operation(self.api, token, vehicle)
+            except Exception as e:
+                self.logger.exception(f"Operation failed for vehicle {vehicle.id} of {username}:", exc_info=e)
+                result["error"] = e
+        return result
+
+    async def _run_account(self, username: str, operation) -> list:
+        try:
+            account = await self._login(username)
+        except Exception as e:
+            self.logger.exception(f"Login failed for {username}:", exc_info=e)
+            return [{"username": username, "vehicle_id": None, "vehicle": None, "result": None, "error": e}]
+        return await asyncio.gather(*(self._run_vehicle(username, account["token"], vehicle, operation)
+                                      for vehicle in account["vehicles"]))
+
+    async def run(self, operation=None) -> list:
+        """
+        :param operation: coroutine function (api, token, vehicle) run on every vehicle,
+                          defaults to api.update_vehicle_with_cached_state
+        :return: one {"username", "vehicle_id", "vehicle", "result", "error"} per vehicle, in the order the accounts
+                 were added, and one with vehicle_id None per account that could not log in
+        """
+        if operation is None:
+            async def operation(api, token, vehicle):
+                return await api.update_vehicle_with_cached_state(token, vehicle)
+        per_account = await asyncio.gather(*(self._run_account(username, operation) for username in self._accounts))
+        return [result for results in per_account for result in results]
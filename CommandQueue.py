@@ -0,0 +1,226 @@
+import contextvars
+import heapq
+import logging
+import threading
+import time
+import uuid
+
+from hyundai_kia_connect_api.const import ORDER_STATUS
+
+QUEUED = "queued"
+SENDING = "sending"
+PENDING = "pending"
+SUCCESS = "success"
+FAILED = "failed"
+TIMEOUT = "timeout"
+ERROR = "error"
+FINAL_STATUSES = (SUCCESS, FAILED, TIMEOUT, ERROR)
+
+_ORDER_STATUSES = {
+    ORDER_STATUS.SUCCESS: SUCCESS,
+    ORDER_STATUS.FAILED: FAILED,
+    ORDER_STATUS.TIMEOUT: TIMEOUT,
+}
+
+
+class CommandQueue:
+    """
+    Sends remote commands (start/stop charge) to the car from a background thread, and follows each of them
+    until the car confirmed, refused or did not answer.
+    Role:
+    - the HTTP request only queues the command and gets its id back at once
+    - the action id (msgId) returned by the API is polled with a growing delay until its status is final,
+      the command itself is never sent twice
+    - a command identical to one still in progress is not queued again, its id is returned instead
+    - every change is written to the commands table, and waiters (long-poll) and listeners are notified
+    """
+
+    def __init__(self, vehicle_client, poll_delay: int = 5, max_poll_delay: int = 30, timeout: int = 180):
+        """
+        :param vehicle_client: VehicleClient used to send the commands
+        :param poll_delay: seconds before the first status check
+        :param max_poll_delay: the delay doubles after each pending answer, up to this
+        :param timeout: seconds after which a command still pending is given up (status 'timeout')
+        """
+        self.vehicle_client = vehicle_client
+        self.db_client = vehicle_client.db_client
+        self.poll_delay = poll_delay
+        self.max_poll_delay = max_poll_delay
+        self.timeout = timeout
+        self.commands = {}
+        self._contexts = {}
+        self._delays = {}
+        self._due = []  # heap of (time.monotonic() when due, command id)
+        self._listeners = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Start the worker thread, and resume following the commands an earlier run left unfinished"""
+        for command in self.db_client.get_unfinished_commands():
+            if command["status"] == PENDING and command["action_id"]:
+                self.logger.info(f"Resuming status checks of command {command['id']} ({command['command']})")
+                self._track(command, contextvars.copy_context(), self.poll_delay)
+            else:
+                # it may or may not have reached the car: never send it again
+                command.update(status=ERROR, error="Interrupted by a restart before it was sent",
+                               finished_at=int(time.time()))
+                self.db_client.save_command(command)
+        self._thread = threading.Thread(target=self._work, name="command-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+    def add_listener(self, listener):
+        """listener(command dict) is called on every status change, from the worker thread"""
+        self._listeners.append(listener)
+
+    def submit(self, command: str) -> dict:
+        """
+        Queue a command, sent in the context (e.g. request budget priority) of the caller.
+        :param command: "charge_start" or "charge_stop"
+        :return: the command, or the identical one still in progress
+        """
+        if command not in ("charge_start", "charge_stop"):
+            raise ValueError(f"Unknown command: {command}")
+        with self._condition:
+            for existing in self.commands.values():
+                if existing["command"] == command and existing["status"] not in FINAL_STATUSES:
+                    return dict(existing)
+            entry = {
+                "id": uuid.uuid4().hex,
+                "command": command,
+                "action_id": None,
+                "status": QUEUED,
+                "error": None,
+                "status_checks": 0,
+                "created_at": int(time.time()),
+                "sent_at": None,
+                "finished_at": None,
+            }
+            self._track(entry, contextvars.copy_context(), 0)
+        self._changed(entry)
+        return dict(entry)
+
+    def _track(self, command: dict, context, delay: int):
+        with self._condition:
+            self.commands[command["id"]] = command
+            self._contexts[command["id"]] = context
+            self._delays[command["id"]] = delay or self.poll_delay
+            heapq.heappush(self._due, (time.monotonic() + delay, command["id"]))
+            self._condition.notify_all()
+
+    def get(self, command_id: str):
+        with self._condition:
+            command = self.commands.get(command_id)
+            if command is not None:
+                return dict(command)
+        return self.db_client.get_command(command_id)
+
+    def wait(self, command_id: str, timeout: float):
+        """Long-poll: wait until the command is final or the timeout passed, and return it"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            command = self.commands.get(command_id)
+            if command is not None:
+                self._condition.wait_for(
+                    lambda: command["status"] in FINAL_STATUSES or time.monotonic() >= deadline,
+                    timeout=timeout)
+                return dict(command)
+        return self.db_client.get_command(command_id)
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._stopping and (not self._due or self._due[0][0] > time.monotonic()):
+                    self._condition.wait(timeout=self._due[0][0] - time.monotonic() if self._due else None)
+                if self._stopping:
+                    return
+                _, command_id = heapq.heappop(self._due)
+                command = self.commands.get(command_id)
+                context = self._contexts.get(command_id)
+            if command is None:
+                continue
+            try:
+                context.run(self._step, command)
+            except Exception as e:
+                self.logger.exception(f"Command {command_id} failed:", exc_info=e)
+                self._finish(command, ERROR, str(e))
+
+    def _step(self, command: dict):
+        if command["status"] == QUEUED:
+            self._send(command)
+        elif command["status"] == PENDING:
+            self._check(command)
+
+    def _send(self, command: dict):
+        client = self.vehicle_client
+        self._update(command, status=SENDING)
+        try:
+            with client.locked():
+                if command["command"] == "charge_start":
+                    action_id = client.vm.start_charge(client.vehicle.id)
+                else:
+                    action_id = client.vm.stop_charge(client.vehicle.id)
+        except Exception as e:
+            client.handle_api_exception(e)
+            self._finish(command, ERROR, str(e))
+            return
+        self._update(command, status=PENDING, action_id=action_id, sent_at=int(time.time()))
+        self._schedule_check(command)
+
+    def _check(self, command: dict):
+        client = self.vehicle_client
+        try:
+            status = client.vm.check_action_status(client.vehicle.id, command["action_id"], synchronous=False)
+        except Exception as e:
+            # the command was sent: keep checking rather than failing it on a transient error
+            client.handle_api_exception(e)
+            self.logger.warning(f"Status check of command {command['id']} failed: {str(e)}")
+            status = ORDER_STATUS.PENDING
+        command["status_checks"] += 1
+
+        if status in _ORDER_STATUSES:
+            self._finish(command, _ORDER_STATUSES[status])
+        elif time.time() - command["sent_at"] >= self.timeout:
+            self._finish(command, TIMEOUT, f"Still pending after {self.timeout}s")
+        else:
+            self._update(command)
+            self._schedule_check(command)
+
+    def _schedule_check(self, command: dict):
+        with self._condition:
+            delay = self._delays[command["id"]]
+            self._delays[command["id"]] = min(delay * 2, self.max_poll_delay)
+            heapq.heappush(self._due, (time.monotonic() + delay, command["id"]))
+            self._condition.notify_all()
+
+    def _finish(self, command: dict, status: str, error: str = None):
+        self._update(command, status=status, error=error, finished_at=int(time.time()))
+        with self._condition:
+            self._contexts.pop(command["id"], None)
+            self._delays.pop(command["id"], None)
+            # finished commands are served from the database
+            self.commands.pop(command["id"], None)
+
+    def _update(self, command: dict, **changes):
+        with self._condition:
+            command.update(changes)
+            self._condition.notify_all()
+        self._changed(command)
+
+    def _changed(self, command: dict):
+        try:
+            self.db_client.save_command(command)
+        except Exception as e:
+            self.logger.error(f"Could not save command {command['id']}: {str(e)}")
+        for listener in self._listeners:
+            try:
+                listener(dict(command))
+            except Exception as e:
+                self.logger.error(f"Command listener failed: {str(e)}")
@@ -0,0 +1,185 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection could be checked out before the timeout expired"""
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of database connections.
+    Role:
+    - keep connections open between calls instead of doing a TCP+auth handshake every time
+    - hand out one connection per thread (nested checkouts on the same thread reuse it)
+    - health check idle connections and reconnect stale ones
+    - keep counters so the handshake savings can be observed
+    """
+
+    def __init__(self, connect, max_size: int = 5, timeout: float = 10, ping_interval: float = 60,
+                 max_lifetime: float = 3600):
+        """
+        :param connect: callable returning a new DB-API connection
+        :param max_size: maximum number of open connections
+        :param timeout: seconds to wait for a free connection before giving up
+        :param ping_interval: connections idle for longer than this are pinged before being handed out
+        :param max_lifetime: connections older than this are closed and reopened
+        """
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.max_lifetime = max_lifetime
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "reused": 0,
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "reconnects": 0,
+            "waits": 0,
+            "wait_time_total_ms": 0.0,
+            "wait_time_max_ms": 0.0,
+            "timeouts": 0,
+        }
+        self._in_use = 0
+
+    def _bump(self, key, value=1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+    def _open(self):
+        conn = self._connect()
+        self._bump("connections_opened")
+        return [conn, time.monotonic(), time.monotonic()]  # connection, created at, last used at
+
+    def _close(self, entry):
+        try:
+            entry[0].close()
+        except Exception:
+            pass
+        self._bump("connections_closed")
+
+    def _is_healthy(self, entry) -> bool:
+        conn, created_at, last_used_at = entry
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+        if now - last_used_at > self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def _acquire(self):
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            self._bump("waits")
+            if not self._slots.acquire(timeout=self.timeout):
+                self._bump("timeouts")
+                raise PoolExhaustedError(
+                    f"No database connection available after {self.timeout}s (pool size: {self.max_size})")
+            waited_ms = (time.monotonic() - started) * 1000
+            with self._stats_lock:
+                self._stats["wait_time_total_ms"] += waited_ms
+                self._stats["wait_time_max_ms"] = max(self._stats["wait_time_max_ms"], waited_ms)
+
+        try:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                entry = self._open()
+            else:
+                if self._is_healthy(entry):
+                    self._bump("reused")
+                else:
+                    logging.info("Discarding stale database connection and reconnecting")
+                    self._close(entry)
+                    entry = self._open()
+                    self._bump("reconnects")
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._in_use += 1
+        return entry
+
+    def _release(self, entry, broken: bool):
+        with self._stats_lock:
+            self._in_use -= 1
+        if broken:
+            self._close(entry)
+        else:
+            entry[2] = time.monotonic()
+            self._idle.put(entry)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the current thread.
+        Nested calls on the same thread get the same connection back; it is returned to the pool
+        when the outermost block exits. If the block raises a connection-level error, the connection
+        is discarded instead of being returned.
+        """
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held[0]
+            finally:
+                self._local.depth -= 1
+            return
+
+        entry = self._acquire()
+        self._local.held = entry
+        self._local.depth = 1
+        broken = False
+        try:
+            yield entry[0]
+        except Exception as e:
+            broken = self._is_connection_error(e)
+            raise
+        finally:
+            self._local.held = None
+            self._local.depth = 0
+            self._release(entry, broken)
+
+    @staticmethod
+    def _is_connection_error(exc: Exception) -> bool:
+        # pymysql raises OperationalError/InterfaceError when the server went away
+        return type(exc).__name__ in ("OperationalError", "InterfaceError") or isinstance(exc, OSError)
+
+    def close_all(self):
+        """Close every idle connection. Connections currently checked out are closed when returned."""
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(entry)
+
+    def stats(self) -> dict:
+        """Return a snapshot of the pool counters"""
+        with self._stats_lock:
+            result = dict(self._stats)
+            result["in_use"] = self._in_use
+        result["idle"] = self._idle.qsize()
+        result["max_size"] = self.max_size
+        result["wait_time_avg_ms"] = round(result["wait_time_total_ms"] / result["waits"], 2) if result["waits"] else 0.0
+        result["wait_time_total_ms"] = round(result["wait_time_total_ms"], 2)
+        result["wait_time_max_ms"] = round(result["wait_time_max_ms"], 2)
+        # every checkout that did not open a fresh connection is a handshake we avoided
+        result["handshakes_saved"] = result["checkouts"] - result["connections_opened"]
+        return result
@@ -1,149 +1,42 @@
+import atexit
 import datetime
 import logging
 import os
-import pymysql.cursors
+import threading
 
+import RawPayload
+import Storage
+from Spool import Spool, DEFAULT_PATH as DEFAULT_SPOOL_PATH
 import VehicleClient
-from hyundai_kia_connect_api.Vehicle import TripInfo
+import Tracing
+from Metrics import DB_QUERY_DURATION, DB_ROWS_WRITTEN, timed
 
-class DatabaseClient:
-    def __init__(self, vehicle_client: VehicleClient):
-        # Retrieve MySQL/MariaDB connection parameters from environment variables
-        self.db_host = os.environ.get("UVO_DB_HOST")
-        self.db_port = int(os.environ.get("UVO_DB_PORT", 3306))
-        self.db_user = os.environ.get("UVO_DB_USER")
-        self.db_password = os.environ.get("UVO_DB_PASSWORD")
-        self.db_database = os.environ.get("UVO_DB_NAME")
-
-        if not (self.db_host and self.db_user and self.db_database):
-            raise NameError("Required database environment variables (UVO_DB_HOST, UVO_DB_USER, UVO_DB_DATABASE) are not set")
-
-        # Check if the schema is initialized (e.g., if the 'log' table exists)
-        try:
-            conn = self.create_connection()
-            cur = conn.cursor()
-            cur.execute("SHOW TABLES LIKE 'log'")
-            if cur.fetchone() is None:
-                logging.info("Database schema not found. Initializing schema.")
-                with open("db_schema.sql", "r", encoding="utf-8") as f:
-                    schema_script = f.read()
-                # Split the schema script by semicolons and execute each non-empty statement,
-                # skipping any transaction control statements.
-                for statement in schema_script.split(';'):
-                    statement = statement.strip()
-                    if statement and not (statement.upper().startswith("START TRANSACTION") or statement.upper().startswith("COMMIT")):
-                        cur.execute(statement)
-                conn.commit()
-                logging.info("Database schema created successfully.")
-        except Exception as e:
-            logging.exception("Failed to initialize database: " + str(e))
-            raise
-        finally:
-            conn.close()
+_ROWS_WRITTEN = {table: DB_ROWS_WRITTEN.labels(table) for table in (
+    "log", "raw_api_payloads", "stats_per_day", "errors", "trips", "trip_sync_days", "trip_sync_months", "commands")}
 
-        self.vehicle_client = vehicle_client
 
-    def create_connection(self):
-        """Create and return a new connection to the MySQL/MariaDB database."""
-        try:
-            conn = pymysql.connect(
-                host=self.db_host,
-                port=self.db_port,
-                user=self.db_user,
-                password=self.db_password,
-                db=self.db_database,
-                charset='utf8mb4',
-                autocommit=True
-            )
-            return conn
-        except pymysql.MySQLError as e:
-            logging.exception("Error connecting to MySQL/MariaDB: " + str(e))
-            raise
+def statement(name: str):
+    """Decorator timing a database operation (uvo_db_query_duration_seconds) and tracing it as db.<name>"""
+    def decorator(function):
+        return timed(DB_QUERY_DURATION, name)(Tracing.traced("db." + name)(function))
+    return decorator
 
-    def get_last_update_timestamp(self) -> datetime.datetime:
-        """Return the most recent update timestamp from the 'log' table."""
-        conn = self.create_connection()
-        cur = conn.cursor()
-        sql = 'SELECT MAX(unix_last_vehicle_update_timestamp) FROM log;'
-        cur.execute(sql)
-        row = cur.fetchone()
-        conn.close()
-        return datetime.datetime.fromtimestamp(row[0]) if row[0] is not None else None
 
-    def get_last_update_odometer(self) -> float:
-        """Return the maximum odometer reading from the 'log' table."""
-        conn = self.create_connection()
-        cur = conn.cursor()
-        sql = 'SELECT MAX(odometer) FROM log;'
-        cur.execute(sql)
-        row = cur.fetchone()
-        conn.close()
-        return row[0]
+def _rows_written(table: str, count: int = 1):
+    _ROWS_WRITTEN[table].inc(count)
+    Tracing.set_attribute("db.rows_written." + table, count)
 
-    def get_most_recent_saved_trip_timestamp(self):
-        """Return the most recent trip timestamp from the 'trips' table."""
-        conn = self.create_connection()
-        cur = conn.cursor()
-        sql = 'SELECT MAX(unix_timestamp) FROM trips;'
-        cur.execute(sql)
-        row = cur.fetchone()
-        conn.close()
-        try:
-            return datetime.datetime.fromtimestamp(int(row[0])) if row[0] is not None else None
-        except Exception as e:
-            logging.exception(e)
-            return None
 
-    def save_trip(self, date: datetime.datetime, trip: TripInfo):
-        """
-        Save a trip record to the 'trips' table.
-        :param date: date of the trip
-        :param trip: trip data
-        """
-        conn = self.create_connection()
-        cur = conn.cursor()
-        hours = int(trip.hhmmss[:2])
-        minutes = int(trip.hhmmss[2:4])
-        seconds = int(trip.hhmmss[4:])
-        timestamp = date + datetime.timedelta(hours=hours, minutes=minutes, seconds=seconds)
-        sql = f'''
-        INSERT INTO trips(
-            unix_timestamp,
-            date,
-            driving_time_minutes,
-            idle_time_minutes,
-            distance_km,
-            avg_speed_kmh,
-            max_speed_kmh
-        )
-        VALUES(
-            {round(datetime.datetime.timestamp(timestamp))},
-            "{timestamp.strftime("%Y-%m-%d %H:%M")}",
-            {trip.drive_time},
-            {trip.idle_time},
-            {trip.distance},
-            {trip.avg_speed},
-            {trip.max_speed}
-        )'''
-        print(sql)
-        cur.execute(sql)
-        conn.commit()
-        conn.close()
-
-    def save_log(self):
-        """
-        Insert a new log entry into the 'log' table.
-        """
-        conn = self.create_connection()
-        cur = conn.cursor()
-        latitude = self.vehicle_client.vehicle.location_latitude or 'NULL'
-        longitude = self.vehicle_client.vehicle.location_longitude or 'NULL'
-        odometer = int(self.vehicle_client.vehicle.odometer) if self.vehicle_client.vehicle.odometer else 0
-        last_vehicle_update_ts = max(
-            self.vehicle_client.vehicle.last_updated_at,
-            self.vehicle_client.vehicle.location_last_updated_at
-        )
-        sql = f'''INSERT INTO log(
+class DatabaseClient:
+    TRIP_COLUMNS = ("unix_timestamp", "date", "driving_time_minutes", "idle_time_minutes", "distance_km",
+                    "avg_speed_kmh", "max_speed_kmh")
+    STATS_PER_DAY_COLUMNS = ("date", "unix_timestamp", "total_consumed_kwh", "engine_consumption_kwh",
+                             "climate_consumption_kwh", "onboard_electronics_consumption_kwh",
+                             "battery_care_consumption_kwh", "regenerated_energy_kwh", "distance",
+                             "average_consumption_kwh", "average_consumption_regen_deducted_kwh")
+    COMMAND_COLUMNS = ("id", "command", "action_id", "status", "error", "status_checks", "created_at", "sent_at",
+                       "finished_at")
+    LOG_INSERT_SQL = '''INSERT INTO log(
             battery_percentage,
             accessory_battery_percentage,
             estimated_range_km,
@@ -160,148 +53,346 @@ class DatabaseClient:
             ac_charge_limit_percent,
             dc_charge_limit_percent,
             target_climate_temperature,
-            raw_api_data
+            raw_api_payload_id
+        )
+        VALUES(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'''
+    ERROR_INSERT_SQL = '''INSERT INTO errors(
+            timestamp,
+            unix_timestamp,
+            exc_type,
+            exc_args
+        ) VALUES(%s, %s, %s, %s)'''
+
+    def __init__(self, vehicle_client: VehicleClient, storage: Storage.Storage = None, spool: bool = None,
+                 spool_path: str = None):
+        """
+        :param vehicle_client: VehicleClient whose vehicle state is saved
+        :param storage: database backend, by default chosen from the environment (see Storage.create_storage())
+        :param spool: write log rows, trips and errors through the spool, by default according to UVO_SPOOL
+        :param spool_path: spool file, by default UVO_SPOOL_PATH or .spool.jsonl in the application directory
+        """
+        # MySQL/MariaDB or SQLite, see Storage.py
+        self.storage = storage or Storage.create_storage()
+
+        # Create the schema if needed and bring it up to date
+        try:
+            self.storage.migrate()
+        except Exception as e:
+            logging.exception("Failed to initialize database: " + str(e))
+            raise
+
+        self.vehicle_client = vehicle_client
+
+        # Statements whose syntax depends on the backend, built once
+        self.trip_insert_sql = self.storage.upsert_sql("trips", self.TRIP_COLUMNS, ("unix_timestamp",))
+        self.stats_per_day_insert_sql = self.storage.upsert_sql("stats_per_day", self.STATS_PER_DAY_COLUMNS,
+                                                                ("date",))
+        self.trip_sync_day_upsert_sql = self.storage.upsert_sql(
+            "trip_sync_days", ("yyyymmdd", "trip_count", "unix_timestamp"), ("yyyymmdd",),
+            update=("trip_count", "unix_timestamp"))
+        self.trip_sync_month_upsert_sql = self.storage.upsert_sql(
+            "trip_sync_months",
+            ("yyyymm", "trip_count", "distance", "complete", "odometer", "odometer_since", "unix_timestamp"),
+            ("yyyymm",),
+            update=("trip_count", "distance", "complete", "odometer", "odometer_since", "unix_timestamp"))
+        self.command_upsert_sql = self.storage.upsert_sql("commands", self.COMMAND_COLUMNS, ("id",),
+                                                          update=self.COMMAND_COLUMNS[1:])
+
+        # Write-through cache of the latest saved state. These values only change when we write a row
+        # ourselves, so they are read from the database once and then kept up to date on every insert.
+        self._latest_state_lock = threading.Lock()
+        self._last_odometer = None
+        self._last_vehicle_update_unix_ts = None
+        self._last_trip_unix_ts = None
+        self.load_latest_state()
+
+        # (sha256, id) of the last raw API payload stored by the write transaction running in this thread, to skip
+        # storing an unchanged payload again. Per thread and reset when a transaction starts, so that an id is only
+        # reused in the transaction that inserted it: one of another transaction may not be committed, or rolled back
+        self._raw_api_payloads = threading.local()
+
+        # Log rows, trips and errors are appended to a local spool file and written to the database in batches
+        # by a background thread: a database outage neither fails a refresh nor loses the data it fetched
+        if spool is None:
+            spool = os.environ.get("UVO_SPOOL", "true").lower() in ("true", "1", "yes")
+        self.spool = None
+        if spool:
+            self.spool = Spool(
+                spool_path or os.environ.get("UVO_SPOOL_PATH") or DEFAULT_SPOOL_PATH,
+                self.storage,
+                self._write_rows,
+                batch_size=int(os.environ.get("UVO_SPOOL_BATCH_SIZE", 500)),
+                flush_delay=float(os.environ.get("UVO_SPOOL_FLUSH_DELAY", 0.2)),
+            )
+            # rows spooled before a restart are part of the latest state, even if not written yet
+            for record in self.spool.pending():
+                self._update_latest_state_from(record["kind"], record["row"])
+            atexit.register(self.spool.close)
+
+    def get_pool_stats(self) -> dict:
+        """Return database backend statistics (connection pool checkouts, wait times, writes, ...)"""
+        stats = self.storage.stats()
+        if self.spool:
+            stats["spool"] = self.spool.stats()
+        return stats
+
+    def _save_rows(self, kind: str, rows: list):
+        """Save rows of a kind handled by _write_rows(): through the spool if enabled, directly otherwise"""
+        if self.spool:
+            self.spool.append(kind, rows)
+        else:
+            self.storage.write(lambda cur: self._write_rows(cur, [{"kind": kind, "row": row} for row in rows]))
+        for row in rows:
+            self._update_latest_state_from(kind, row)
+
+    @statement("write_rows")
+    def _write_rows(self, cur, records: list):
+        """Insert the log rows, trips and errors of records (dicts with "kind" and "row") in the current transaction"""
+        self._raw_api_payloads.last = (None, None)
+        for record in records:
+            kind, row = record["kind"], record["row"]
+            if kind == "log":
+                params, data = row
+                cur.execute(self.LOG_INSERT_SQL, list(params) + [self._save_raw_api_payload(cur, data)])
+                _rows_written("log")
+            elif kind == "trip":
+                # the unique key on unix_timestamp turns duplicates into a no-op (0 affected rows)
+                cur.execute(self.trip_insert_sql, row)
+                if cur.rowcount == 0:
+                    logging.debug("Trip already exists for timestamp %s, skipping...", row[0])
+                else:
+                    _rows_written("trips")
+                    # date of the trip, without its time
+                    logging.info("Saved new trip for %s", row[1][:10])
+            elif kind == "error":
+                cur.execute(self.ERROR_INSERT_SQL, row)
+                _rows_written("errors")
+            else:
+                raise ValueError(f"Unknown row kind {kind!r}")
+
+    @statement("load_latest_state")
+    def load_latest_state(self):
+        """
+        (Re)load the latest saved odometer, vehicle update timestamp and trip timestamp from the database.
+        Called once at startup; afterwards the values are maintained by the save methods.
+        """
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute('''SELECT
+                (SELECT MAX(odometer) FROM log),
+                (SELECT MAX(unix_last_vehicle_update_timestamp) FROM log),
+                (SELECT MAX(unix_timestamp) FROM trips)''')
+            row = cur.fetchone()
+        with self._latest_state_lock:
+            self._last_odometer, self._last_vehicle_update_unix_ts, self._last_trip_unix_ts = row
+
+    def _update_latest_state(self, odometer=None, vehicle_update_unix_ts=None, trip_unix_ts=None):
+        """Keep the cached latest state in line with a row we just wrote (values only ever move forward)"""
+        with self._latest_state_lock:
+            if odometer is not None and (self._last_odometer is None or odometer > self._last_odometer):
+                self._last_odometer = odometer
+            if vehicle_update_unix_ts is not None and (self._last_vehicle_update_unix_ts is None
+                                                       or vehicle_update_unix_ts > self._last_vehicle_update_unix_ts):
+                self._last_vehicle_update_unix_ts = vehicle_update_unix_ts
+            if trip_unix_ts is not None and (self._last_trip_unix_ts is None or trip_unix_ts > self._last_trip_unix_ts):
+                self._last_trip_unix_ts = trip_unix_ts
+
+    def _update_latest_state_from(self, kind: str, row):
+        if kind == "log":
+            # parameters of LOG_INSERT_SQL: odometer and unix_last_vehicle_update_timestamp
+            params = row[0]
+            self._update_latest_state(odometer=params[9], vehicle_update_unix_ts=params[6])
+        elif kind == "trip":
+            self._update_latest_state(trip_unix_ts=row[0])
+
+    def get_last_update_timestamp(self) -> datetime.datetime:
+        """Return the most recent update timestamp from the 'log' table."""
+        ts = self._last_vehicle_update_unix_ts
+        return datetime.datetime.fromtimestamp(ts) if ts is not None else None
+
+    def get_last_update_odometer(self) -> float:
+        """Return the maximum odometer reading from the 'log' table."""
+        return self._last_odometer
+
+    @statement("save_log")
+    def save_log(self):
+        """
+        Insert a new log entry into the 'log' table.
+        The raw API payload is stored compressed in 'raw_api_payloads' and referenced by id.
+        With the spool, the row is written to the database in the background.
+        """
+        vehicle = self.vehicle_client.vehicle
+        odometer = int(vehicle.odometer) if vehicle.odometer else 0
+        last_vehicle_update_ts = max(
+            vehicle.last_updated_at,
+            vehicle.location_last_updated_at
         )
-        VALUES(
-            {self.vehicle_client.vehicle.ev_battery_percentage},
-            {self.vehicle_client.vehicle.car_battery_percentage},
-            {self.vehicle_client.vehicle.ev_driving_range},
-            '{datetime.datetime.now()}',
-            {round(datetime.datetime.timestamp(datetime.datetime.now()))},
-            '{last_vehicle_update_ts}',
-            {round(datetime.datetime.timestamp(last_vehicle_update_ts))},
-            {latitude},
-            {longitude},
-            {odometer},
-            {1 if self.vehicle_client.vehicle.ev_battery_is_charging else 0},
-            {1 if self.vehicle_client.vehicle.engine_is_running else 0},
-            {self.vehicle_client.charging_power_in_kilowatts},
-            {self.vehicle_client.vehicle.ev_charge_limits_ac or 100},
-            {self.vehicle_client.vehicle.ev_charge_limits_dc or 100},
-            {self.vehicle_client.vehicle.air_temperature},
-            "{self.vehicle_client.vehicle.data}"
-        )'''
-        print(sql)
-        cur.execute(sql)
-        conn.commit()
-        conn.close()
+        now = datetime.datetime.now()
+        params = [
+            vehicle.ev_battery_percentage,
+            vehicle.car_battery_percentage,
+            vehicle.ev_driving_range,
+            str(now),
+            round(datetime.datetime.timestamp(now)),
+            str(last_vehicle_update_ts),
+            round(datetime.datetime.timestamp(last_vehicle_update_ts)),
+            vehicle.location_latitude or None,
+            vehicle.location_longitude or None,
+            odometer,
+            1 if vehicle.ev_battery_is_charging else 0,
+            1 if vehicle.engine_is_running else 0,
+            self.vehicle_client.charging_power_in_kilowatts,
+            vehicle.ev_charge_limits_ac or 100,
+            vehicle.ev_charge_limits_dc or 100,
+            vehicle.air_temperature,
+        ]
+        logging.debug("save_log: %s", params)
+        self._save_rows("log", [(params, vehicle.data)])
+
+    def _save_raw_api_payload(self, cur, data):
+        """
+        Store a raw API payload once and return its id.
+        Identical payloads (same sha256) are stored only once; if the payload is unchanged since the
+        previous log row of the transaction, the previous id is reused without touching the database.
+        """
+        if data is None:
+            return None
+        sha256, encoding, payload, size_bytes = RawPayload.encode(data)
+        last_sha256, last_id = getattr(self._raw_api_payloads, "last", (None, None))
+        if sha256 == last_sha256:
+            return last_id
+
+        payload_id, inserted = self.storage.insert_or_get_id(
+            cur, "raw_api_payloads", ("sha256", "encoding", "size_bytes", "payload", "unix_timestamp"),
+            (sha256, encoding, size_bytes, payload, round(datetime.datetime.now().timestamp())), "sha256")
+        if inserted:
+            _rows_written("raw_api_payloads")
+        self._raw_api_payloads.last = (sha256, payload_id)
+        return payload_id
 
+    @statement("get_raw_api_data")
+    def get_raw_api_data(self, log_id: int):
+        """
+        Return the raw API payload of a 'log' row as a dict.
+        Works for both compressed payloads and legacy rows that still hold the stringified dict.
+        """
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute('''SELECT p.encoding, p.payload, l.raw_api_data
+                FROM log l LEFT JOIN raw_api_payloads p ON p.id = l.raw_api_payload_id
+                WHERE l.id = %s''', (log_id,))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        encoding, payload, legacy_text = row
+        if payload is not None:
+            return RawPayload.decode(encoding, payload)
+        return RawPayload.decode_legacy(legacy_text)
+
+    @statement("get_latest_raw_api_data")
+    def get_latest_raw_api_data(self):
+        """Return the raw API payload of the most recent 'log' row as a dict"""
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT MAX(id) FROM log')
+            row = cur.fetchone()
+        return self.get_raw_api_data(row[0]) if row and row[0] is not None else None
+
+    def compact_raw_api_data(self, batch_size: int = 500) -> int:
+        """
+        Move legacy stringified payloads from 'log.raw_api_data' into 'raw_api_payloads'.
+        Rows that can't be parsed are left untouched.
+        :return: number of rows compacted
+        """
+        compacted = 0
+        last_id = 0
+        while True:
+            with self.storage.connection() as conn:
+                cur = conn.cursor()
+                cur.execute('''SELECT id, raw_api_data FROM log
+                    WHERE id > %s AND raw_api_payload_id IS NULL AND raw_api_data IS NOT NULL
+                    ORDER BY id LIMIT %s''', (last_id, batch_size))
+                rows = cur.fetchall()
+            if not rows:
+                break
+
+            def compact(cur):
+                self._raw_api_payloads.last = (None, None)
+                count = 0
+                for log_id, legacy_text in rows:
+                    data = RawPayload.decode_legacy(legacy_text)
+                    if data is None:
+                        continue
+                    payload_id = self._save_raw_api_payload(cur, data)
+                    cur.execute('UPDATE log SET raw_api_payload_id = %s, raw_api_data = NULL WHERE id = %s',
+                                (payload_id, log_id))
+                    count += 1
+                return count
+
+            compacted += self.storage.write(compact)
+            last_id = rows[-1][0]
+            logging.info(f"Compacted raw API data of {compacted} log rows so far")
+        return compacted
+
+    @statement("save_daily_stats")
     def save_daily_stats(self):
-        """Insert or update daily statistics in the 'stats_per_day' table."""
-        conn = self.create_connection()
-        cur = conn.cursor()
-        sql = 'SELECT date FROM stats_per_day;'
-        cur.execute(sql)
-        rows = cur.fetchall()
+        """Insert daily statistics in the 'stats_per_day' table. Days that are already saved are left as is."""
         current_date = datetime.datetime.now().date()
-        saved_dates = [row[0] for row in rows]
 
+        rows = []
         for day in self.vehicle_client.vehicle.daily_stats:
             # Skip the current day as it might change during the day
             if day.date.date() == current_date:
                 continue
 
-            # Skip already saved days
-            day_str = day.date.strftime("%Y-%m-%d")
-            if day_str in saved_dates:
-                continue
-
-            # Calculate consumption values for new days only
             average_consumption = 0
             average_consumption_regen_deducted = 0
             if day.distance > 0:
                 average_consumption = day.total_consumed / (100 / day.distance)
                 average_consumption_regen_deducted = (day.total_consumed - day.regenerated_energy) / (100 / day.distance)
 
-            # Insert new day's data
-            sql = f'''
-            INSERT INTO stats_per_day(
-                date,
-                unix_timestamp,
-                total_consumed_kwh,
-                engine_consumption_kwh,
-                climate_consumption_kwh,
-                onboard_electronics_consumption_kwh,
-                battery_care_consumption_kwh,
-                regenerated_energy_kwh,
-                distance,
-                average_consumption_kwh,
-                average_consumption_regen_deducted_kwh
-            )
-            VALUES(
-                '{day_str}',
-                {round(datetime.datetime.timestamp(day.date))},
-                {round(day.total_consumed / 1000, 1)},
-                {round(day.engine_consumption / 1000, 1)},
-                {round(day.climate_consumption / 1000, 1)},
-                {round(day.onboard_electronics_consumption / 1000, 1)},
-                {round(day.battery_care_consumption / 1000, 1)},
-                {round(day.regenerated_energy / 1000, 1)},
-                {day.distance},
-                {round(average_consumption / 1000, 1)},
-                {round(average_consumption_regen_deducted / 1000, 1)}
-            )'''
-            cur.execute(sql)
-            conn.commit()
-            logging.info(f"Saved new daily stats for: {day_str}")
+            rows.append((
+                day.date.strftime("%Y-%m-%d"),
+                round(datetime.datetime.timestamp(day.date)),
+                round(day.total_consumed / 1000, 1),
+                round(day.engine_consumption / 1000, 1),
+                round(day.climate_consumption / 1000, 1),
+                round(day.onboard_electronics_consumption / 1000, 1),
+                round(day.battery_care_consumption / 1000, 1),
+                round(day.regenerated_energy / 1000, 1),
+                day.distance,
+                round(average_consumption / 1000, 1),
+                round(average_consumption_regen_deducted / 1000, 1)
+            ))
 
-        conn.close()
+        def insert(cur):
+            saved = []
+            for row in rows:
+                # the unique key on 'date' turns already saved days into a no-op (0 affected rows)
+                cur.execute(self.stats_per_day_insert_sql, row)
+                if cur.rowcount == 1:
+                    saved.append(row[0])
+            return saved
+
+        saved = self.storage.write(insert) if rows else []
+        for day_str in saved:
+            logging.info(f"Saved new daily stats for: {day_str}")
+        _rows_written("stats_per_day", len(saved))
 
+    @statement("log_error")
     def log_error(self, exception: Exception):
         """Log an error entry into the 'errors' table."""
-        conn = self.create_connection()
-        cur = conn.cursor()
-        sql = '''INSERT INTO errors(
-            timestamp,
-            unix_timestamp,
-            exc_type,
-            exc_args
-        ) VALUES(%s, %s, %s, %s)'''
-        cur.execute(sql, (
-            datetime.datetime.now(),
-            round(datetime.datetime.timestamp(datetime.datetime.now())),
-            type(exception).__name__,
-            str(exception.args)
-        ))
-        conn.commit()
-        conn.close()
+        now = datetime.datetime.now()
+        self._save_rows("error", [
+            (str(now), round(datetime.datetime.timestamp(now)), type(exception).__name__, str(exception.args))])
 
-    def save_trip(self, day_date, trip):
-        """Save a single trip to the database, avoiding duplicates."""
-        conn = self.create_connection()
-        cur = conn.cursor()
-        
-        # Convert trip timestamp to unix timestamp for comparison
-        trip_unix_timestamp = None
-        if trip.hhmmss:
-            trip_datetime = self.vehicle_client._convert_trip_time_to_datetime(day_date, trip.hhmmss)
-            if trip_datetime:
-                trip_unix_timestamp = int(trip_datetime.timestamp())
-        
-        if trip_unix_timestamp:
-            # Check if this trip already exists
-            cur.execute("SELECT COUNT(*) FROM trips WHERE unix_timestamp = %s", (trip_unix_timestamp,))
-            if cur.fetchone()[0] > 0:
-                print(f"Trip already exists for timestamp {trip_unix_timestamp}, skipping...")
-                conn.close()
-                return
-        
-        # Insert new trip
-        sql = '''INSERT INTO trips(
-            unix_timestamp,
-            date,
-            driving_time_minutes,
-            idle_time_minutes,
-            distance_km,
-            avg_speed_kmh,
-            max_speed_kmh
-        ) VALUES(%s, %s, %s, %s, %s, %s, %s)'''
-        
+    def _trip_row(self, day_date, trip) -> tuple:
+        """Build the 'trips' row for a trip of the given day"""
         # Get the full datetime with hour, minute, second for the date field
         trip_datetime = self.vehicle_client._convert_trip_time_to_datetime(day_date, trip.hhmmss)
+        trip_unix_timestamp = int(trip_datetime.timestamp()) if trip_datetime else None
         date_string = trip_datetime.strftime("%Y-%m-%d %H:%M") if trip_datetime else day_date.strftime("%Y-%m-%d")
-        
-        cur.execute(sql, (
+        return (
             trip_unix_timestamp,
             date_string,
             trip.drive_time if trip.drive_time else 0,
@@ -309,21 +400,138 @@ class DatabaseClient:
             int(trip.distance) if trip.distance else 0,
             int(trip.avg_speed) if trip.avg_speed else 0,
             int(trip.max_speed) if trip.max_speed else 0
-        ))
-        
-        conn.commit()
-        conn.close()
-        print(f"Saved new trip for {day_date.strftime('%Y-%m-%d')}")
+        )
+
+    @statement("save_trip")
+    def save_trip(self, day_date, trip):
+        """Save a single trip to the database, avoiding duplicates."""
+        self._save_rows("trip", [self._trip_row(day_date, trip)])
+
+    @statement("save_trips")
+    def save_trips(self, trips: list) -> int:
+        """
+        Save several trips in a single transaction (and a single spool append).
+        Callers should filter known duplicates first (see get_saved_trip_timestamps); any that slip
+        through are ignored by the unique key on unix_timestamp.
+        :param trips: list of (day_date, trip) tuples
+        :return: number of trips handed over, "Saved new trip" is logged for each one actually inserted
+        """
+        if not trips:
+            return 0
+
+        self._save_rows("trip", [self._trip_row(day_date, trip) for day_date, trip in trips])
+        return len(trips)
+
+    @statement("get_saved_trip_timestamps")
+    def get_saved_trip_timestamps(self, start: datetime.datetime, end: datetime.datetime) -> set:
+        """
+        Return the unix timestamps of all trips saved between start (inclusive) and end (exclusive).
+        Used to dedupe a whole batch of trips in memory instead of querying once per trip.
+        """
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT unix_timestamp FROM trips WHERE unix_timestamp >= %s AND unix_timestamp < %s",
+                (int(start.timestamp()), int(end.timestamp()))
+            )
+            rows = cur.fetchall()
+        return {int(row[0]) for row in rows if row[0] is not None}
+
+    @statement("get_trip_sync_state")
+    def get_trip_sync_state(self, months: list) -> tuple:
+        """
+        Trip sync watermarks of the given months.
+        :param months: list of "YYYYMM" strings
+        :return: (dict yyyymm -> month row as dict, dict yyyymmdd -> synced trip count)
+        """
+        if not months:
+            return {}, {}
+        placeholders = ", ".join(["%s"] * len(months))
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT yyyymm, trip_count, distance, complete, odometer, odometer_since, unix_timestamp "
+                f"FROM trip_sync_months "
+                f"WHERE yyyymm IN ({placeholders})",
+                tuple(months)
+            )
+            month_rows = cur.fetchall()
+            cur.execute(
+                "SELECT yyyymmdd, trip_count FROM trip_sync_days WHERE yyyymmdd >= %s AND yyyymmdd < %s",
+                (min(months) + "00", max(months) + "99")
+            )
+            day_rows = cur.fetchall()
+
+        synced_months = {
+            row[0]: {"trip_count": row[1], "distance": row[2], "complete": bool(row[3]), "odometer": row[4],
+                     "odometer_since": row[5], "unix_timestamp": row[6]}
+            for row in month_rows
+        }
+        synced_days = {row[0]: row[1] for row in day_rows}
+        return synced_months, synced_days
+
+    @statement("get_trip_sync_watermark")
+    def get_trip_sync_watermark(self):
+        """
+        Watermark of the most recent trip sync.
+        :return: dict with complete, odometer, odometer_since and unix_timestamp, or None if trips were never synced
+        """
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT complete, odometer, odometer_since, unix_timestamp FROM trip_sync_months "
+                "ORDER BY yyyymm DESC LIMIT 1"
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return {"complete": bool(row[0]), "odometer": row[1], "odometer_since": row[2], "unix_timestamp": row[3]}
+
+    @statement("save_trip_sync_day")
+    def save_trip_sync_day(self, yyyymmdd: str, trip_count: int):
+        params = (yyyymmdd, trip_count, int(datetime.datetime.now().timestamp()))
+        self.storage.write(lambda cur: cur.execute(self.trip_sync_day_upsert_sql, params))
+        _rows_written("trip_sync_days")
+
+    @statement("save_trip_sync_month")
+    def save_trip_sync_month(self, yyyymm: str, trip_count: int, distance, complete: bool, odometer,
+                             odometer_since: int):
+        params = (yyyymm, trip_count, distance, int(complete), odometer, odometer_since,
+                  int(datetime.datetime.now().timestamp()))
+        self.storage.write(lambda cur: cur.execute(self.trip_sync_month_upsert_sql, params))
+        _rows_written("trip_sync_months")
+
+    @statement("save_command")
+    def save_command(self, command: dict):
+        """Insert or update a remote command tracked by CommandQueue"""
+        values = tuple(command.get(column) for column in self.COMMAND_COLUMNS)
+        self.storage.write(lambda cur: cur.execute(self.command_upsert_sql, values))
+        _rows_written("commands")
+
+    @statement("get_command")
+    def get_command(self, command_id: str):
+        """:return: the command as a dict, None if unknown"""
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT {', '.join(self.COMMAND_COLUMNS)} FROM commands WHERE id = %s", (command_id,))
+            row = cur.fetchone()
+        return dict(zip(self.COMMAND_COLUMNS, row)) if row else None
+
+    @statement("get_unfinished_commands")
+    def get_unfinished_commands(self) -> list:
+        """Commands that were not in a final state when the process stopped"""
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT {', '.join(self.COMMAND_COLUMNS)} FROM commands "
+                f"WHERE status IN ('queued', 'sending', 'pending') ORDER BY created_at"
+            )
+            rows = cur.fetchall()
+        return [dict(zip(self.COMMAND_COLUMNS, row)) for row in rows]
 
     def get_most_recent_saved_trip_timestamp(self):
         """Get the timestamp of the most recently saved trip."""
-        conn = self.create_connection()
-        cur = conn.cursor()
-        
-        cur.execute("SELECT MAX(unix_timestamp) FROM trips")
-        result = cur.fetchone()
-        conn.close()
-        
-        if result and result[0]:
-            return datetime.datetime.fromtimestamp(result[0])
+        ts = self._last_trip_unix_ts
+        if ts:
+            return datetime.datetime.fromtimestamp(int(ts))
         return None
@@ -0,0 +1,115 @@
+import collections
+import json
+import logging
+import queue
+import threading
+
+
+class Subscription:
+    """One subscriber of an EventBroadcaster: events are read from its queue"""
+
+    def __init__(self, broadcaster, max_queue: int):
+        self.broadcaster = broadcaster
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def get(self, timeout: float):
+        """:return: the next event (id, type, data), or None after timeout seconds without event"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class EventBroadcaster:
+    """
+    Fans out vehicle state changes to the subscribers of the /events stream, at most max_subscribers of them.
+    Each subscriber holds an HTTP server worker thread for as long as it is connected, so the limit is kept well
+    below the server threads, leaving the others to the regular requests.
+    Role:
+    - turn each new vehicle state into a diff of the fields that changed since the previous one
+    - keep the last events, so that a client reconnecting with Last-Event-ID gets what it missed
+    - never block the writer: a subscriber too slow to keep up is dropped, and resyncs on reconnect
+    Events are (id, type, data) with type "state" (every field) or "diff" (changed fields only).
+    """
+
+    def __init__(self, history: int = 100, max_subscribers: int = 2, max_queue: int = 100):
+        """
+        :param history: number of past events kept for Last-Event-ID resumes
+        :param max_subscribers: subscribe() refuses more subscribers than this (each holds an HTTP worker thread)
+        :param max_queue: events buffered per subscriber before it is dropped
+        """
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self.state = None
+        self.last_id = 0
+        self._history = collections.deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def publish_state(self, state: dict):
+        """New vehicle state: broadcast the fields that changed, nothing if none did"""
+        with self._lock:
+            if self.state is None:
+                event_type, data = "state", dict(state)
+            else:
+                event_type = "diff"
+                data = {key: value for key, value in state.items() if self.state.get(key) != value}
+                if not data:
+                    return
+            self.state = dict(state)
+            self.last_id += 1
+            event = (self.last_id, event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                self.logger.warning("Event subscriber is too slow, dropping it")
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+    def subscribe(self, last_event_id: int = None):
+        """
+        :param last_event_id: id of the last event the client got, to resume after it
+        :return: (Subscription, events to send first), or (None, None) if there are too many subscribers
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None, None
+            subscription = Subscription(self, self.max_queue)
+            self._subscribers.add(subscription)
+
+            if last_event_id is not None and self._history and self._history[0][0] <= last_event_id + 1 \
+                    and last_event_id <= self.last_id:
+                backlog = [event for event in self._history if event[0] > last_event_id]
+            elif self.state is not None:
+                # new client, or too far behind: start from the whole current state
+                backlog = [(self.last_id, "state", dict(self.state))]
+            else:
+                backlog = []
+        return subscription, backlog
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @staticmethod
+    def format(event) -> str:
+        """Server-Sent Events representation of an event"""
+        event_id, event_type, data = event
+        return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "max_subscribers": self.max_subscribers,
+                "last_event_id": self.last_id,
+            }
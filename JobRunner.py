@@ -0,0 +1,85 @@
+import contextvars
+import datetime
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobRunner:
+    """
+    Runs long operations (forced refresh, trip processing, charge commands) in the background, so that the HTTP
+    request returns at once with a job id, and the client polls /jobs/<id> for the outcome.
+    Jobs run in the context of the request that submitted them (e.g. its request budget priority).
+    Only the last max_jobs jobs are kept.
+    """
+
+    def __init__(self, max_workers: int = 2, max_jobs: int = 100):
+        """
+        :param max_workers: number of jobs running at the same time, the others wait in line
+        :param max_jobs: number of finished jobs kept for polling
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, name: str, function, *args, **kwargs) -> dict:
+        """
+        :param name: what the job does, shown in its status
+        :param function: callable doing the work, its return value (JSON serializable) is the job's result
+        :return: the job status
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "name": name,
+            "status": "pending",
+            "created_at": self._now(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+        context = contextvars.copy_context()
+        self.executor.submit(context.run, self._run, job, function, args, kwargs)
+        return dict(job)
+
+    def _run(self, job: dict, function, args, kwargs):
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = self._now()
+        try:
+            result = function(*args, **kwargs)
+            status, error = "succeeded", None
+        except Exception as e:
+            self.logger.exception(f"Job {job['name']} ({job['id']}) failed:", exc_info=e)
+            result, status, error = None, "failed", str(e)
+        with self._lock:
+            job["result"] = result
+            job["error"] = error
+            job["status"] = status
+            job["finished_at"] = self._now()
+
+    def get(self, job_id: str):
+        """:return: a copy of the job status, None if unknown (or already dropped)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self) -> list:
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+    def shutdown(self, wait: bool = False):
+        self.executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).isoformat()
@@ -1,11 +1,77 @@
+import atexit
+import datetime
+import json
 import logging
+import logging.handlers
+import queue
 import coloredlogs
 import os
 from dotenv import load_dotenv
 
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class PayloadFilter(logging.Filter):
+    """
+    Truncates large arguments (API responses, SQL parameters) of a record before it is formatted.
+    Only records that pass the level checks get here, so payloads of disabled debug messages are never formatted.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record):
+        if self.max_chars and isinstance(record.args, tuple):
+            record.args = tuple(self._truncate(arg) for arg in record.args)
+        return True
+
+    def _truncate(self, arg):
+        if isinstance(arg, (int, float, bool)) or arg is None:
+            return arg
+        text = str(arg)
+        if len(text) <= self.max_chars:
+            return text
+        return f"{text[:self.max_chars]}... ({len(text)} chars)"
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread as they are: formatting happens there, not on the logging thread"""
+
+    def prepare(self, record):
+        return record
+
+
 class Logger:
+    """
+    Configures the root logger once, from the environment:
+    - DEBUG: log at debug level
+    - LOG_FORMAT: "text" (colored, the default) or "json"
+    - LOG_ASYNC: formatting and output happen on a background thread, fed by a queue (default: true)
+    - LOG_MAX_PAYLOAD_CHARS: longer log arguments are truncated (default: 2000, 0 for no limit)
+    Messages with large payloads should pass them as arguments (logger.debug("response: %s", response)),
+    so that they are only formatted when the level is enabled, on the background thread.
+    """
     _instance = None
     _initialized = False
+    listener = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -16,18 +82,44 @@ class Logger:
         if not Logger._initialized:
             load_dotenv()
             debug_mode = os.getenv('DEBUG', 'false').lower() == 'true'
-            
+            level = 'DEBUG' if debug_mode else 'INFO'
+
             # Configure root logger
             self.logger = logging.getLogger()
-            coloredlogs.install(
-                level='DEBUG' if debug_mode else 'INFO',
-                logger=self.logger,
-                isatty=True,
-                fmt='%(asctime)s %(name)s[%(process)d] %(levelname)s %(message)s'
-            )
-            
+            if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+                handler = logging.StreamHandler()
+                handler.setFormatter(JsonFormatter())
+                self.logger.addHandler(handler)
+                self.logger.setLevel(level)
+            else:
+                coloredlogs.install(
+                    level=level,
+                    logger=self.logger,
+                    isatty=True,
+                    fmt='%(asctime)s %(name)s[%(process)d] %(levelname)s %(message)s'
+                )
+
+            payload_filter = PayloadFilter(int(os.getenv('LOG_MAX_PAYLOAD_CHARS', '2000')))
+            for handler in self.logger.handlers:
+                handler.addFilter(payload_filter)
+
+            if os.getenv('LOG_ASYNC', 'true').lower() in ('true', '1', 'yes'):
+                self._start_listener()
+
             Logger._initialized = True
 
+    def _start_listener(self):
+        """Move the root handlers behind a queue, emptied by a listener thread"""
+        handlers = list(self.logger.handlers)
+        log_queue = queue.SimpleQueue()
+        for handler in handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(_QueueHandler(log_queue))
+        Logger.listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        Logger.listener.start()
+        # write what is still queued before the process exits
+        atexit.register(Logger.listener.stop)
+
     @staticmethod
     def get_logger(name=None):
         """Get a logger instance with the specified name"""
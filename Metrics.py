@@ -0,0 +1,285 @@
+import bisect
+import functools
+import math
+import threading
+import time
+
+from RequestBudget import endpoint_name
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    A metric family: one child per combination of label values.
+    Children are created once by labels() and should be kept by the caller, so that recording a value is only a
+    lock and an addition.
+    """
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """:return: the child for these label values, created on first use"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_string(self, values, extra: str = None) -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    __slots__ = ("lock", "value")
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value(self._lock)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def _samples(self):
+        with self._lock:
+            return [("_total", self._label_string(values), child.value)
+                    for values, child in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    """A value set by the code, or read when scraped from set_function() (nothing to do on the hot path then)"""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self._function = None
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        child = _Value(self._lock)
+        child.value = None  # not exported until set
+        return child
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        """:param function: callable returning the current value, None to export nothing"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                value = None
+            return [] if value is None else [("", "", value)]
+        with self._lock:
+            return [("", self._label_string(values), child.value) for values, child in list(self._children.items())
+                    if child.value is not None]
+
+
+class _HistogramChild:
+    __slots__ = ("lock", "upper_bounds", "counts", "sum")
+
+    def __init__(self, lock, upper_bounds):
+        self.lock = lock
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * len(upper_bounds)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.upper_bounds = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.upper_bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            children = [(values, list(child.counts), child.sum) for values, child in self._children.items()]
+        for values, counts, total in children:
+            cumulative = 0
+            for upper_bound, count in zip(self.upper_bounds, counts):
+                cumulative += count
+                samples.append(("_bucket", self._label_string(values, f'le="{_format_value(float(upper_bound))}"'),
+                                cumulative))
+            samples.append(("_sum", self._label_string(values), total))
+            samples.append(("_count", self._label_string(values), cumulative))
+        return samples
+
+
+class Registry:
+    """Metrics exported by /metrics, in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+API_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "uvo_api_request_duration_seconds", "Latency of the Kia/Hyundai API calls, per endpoint", ("endpoint",),
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)))
+API_REQUESTS = REGISTRY.register(Counter(
+    "uvo_api_requests", "Kia/Hyundai API calls sent, each one counts against the daily quota", ("endpoint",)))
+API_REQUEST_TIMEOUTS = REGISTRY.register(Counter(
+    "uvo_api_request_timeouts", "Kia/Hyundai API calls that got no answer before the HTTP timeout", ("endpoint",)))
+API_ERRORS = REGISTRY.register(Counter(
+    "uvo_api_errors", "API errors handled by VehicleClient.handle_api_exception, per kind "
+                      "(rate_limited, vehicle_timeout, token_expired...)", ("kind",)))
+API_RETRIES = REGISTRY.register(Counter(
+    "uvo_api_retries", "API calls retried after a token refresh", ("operation",)))
+API_BUDGET_USED = REGISTRY.register(Gauge(
+    "uvo_api_budget_used", "API calls made in the last 24h, according to the request budget"))
+API_BUDGET_AVAILABLE = REGISTRY.register(Gauge(
+    "uvo_api_budget_available", "API calls left for scheduled refreshes in the rolling 24h window"))
+
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "uvo_db_query_duration_seconds", "Latency of the database operations, per statement", ("statement",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)))
+DB_ROWS_WRITTEN = REGISTRY.register(Counter(
+    "uvo_db_rows_written", "Rows inserted or updated, per table", ("table",)))
+DB_SPOOL_PENDING = REGISTRY.register(Gauge(
+    "uvo_db_spool_pending_records", "Rows saved to the local spool file and not written to the database yet"))
+
+JOB_DURATION = REGISTRY.register(Histogram(
+    "uvo_scheduler_job_duration_seconds", "Duration of the scheduled jobs", ("job",),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)))
+
+VEHICLE_SOC = REGISTRY.register(Gauge(
+    "uvo_vehicle_battery_soc_percent", "Latest state of charge of the traction battery"))
+VEHICLE_RANGE = REGISTRY.register(Gauge(
+    "uvo_vehicle_range_km", "Latest estimated driving range"))
+VEHICLE_CHARGING_POWER = REGISTRY.register(Gauge(
+    "uvo_vehicle_charging_power_kw", "Latest rough estimate of the charging power, 0 when not charging"))
+
+
+class ApiMetricsMiddleware:
+    """
+    Request middleware for KiaUvoApiEU.add_request_middleware() recording the latency, count and timeouts of every
+    API call. The metric children of each URL are looked up once and cached.
+    """
+
+    def __init__(self):
+        self._children = {}
+
+    def _children_for(self, method: str, url: str):
+        per_method = self._children.get(method)
+        if per_method is None:
+            per_method = self._children.setdefault(method, {})
+        children = per_method.get(url)
+        if children is None:
+            endpoint = endpoint_name(method, url)
+            children = per_method[url] = (API_REQUEST_DURATION.labels(endpoint), API_REQUESTS.labels(endpoint),
+                                          API_REQUEST_TIMEOUTS.labels(endpoint))
+        return children
+
+    def __call__(self, method: str, url: str, send):
+        duration, requests, timeouts = self._children_for(method, url)
+        requests.inc()
+        started = time.perf_counter()
+        try:
+            return send()
+        except Exception as e:
+            # requests.exceptions.Timeout, without importing requests here
+            if "Timeout" in type(e).__name__:
+                timeouts.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+
+
+def timed(histogram: Histogram, name: str):
+    """Decorator observing the duration of every call of the function in histogram, labelled with name"""
+    child = histogram.labels(name)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+import ast
+import datetime
+import hashlib
+import json
+import os
+import zlib
+
+# Raw API payloads are stored as canonical JSON, compressed with zlib.
+# The "dict1" encoding primes zlib with a typical status payload (db/raw_payload_dictionaries/dict1.json),
+# so that a new payload only costs the bytes that differ from it.
+# Dictionary files must never be modified once rows have been written with them: add a new one instead.
+ENCODING_JSON_ZLIB = "json+zlib"
+ENCODING_JSON_ZLIB_DICT1 = "json+zlib+dict1"
+
+DEFAULT_ENCODING = ENCODING_JSON_ZLIB_DICT1
+
+DICTIONARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "raw_payload_dictionaries")
+_DICTIONARY_FILES = {
+    ENCODING_JSON_ZLIB_DICT1: "dict1.json",
+}
+_dictionaries = {}
+
+
+def _get_dictionary(encoding: str) -> bytes:
+    if encoding not in _dictionaries:
+        with open(os.path.join(DICTIONARY_DIR, _DICTIONARY_FILES[encoding]), "rb") as f:
+            _dictionaries[encoding] = f.read()
+    return _dictionaries[encoding]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def to_json(data) -> bytes:
+    """Canonical JSON representation (sorted keys, no whitespace), so that equal payloads hash equally"""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def encode(data, encoding: str = DEFAULT_ENCODING) -> tuple:
+    """
+    Encode a raw API payload for storage.
+    :param data: the payload (usually vehicle.data)
+    :param encoding: one of the ENCODING_* constants
+    :return: (sha256 of the JSON, encoding, compressed bytes, uncompressed size)
+    """
+    raw = to_json(data)
+    sha256 = hashlib.sha256(raw).hexdigest()
+    if encoding == ENCODING_JSON_ZLIB:
+        compressed = zlib.compress(raw, 9)
+    elif encoding in _DICTIONARY_FILES:
+        compressor = zlib.compressobj(9, zdict=_get_dictionary(encoding))
+        compressed = compressor.compress(raw) + compressor.flush()
+    else:
+        raise ValueError(f"Unknown raw payload encoding: {encoding}")
+    return sha256, encoding, compressed, len(raw)
+
+
+def decode(encoding: str, payload: bytes) -> dict:
+    """Decode a payload written by encode() back to a dict"""
+    if encoding == ENCODING_JSON_ZLIB:
+        raw = zlib.decompress(payload)
+    elif encoding in _DICTIONARY_FILES:
+        decompressor = zlib.decompressobj(zdict=_get_dictionary(encoding))
+        raw = decompressor.decompress(payload) + decompressor.flush()
+    else:
+        raise ValueError(f"Unknown raw payload encoding: {encoding}")
+    return json.loads(raw)
+
+
+def decode_legacy(text: str):
+    """
+    Decode the legacy 'log.raw_api_data' column, which holds the Python repr of the status dict.
+    Returns None if the text can't be parsed (e.g. it contains datetime objects).
+    """
+    if not text:
+        return None
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return None
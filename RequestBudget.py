@@ -0,0 +1,212 @@
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, the ledger is then only safe within one process
+    fcntl = None
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".request_budget.json")
+WINDOW_SECONDS = 24 * 3600
+
+# path segments that are IDs (vehicle id, message id...) are folded together, so that counts are per endpoint
+_ID_SEGMENT = re.compile(r"^[0-9a-fA-F-]{16,}$|^\d+$")
+
+
+class Priority(IntEnum):
+    LOW = 0  # scheduled/background calls
+    HIGH = 1  # user triggered actions, may use the reserve
+
+
+class BudgetExceededError(Exception):
+    """Raised instead of making an API call that would eat into the reserved (or exhausted) quota"""
+    pass
+
+
+_priority = contextvars.ContextVar("request_priority", default=Priority.LOW)
+
+
+def endpoint_name(method: str, url: str) -> str:
+    path = urlparse(url).path
+    parts = ["{id}" if _ID_SEGMENT.match(part) else part for part in path.split("/")]
+    return f"{method.upper()} {'/'.join(parts)}"
+
+
+class RequestBudget:
+    """
+    Persistent ledger of the calls made to the vehicle API, in a rolling 24h window.
+    Role:
+    - count every outbound call, per endpoint and priority (the API allows about 200 a day, cached calls included)
+    - keep a reserve for user triggered actions: low priority calls are refused once only the reserve is left
+    - tell the scheduler how often it can poll with what is left
+    The ledger is a small JSON file, shared (with a file lock) by the HTTP server and main.py runs.
+    """
+
+    def __init__(self, path: str = None, daily_limit: int = 200, reserve: int = 20, window: int = WINDOW_SECONDS):
+        """
+        :param path: location of the ledger file
+        :param daily_limit: number of calls allowed per window
+        :param reserve: number of calls only high priority requests may use
+        :param window: length of the rolling window in seconds
+        """
+        self.path = path or DEFAULT_PATH
+        self.daily_limit = daily_limit
+        self.reserve = min(reserve, daily_limit)
+        self.window = window
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    @contextmanager
+    def priority(priority: Priority):
+        """Run the calls made inside this block (in this thread/context) with the given priority"""
+        token = _priority.set(priority)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    @staticmethod
+    def current_priority() -> Priority:
+        return _priority.get()
+
+    @contextmanager
+    def _ledger(self, write: bool):
+        """Load the ledger under a lock, and write it back if requested"""
+        with self._lock:
+            lock_file = None
+            if fcntl is not None:
+                lock_file = open(self.path + ".lock", "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                ledger = self._load()
+                self._prune(ledger)
+                yield ledger
+                if write:
+                    self._save(ledger)
+            finally:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                ledger = json.load(f)
+        except FileNotFoundError:
+            return {"calls": [], "blocked_until": 0}
+        except (ValueError, OSError) as e:
+            self.logger.warning(f"Request budget ledger {self.path} is unreadable, starting a new one: {e!r}")
+            return {"calls": [], "blocked_until": 0}
+        ledger.setdefault("calls", [])
+        ledger.setdefault("blocked_until", 0)
+        return ledger
+
+    def _save(self, ledger: dict):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(ledger, f)
+        os.replace(tmp_path, self.path)
+
+    def _prune(self, ledger: dict):
+        cutoff = time.time() - self.window
+        ledger["calls"] = [call for call in ledger["calls"] if call[0] > cutoff]
+
+    def _limit_for(self, priority: Priority) -> int:
+        return self.daily_limit if priority >= Priority.HIGH else self.daily_limit - self.reserve
+
+    def acquire(self, endpoint: str, priority: Priority = None):
+        """
+        Record a call, or raise BudgetExceededError if the priority does not allow it anymore
+        :param endpoint: name of the endpoint, for the per endpoint counts
+        :param priority: defaults to the priority of the current context
+        """
+        if priority is None:
+            priority = _priority.get()
+        with self._ledger(write=True) as ledger:
+            now = time.time()
+            if ledger["blocked_until"] > now:
+                raise BudgetExceededError(
+                    f"API rate limited until {time.strftime('%Y-%m-%d %H:%M', time.localtime(ledger['blocked_until']))}, "
+                    f"not calling {endpoint}")
+            used = len(ledger["calls"])
+            limit = self._limit_for(priority)
+            if used >= limit:
+                raise BudgetExceededError(
+                    f"{used}/{self.daily_limit} API calls used in the last 24h, "
+                    f"refusing {priority.name} priority call to {endpoint}")
+            ledger["calls"].append([now, endpoint, priority.name])
+
+    def middleware(self, method: str, url: str, send):
+        """Request middleware for KiaUvoApiEU.add_request_middleware()"""
+        self.acquire(endpoint_name(method, url))
+        return send()
+
+    def mark_rate_limited(self, duration: int = None):
+        """The API told us we are rate limited: refuse every call until the window has passed"""
+        with self._ledger(write=True) as ledger:
+            ledger["blocked_until"] = time.time() + (duration or self.window)
+
+    def used(self) -> int:
+        with self._ledger(write=False) as ledger:
+            return len(ledger["calls"])
+
+    def available(self, priority: Priority = Priority.LOW) -> int:
+        with self._ledger(write=False) as ledger:
+            if ledger["blocked_until"] > time.time():
+                return 0
+            return max(0, self._limit_for(priority) - len(ledger["calls"]))
+
+    def suggested_interval(self, calls_per_cycle: int = 1, min_interval: int = 0, spread_over: int = None) -> int:
+        """
+        Seconds to wait before the next low priority polling cycle, so that what is left of the budget lasts.
+        :param calls_per_cycle: API calls one cycle needs
+        :param min_interval: never poll more often than this
+        :param spread_over: seconds the remaining budget has to last (e.g. until the end of the active hours),
+        defaults to the window
+        """
+        calls_per_cycle = max(1, calls_per_cycle)
+        spread_over = spread_over or self.window
+        low_limit = self.daily_limit - self.reserve
+        with self._ledger(write=False) as ledger:
+            now = time.time()
+            if ledger["blocked_until"] > now:
+                return max(min_interval, int(ledger["blocked_until"] - now))
+            calls = ledger["calls"]
+            available = low_limit - len(calls)
+            if available < calls_per_cycle:
+                # wait until enough calls fall out of the window
+                needed = len(calls) - low_limit + calls_per_cycle
+                if needed > len(calls):
+                    return max(min_interval, self.window)
+                return max(min_interval, int(calls[needed - 1][0] + self.window - now) + 1)
+
+        return max(min_interval, int(spread_over * calls_per_cycle / available))
+
+    def stats(self) -> dict:
+        with self._ledger(write=False) as ledger:
+            calls = ledger["calls"]
+            per_endpoint, per_priority = {}, {}
+            for _, endpoint, priority in calls:
+                per_endpoint[endpoint] = per_endpoint.get(endpoint, 0) + 1
+                per_priority[priority] = per_priority.get(priority, 0) + 1
+            now = time.time()
+            return {
+                "daily_limit": self.daily_limit,
+                "reserve": self.reserve,
+                "used": len(calls),
+                "available_low_priority": max(0, self.daily_limit - self.reserve - len(calls)),
+                "available_high_priority": max(0, self.daily_limit - len(calls)),
+                "blocked_until": ledger["blocked_until"] if ledger["blocked_until"] > now else None,
+                "next_call_expires_in_s": int(calls[0][0] + self.window - now) if calls else None,
+                "per_endpoint": per_endpoint,
+                "per_priority": per_priority,
+            }
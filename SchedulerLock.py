@@ -0,0 +1,52 @@
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: every process then believes it holds the lock
+    fcntl = None
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".scheduler.lock")
+
+
+class SchedulerLock:
+    """
+    Inter-process lock making sure only one process runs the scheduled jobs, however the HTTP server is started
+    (several WSGI workers, or a second container sharing the application directory).
+    The lock is an flock on a file: it is released by the OS when the holding process dies.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or DEFAULT_PATH
+        self._file = None
+        self.logger = logging.getLogger(__name__)
+
+    def acquire(self) -> bool:
+        """Try to take the lock without waiting, True if this process now holds it"""
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
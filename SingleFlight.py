@@ -0,0 +1,74 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls doing the same thing into one.
+    The first caller for a key runs the function, callers arriving while it runs wait for it and get the same result
+    (or the same exception) instead of making their own upstream call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, function, join: tuple = ()):
+        """
+        :param key: what the call does, concurrent calls with the same key are coalesced
+        :param function: callable without arguments doing the call
+        :param join: other keys whose call in flight is as good as this one (e.g. a forced refresh for a cached read)
+        :return: the function's result, shared with the callers that joined it
+        """
+        with self._lock:
+            call = None
+            for candidate in (key,) + tuple(join):
+                call = self._calls.get(candidate)
+                if call is not None:
+                    break
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                call.shared += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> list:
+        with self._lock:
+            return list(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": list(self._calls),
+            }
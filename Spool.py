@@ -0,0 +1,271 @@
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+import Storage
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, a spool file is then only safe for one process
+    fcntl = None
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".spool.jsonl")
+
+
+class Spool:
+    """
+    Write-behind buffer for rows that must not be lost when the database is unavailable.
+    Role:
+    - append() writes the rows to an append-only file (one JSON record per line, fsync'd) and returns at once
+    - a background thread writes them to the database in batched transactions, retrying with backoff while it
+      is down
+    - replay is idempotent: every record has a sequence number, and the last one written is saved in the
+      'spool_state' table in the same transaction as the rows. Records up to it are skipped when the file is read
+      again after a restart.
+    The file is emptied whenever everything in it has been written. Records that can't be written (constraint, bad
+    value) are moved to <path>.rejected instead of blocking the spool.
+    Each process holds an exclusive lock on its spool file: when <path> is taken by another process it uses
+    <path>.1, <path>.2... with the watermarks <name>.1, <name>.2..., so processes never replay, truncate or number
+    the records of another one. A file left behind is replayed by the next process that takes it.
+    """
+
+    def __init__(self, path: str, storage: Storage.Storage, apply, name: str = "db", batch_size: int = 500,
+                 flush_delay: float = 0.2, max_retry_delay: float = 300):
+        """
+        :param path: spool file, created if needed (or <path>.<n> if another process holds it)
+        :param storage: database the records are written to
+        :param apply: apply(cursor, records) writes records (dicts with "seq", "kind" and "row") in the transaction
+        :param name: key of the watermark in 'spool_state', one per spool file
+        :param batch_size: maximum records per transaction
+        :param flush_delay: seconds to wait after an append, so that the records of a burst share a transaction
+        :param max_retry_delay: longest wait between two attempts while the database is unavailable
+        """
+        self.storage = storage
+        self.apply = apply
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.max_retry_delay = max_retry_delay
+        self.logger = logging.getLogger(__name__)
+
+        self._state_sql = storage.upsert_sql("spool_state", ("name", "seq", "unix_timestamp"), ("name",),
+                                             update=("seq", "unix_timestamp"))
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._closing = threading.Event()
+        self._stats = {"flushed_records": 0, "flushed_batches": 0, "flush_errors": 0, "rejected_records": 0,
+                       "last_error": None, "last_flush_at": None}
+
+        self.path, self.name, self._lock_file = self._claim(path, name)
+        self._written_seq = self._read_written_seq()
+        self._pending = self._load()
+        self._seq = max([self._written_seq] + [record["seq"] for record in self._pending])
+        if self._pending:
+            self.logger.info(f"Replaying {len(self._pending)} spooled records from {self.path}")
+        self._file = open(self.path, "ab")
+        if not self._pending:
+            self._file.truncate(0)
+
+        self._thread = threading.Thread(target=self._run, name="spool-flusher", daemon=True)
+        self._thread.start()
+        self._wakeup.set()
+
+    def _claim(self, path: str, name: str) -> tuple:
+        """
+        Lock the first spool file no other process holds
+        :return: (spool file, watermark name, open lock file or None without fcntl)
+        """
+        if fcntl is None:
+            return path, name, None
+        number = 0
+        while True:
+            slot_path, slot_name = (path, name) if number == 0 else (f"{path}.{number}", f"{name}.{number}")
+            lock_file = open(slot_path + ".lock", "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                number += 1
+                continue
+            if number:
+                self.logger.info(f"{path} is used by another process, spooling to {slot_path}")
+            return slot_path, slot_name, lock_file
+
+    def _read_written_seq(self) -> int:
+        with self.storage.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT seq FROM spool_state WHERE name = %s", (self.name,))
+            row = cur.fetchone()
+        return row[0] if row else 0
+
+    def _load(self) -> list:
+        """Records of the spool file that are not in the database yet"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # the process stopped in the middle of an append: that record was never acknowledged
+            self.logger.warning(f"Dropping an incomplete record at the end of {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.logger.error(f"Skipping an unreadable record in {self.path}: {line[:200]!r}")
+                continue
+            if record["seq"] > self._written_seq:
+                records.append(record)
+        return records
+
+    def append(self, kind: str, rows: list) -> int:
+        """
+        Durably spool rows of one kind, in a single fsync
+        :return: sequence number of the last row
+        """
+        with self._lock:
+            if self._closing.is_set():
+                raise RuntimeError("Spool is closed")
+            lines = []
+            for row in rows:
+                self._seq += 1
+                lines.append(json.dumps({"seq": self._seq, "kind": kind, "row": row}, default=str,
+                                        separators=(",", ":")))
+            # keep the records as a replay reads them back, so that the database gets the same values either way
+            records = [json.loads(line) for line in lines]
+            data = "".join(line + "\n" for line in lines).encode("utf-8")
+            position = os.fstat(self._file.fileno()).st_size
+            try:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                # don't leave half a record behind for the next append
+                self._seq -= len(records)
+                self._file.truncate(position)
+                raise
+            self._pending.extend(records)
+        self._wakeup.set()
+        return self._seq
+
+    def pending(self) -> list:
+        """Records not written to the database yet"""
+        with self._lock:
+            return list(self._pending)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every record appended so far is written to the database
+        :return: False if the timeout expired first
+        """
+        self._wakeup.set()
+        with self._drained:
+            return self._drained.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def _run(self):
+        retry_delay = 0
+        while True:
+            self._wakeup.wait()
+            if self._closing.wait(retry_delay or self.flush_delay) and retry_delay:
+                break
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+                if not batch:
+                    self._wakeup.clear()
+                    if self._closing.is_set():
+                        break
+                    continue
+
+            try:
+                self._write(batch)
+            except Exception as e:
+                if self._is_record_error(e):
+                    batch = self._write_one_by_one(batch)
+                    retry_delay = 0
+                else:
+                    retry_delay = min(max(1, retry_delay * 2), self.max_retry_delay)
+                    with self._lock:
+                        self._stats["flush_errors"] += 1
+                        self._stats["last_error"] = repr(e)
+                    self.logger.warning(f"Could not write {len(self._pending)} spooled records to the database, "
+                                        f"retrying in {retry_delay}s: {e!r}")
+                    if self._closing.is_set():
+                        break
+                    continue
+            retry_delay = 0
+            self._done(batch)
+
+    def _is_record_error(self, exception: Exception) -> bool:
+        """True if the records are at fault (rejected by the database, not understood by apply), not the database"""
+        return isinstance(exception, (ValueError, TypeError, LookupError)) or self.storage.is_data_error(exception)
+
+    def _write(self, records: list, apply: bool = True):
+        """Write the records and move the watermark past them, in one transaction"""
+        def write(cur):
+            if apply:
+                self.apply(cur, records)
+            cur.execute(self._state_sql, (self.name, records[-1]["seq"], int(time.time())))
+        self.storage.write(write)
+
+    def _write_one_by_one(self, batch: list) -> list:
+        """
+        Write a batch the database refused record by record, setting aside the ones it rejects
+        :return: the records that are done (written or rejected)
+        """
+        for index, record in enumerate(batch):
+            try:
+                self._write([record])
+                continue
+            except Exception as e:
+                if not self._is_record_error(e):
+                    return batch[:index]
+                error = e
+            self.logger.error(f"Could not write spooled record {record['seq']} ({record['kind']}), "
+                              f"moving it to {self.path}.rejected: {error!r}")
+            with open(self.path + ".rejected", "a", encoding="utf-8") as f:
+                f.write(json.dumps({**record, "error": repr(error)}, default=str) + "\n")
+            try:
+                self._write([record], apply=False)
+            except Exception:
+                return batch[:index]
+            with self._lock:
+                self._stats["rejected_records"] += 1
+        return batch
+
+    def _done(self, batch: list):
+        if not batch:
+            return
+        with self._lock:
+            del self._pending[:len(batch)]
+            self._written_seq = batch[-1]["seq"]
+            self._stats["flushed_records"] += len(batch)
+            self._stats["flushed_batches"] += 1
+            self._stats["last_flush_at"] = str(datetime.datetime.now())
+            if not self._pending:
+                # everything up to the watermark is in the database: start the file over
+                self._file.truncate(0)
+                self._drained.notify_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"path": self.path, "pending_records": len(self._pending), "last_seq": self._seq,
+                    "written_seq": self._written_seq, **self._stats}
+
+    def close(self, timeout: float = 10):
+        """Write what is pending if the database allows it within timeout; what is left is replayed on next start"""
+        self._closing.set()
+        self._wakeup.set()
+        self._thread.join(timeout=timeout)
+        with self._lock:
+            self._file.close()
+            if self._lock_file is not None:
+                self._lock_file.close()  # releases the lock
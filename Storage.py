@@ -0,0 +1,430 @@
+import abc
+import datetime
+import functools
+import glob
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from ConnectionPool import ConnectionPool
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db")
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tracker.db")
+
+
+def create_storage():
+    """
+    Storage backend chosen from the environment: UVO_DB_BACKEND=mysql (the default) or sqlite.
+    SQLite has to be asked for, so that a MySQL deployment with a missing variable fails instead of writing to a new
+    local database.
+    """
+    backend = os.environ.get("UVO_DB_BACKEND", "mysql").lower()
+    if backend == "sqlite":
+        return SQLiteStorage(os.environ.get("UVO_DB_PATH") or DEFAULT_SQLITE_PATH)
+    if backend != "mysql":
+        raise NameError(f"Unknown UVO_DB_BACKEND {backend!r}, use mysql or sqlite")
+
+    db_host = os.environ.get("UVO_DB_HOST")
+    db_user = os.environ.get("UVO_DB_USER")
+    db_database = os.environ.get("UVO_DB_NAME")
+    if not (db_host and db_user and db_database):
+        raise NameError("Required database environment variables (UVO_DB_HOST, UVO_DB_USER, UVO_DB_NAME) are not set, "
+                        "or set UVO_DB_BACKEND=sqlite to use a local SQLite database")
+    return MySQLStorage(
+        host=db_host,
+        port=int(os.environ.get("UVO_DB_PORT", 3306)),
+        user=db_user,
+        password=os.environ.get("UVO_DB_PASSWORD"),
+        database=db_database,
+        pool_size=int(os.environ.get("UVO_DB_POOL_SIZE", 5)),
+        pool_timeout=float(os.environ.get("UVO_DB_POOL_TIMEOUT", 10)),
+        ping_interval=float(os.environ.get("UVO_DB_POOL_PING_INTERVAL", 60)),
+        max_lifetime=float(os.environ.get("UVO_DB_POOL_MAX_LIFETIME", 3600)),
+    )
+
+
+class Storage(abc.ABC):
+    """
+    Database backend used by DatabaseClient.
+    Role:
+    - hand out connections for reads (connection()) and run writes in a transaction (write())
+    - create and migrate the schema of its dialect
+    - build the statements whose syntax differs between dialects (upserts, insert-or-get-id)
+    Statements use %s placeholders whatever the backend.
+    """
+    name = None
+    migrations_dir = None
+
+    @abc.abstractmethod
+    def connection(self):
+        """Context manager yielding a connection for reading, its cursors accept %s placeholders"""
+
+    @abc.abstractmethod
+    def write(self, function):
+        """
+        Run function(cursor) in a transaction, committed if it returns, rolled back if it raises
+        :return: what function returned
+        """
+
+    @abc.abstractmethod
+    def upsert_sql(self, table: str, columns: tuple, keys: tuple, update: tuple = ()) -> str:
+        """
+        INSERT statement for one row of columns that, when a row with the same keys exists, updates the update
+        columns, or leaves the existing row untouched (0 affected rows) if there are none
+        """
+
+    @abc.abstractmethod
+    def insert_or_get_id(self, cursor, table: str, columns: tuple, values: tuple, key: str) -> tuple:
+        """
+        Insert a row unless one with the same (unique) key exists
+        :return: (id of the new or existing row, True if it was inserted)
+        """
+
+    @abc.abstractmethod
+    def stats(self) -> dict:
+        """Pool and connection counters of the backend"""
+
+    def is_data_error(self, exception: Exception) -> bool:
+        """True if a write failed because of the rows themselves (constraint, bad value), not the database"""
+        return False
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _execute_script(cur, script: str):
+        """
+        Split a SQL script by semicolons and execute each non-empty statement,
+        skipping comments and any transaction control statements.
+        """
+        script = "\n".join(line for line in script.splitlines() if not line.strip().startswith("--"))
+        for statement in script.split(';'):
+            statement = statement.strip()
+            if statement and not (statement.upper().startswith("START TRANSACTION") or statement.upper().startswith("COMMIT")):
+                cur.execute(statement)
+
+    def get_migrations(self) -> list:
+        """Return the (version, path) of every migration script of this backend, ordered by version"""
+        migrations = []
+        for path in glob.glob(os.path.join(self.migrations_dir, "*.sql")):
+            match = re.match(r"(\d+)_", os.path.basename(path))
+            if match:
+                migrations.append((int(match.group(1)), path))
+        return sorted(migrations)
+
+    def _apply_migrations(self, cur, current_version: int) -> int:
+        for version, path in self.get_migrations():
+            if version <= current_version:
+                continue
+            logging.info(f"Migrating {self.name} database schema to version {version} ({os.path.basename(path)})")
+            with open(path, "r", encoding="utf-8") as f:
+                self._execute_script(cur, f.read())
+            cur.execute("INSERT INTO schema_version(version, applied_at) VALUES(%s, %s)",
+                        (version, str(datetime.datetime.now())))
+            current_version = version
+        return current_version
+
+
+class MySQLStorage(Storage):
+    """MySQL/MariaDB through PyMySQL, with pooled connections"""
+    name = "mysql"
+    migrations_dir = os.path.join(SCHEMA_DIR, "migrations")
+
+    def __init__(self, host: str, port: int, user: str, password: str, database: str, pool_size: int = 5,
+                 pool_timeout: float = 10, ping_interval: float = 60, max_lifetime: float = 3600):
+        self.db_host = host
+        self.db_port = port
+        self.db_user = user
+        self.db_password = password
+        self.db_database = database
+        self._local = threading.local()
+
+        # Connections are pooled and shared by the Flask handlers and the scheduler jobs,
+        # so that we don't pay a TCP+auth handshake for every query.
+        self.pool = ConnectionPool(
+            self.create_connection,
+            max_size=pool_size,
+            timeout=pool_timeout,
+            ping_interval=ping_interval,
+            max_lifetime=max_lifetime,
+        )
+
+    def create_connection(self):
+        """Create and return a new connection to the MySQL/MariaDB database."""
+        import pymysql
+
+        try:
+            conn = pymysql.connect(
+                host=self.db_host,
+                port=self.db_port,
+                user=self.db_user,
+                password=self.db_password,
+                db=self.db_database,
+                charset='utf8mb4',
+                autocommit=True
+            )
+            return conn
+        except pymysql.MySQLError as e:
+            logging.exception("Error connecting to MySQL/MariaDB: " + str(e))
+            raise
+
+    @contextmanager
+    def connection(self):
+        with self.pool.connection() as conn:
+            yield conn
+
+    def write(self, function):
+        with self.pool.connection() as conn:
+            if getattr(self._local, "in_write", False):
+                # nested in another write of this thread: part of its transaction
+                return function(conn.cursor())
+            self._local.in_write = True
+            conn.begin()
+            try:
+                result = function(conn.cursor())
+                conn.commit()
+                return result
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._local.in_write = False
+
+    def migrate(self):
+        """
+        Versioned schema management.
+        Version 1 is the original db_schema.sql; every db/migrations/NNN_*.sql script upgrades the
+        schema to version NNN. Applied versions are recorded in the 'schema_version' table so that
+        existing databases are upgraded automatically on startup.
+        """
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute('''CREATE TABLE IF NOT EXISTS `schema_version` (
+                `version` INT NOT NULL PRIMARY KEY,
+                `applied_at` VARCHAR(255)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4''')
+            cur.execute("SELECT MAX(version) FROM schema_version")
+            current_version = cur.fetchone()[0] or 0
+
+            if current_version == 0:
+                # Check if the schema is initialized (e.g., if the 'log' table exists)
+                cur.execute("SHOW TABLES LIKE 'log'")
+                if cur.fetchone() is None:
+                    logging.info("Database schema not found. Initializing schema.")
+                    with open(os.path.join(SCHEMA_DIR, "db_schema.sql"), "r", encoding="utf-8") as f:
+                        self._execute_script(cur, f.read())
+                    logging.info("Database schema created successfully.")
+                cur.execute("INSERT INTO schema_version(version, applied_at) VALUES(%s, %s)",
+                            (1, str(datetime.datetime.now())))
+                current_version = 1
+
+            # MySQL DDL commits implicitly: each migration is applied and recorded on its own
+            current_version = self._apply_migrations(cur, current_version)
+            logging.info(f"Database schema is at version {current_version}")
+
+    def upsert_sql(self, table: str, columns: tuple, keys: tuple, update: tuple = ()) -> str:
+        if update:
+            on_duplicate = ", ".join(f"{column} = VALUES({column})" for column in update)
+        else:
+            on_duplicate = f"{keys[0]} = {keys[0]}"
+        return (f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join(['%s'] * len(columns))}) "
+                f"ON DUPLICATE KEY UPDATE {on_duplicate}")
+
+    def insert_or_get_id(self, cursor, table: str, columns: tuple, values: tuple, key: str) -> tuple:
+        # LAST_INSERT_ID(id) makes lastrowid return the existing row's id for a duplicate
+        cursor.execute(f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join(['%s'] * len(columns))}) "
+                       f"ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)", values)
+        return cursor.lastrowid, cursor.rowcount == 1
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self.pool.stats()}
+
+    def is_data_error(self, exception: Exception) -> bool:
+        import pymysql
+        return isinstance(exception, (pymysql.err.IntegrityError, pymysql.err.DataError))
+
+    def close(self):
+        self.pool.close_all()
+
+
+@functools.lru_cache(maxsize=512)
+def _qmark(sql: str) -> str:
+    return sql.replace("%s", "?")
+
+
+class _SQLiteCursor:
+    """sqlite3 cursor taking %s placeholders, like the PyMySQL one"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, sql: str, params=()):
+        return self._cursor.execute(_qmark(sql), params or ())
+
+    def executemany(self, sql: str, rows):
+        return self._cursor.executemany(_qmark(sql), rows)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _SQLiteReadConnection:
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self):
+        return _SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        pass
+
+
+class SQLiteStorage(Storage):
+    """
+    Local SQLite database file, in WAL mode: readers never block the writer nor each other.
+    Every write runs on a single writer thread with its own connection, so writes never contend for the database
+    lock, and each thread reads on its own connection. Statements are kept as constant strings, so that sqlite3's
+    per connection statement cache reuses them prepared.
+    """
+    name = "sqlite"
+    migrations_dir = os.path.join(SCHEMA_DIR, "sqlite")
+
+    def __init__(self, path: str, busy_timeout: float = 10, cached_statements: int = 256):
+        """
+        :param path: database file, created if needed
+        :param busy_timeout: seconds a connection waits for a lock (e.g. a checkpoint) before failing
+        :param cached_statements: prepared statements kept per connection
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {"writes": 0, "write_errors": 0, "write_wait_time_total_ms": 0.0, "write_wait_time_max_ms": 0.0}
+        self._writer_cursor = None
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # with WAL, NORMAL only syncs at checkpoints: a power loss may lose the last commits, never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write_loop(self):
+        conn = self._connect()
+        self._writer_cursor = _SQLiteCursor(conn.cursor())
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            function, future, queued_at = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            waited_ms = (time.monotonic() - queued_at) * 1000
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                result = function(self._writer_cursor)
+                conn.execute("COMMIT")
+            except BaseException as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self._bump(waited_ms, error=True)
+                future.set_exception(e)
+            else:
+                self._bump(waited_ms)
+                future.set_result(result)
+        conn.close()
+
+    def _bump(self, waited_ms: float, error: bool = False):
+        with self._stats_lock:
+            self._stats["writes"] += 1
+            if error:
+                self._stats["write_errors"] += 1
+            self._stats["write_wait_time_total_ms"] += waited_ms
+            self._stats["write_wait_time_max_ms"] = max(self._stats["write_wait_time_max_ms"], waited_ms)
+
+    def write(self, function):
+        if threading.current_thread() is self._writer:
+            # nested in another write: part of its transaction
+            return function(self._writer_cursor)
+        future = Future()
+        self._queue.put((function, future, time.monotonic()))
+        return future.result()
+
+    @contextmanager
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            with self._readers_lock:
+                self._readers.append(conn)
+        yield _SQLiteReadConnection(conn)
+
+    def migrate(self):
+        """
+        Versioned schema management, see MySQLStorage.migrate(). The first db/sqlite script creates the whole
+        schema at the version the MySQL one had then; later scripts mirror the MySQL migrations of the same number.
+        """
+        def migrate(cur):
+            cur.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER NOT NULL PRIMARY KEY,
+                applied_at TEXT
+            )''')
+            cur.execute("SELECT MAX(version) FROM schema_version")
+            return self._apply_migrations(cur, cur.fetchone()[0] or 0)
+
+        current_version = self.write(migrate)
+        logging.info(f"Database schema is at version {current_version} ({self.path})")
+
+    def upsert_sql(self, table: str, columns: tuple, keys: tuple, update: tuple = ()) -> str:
+        if update:
+            on_conflict = "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in update)
+        else:
+            on_conflict = "DO NOTHING"
+        return (f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join(['%s'] * len(columns))}) "
+                f"ON CONFLICT({', '.join(keys)}) {on_conflict}")
+
+    def insert_or_get_id(self, cursor, table: str, columns: tuple, values: tuple, key: str) -> tuple:
+        cursor.execute(self.upsert_sql(table, columns, (key,)), values)
+        if cursor.rowcount == 1:
+            return cursor.lastrowid, True
+        cursor.execute(f"SELECT id FROM {table} WHERE {key} = %s", (values[columns.index(key)],))
+        return cursor.fetchone()[0], False
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            result = dict(self._stats)
+        result["backend"] = self.name
+        result["path"] = self.path
+        result["write_queue"] = self._queue.qsize()
+        result["readers"] = len(self._readers)
+        result["write_wait_time_avg_ms"] = round(result["write_wait_time_total_ms"] / result["writes"], 2) \
+            if result["writes"] else 0.0
+        result["write_wait_time_total_ms"] = round(result["write_wait_time_total_ms"], 2)
+        result["write_wait_time_max_ms"] = round(result["write_wait_time_max_ms"], 2)
+        return result
+
+    def is_data_error(self, exception: Exception) -> bool:
+        return isinstance(exception, (sqlite3.IntegrityError, sqlite3.DataError, sqlite3.InterfaceError))
+
+    def close(self):
+        """Stop the writer thread once the queued writes are done, and close the read connections"""
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
@@ -0,0 +1,135 @@
+import base64
+import datetime
+import json
+import logging
+import os
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from hyundai_kia_connect_api import Token, Vehicle
+from hyundai_kia_connect_api.const import ENGINE_TYPES
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".token_store")
+FORMAT_VERSION = 1
+KDF_ITERATIONS = 200_000
+
+
+class TokenStore:
+    """
+    Encrypted on-disk store for the API token and the vehicle list, so that a restart does not need to log in again.
+    The file is encrypted with Fernet, using UVO_TOKEN_STORE_KEY if set (a key created with Fernet.generate_key()),
+    or a key derived from the account password otherwise.
+    The password itself is never written to the file.
+    """
+
+    def __init__(self, path: str = None, secret: str = None, key: str = None):
+        """
+        :param path: location of the store file
+        :param secret: secret to derive the key from (usually the account password), ignored if key is set
+        :param key: urlsafe base64 encoded Fernet key
+        """
+        self.path = path or DEFAULT_PATH
+        self.secret = secret
+        self.key = key
+        self.logger = logging.getLogger(__name__)
+
+    def _fernet(self, salt: bytes) -> Fernet:
+        if self.key:
+            return Fernet(self.key)
+        if not self.secret:
+            raise ValueError("TokenStore needs either a key or a secret")
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=KDF_ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(kdf.derive(self.secret.encode("utf-8"))))
+
+    def load(self, username: str):
+        """
+        Load the stored token and vehicles.
+        :param username: the stored entry is ignored if it belongs to another account
+        :return: (Token, list of Vehicle), or (None, []) if there is nothing usable stored
+        """
+        if not os.path.exists(self.path):
+            return None, []
+        try:
+            with open(self.path, "r") as f:
+                envelope = json.load(f)
+            if envelope.get("version") != FORMAT_VERSION:
+                return None, []
+            fernet = self._fernet(base64.b64decode(envelope["salt"]))
+            data = json.loads(fernet.decrypt(envelope["data"].encode("ascii")))
+        except (InvalidToken, ValueError, KeyError, OSError) as e:
+            self.logger.warning(f"Ignoring unreadable token store {self.path}: {e!r}")
+            return None, []
+
+        if data["token"].get("username") != username:
+            self.logger.info("Stored token belongs to a different account, ignoring it")
+            return None, []
+        token = Token.from_dict(data["token"])
+        vehicles = [self._vehicle_from_dict(v) for v in data.get("vehicles", [])]
+        return token, vehicles
+
+    def save(self, token: Token, vehicles: list = None):
+        """Encrypt and write the token (without the password) and vehicle descriptors, replacing the file atomically"""
+        token_data = token.to_dict()
+        token_data["password"] = None
+        data = {
+            "token": token_data,
+            "vehicles": [self._vehicle_to_dict(v) for v in vehicles or []],
+        }
+        salt = os.urandom(16)
+        envelope = {
+            "version": FORMAT_VERSION,
+            "salt": base64.b64encode(salt).decode("ascii"),
+            "saved_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "data": self._fernet(salt).encrypt(json.dumps(data).encode("utf-8")).decode("ascii"),
+        }
+
+        tmp_path = self.path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(envelope, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _vehicle_to_dict(vehicle: Vehicle) -> dict:
+        return {
+            "id": vehicle.id,
+            "name": vehicle.name,
+            "model": vehicle.model,
+            "registration_date": vehicle.registration_date,
+            "VIN": vehicle.VIN,
+            "engine_type": vehicle.engine_type.value if vehicle.engine_type else None,
+            "ccu_ccs2_protocol_support": vehicle.ccu_ccs2_protocol_support,
+        }
+
+    @staticmethod
+    def _vehicle_from_dict(data: dict) -> Vehicle:
+        return Vehicle(
+            id=data["id"],
+            name=data["name"],
+            model=data["model"],
+            registration_date=data["registration_date"],
+            VIN=data["VIN"],
+            engine_type=ENGINE_TYPES(data["engine_type"]) if data.get("engine_type") else None,
+            ccu_ccs2_protocol_support=data["ccu_ccs2_protocol_support"],
+        )
+
+
+def is_token_valid(token: Token, margin_seconds: int = 0) -> bool:
+    """True if the access token is still valid for at least margin_seconds"""
+    if token is None or not token.access_token or not isinstance(token.valid_until, datetime.datetime):
+        return False
+    valid_until = token.valid_until
+    if valid_until.tzinfo is None:
+        valid_until = valid_until.replace(tzinfo=datetime.timezone.utc)
+    # add the margin to now rather than subtract it from valid_until, which may be datetime.min
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return valid_until > now + datetime.timedelta(seconds=margin_seconds)
@@ -0,0 +1,134 @@
+import contextlib
+import functools
+import logging
+import os
+import threading
+
+from RequestBudget import endpoint_name
+
+try:
+    from opentelemetry import trace
+except ImportError:  # tracing is optional: pip install opentelemetry-sdk
+    trace = None
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl")
+SERVICE_NAME = "kia-hyundai-tracker"
+
+logger = logging.getLogger(__name__)
+
+# None while tracing is disabled: every helper below then returns at once
+_tracer = None
+_configure_lock = threading.Lock()
+_configured = False
+_NOOP = contextlib.nullcontext()
+
+
+def configure():
+    """
+    Enable tracing according to UVO_TRACING (only the first call does something):
+    - "file": spans are appended as JSON lines to UVO_TRACING_FILE (default: traces.jsonl in the application directory)
+    - "otlp": spans are sent to an OpenTelemetry collector, configured by the standard OTEL_EXPORTER_OTLP_* variables
+    - anything else: disabled
+    Spans are exported in the background by a batch processor.
+    :return: True if tracing is enabled
+    """
+    global _tracer, _configured
+    with _configure_lock:
+        if _configured:
+            return _tracer is not None
+        _configured = True
+
+        mode = os.getenv("UVO_TRACING", "").lower()
+        if mode not in ("file", "otlp"):
+            return False
+        if trace is None:
+            logger.warning("UVO_TRACING is set but opentelemetry-sdk is not installed, tracing is disabled")
+            return False
+
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        try:
+            if mode == "otlp":
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                exporter = OTLPSpanExporter()
+            else:
+                from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+                path = os.getenv("UVO_TRACING_FILE") or DEFAULT_FILE
+                exporter = ConsoleSpanExporter(out=open(path, "a", encoding="utf-8"),
+                                               formatter=lambda span: span.to_json(indent=None) + "\n")
+        except ImportError:
+            logger.warning("opentelemetry-exporter-otlp-proto-http is not installed, tracing is disabled")
+            return False
+
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _tracer = trace.get_tracer(__name__)
+        logger.info(f"Tracing enabled ({mode})")
+        return True
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attributes):
+    """Context manager running its block in a new span (a shared no-op when tracing is disabled)"""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.start_as_current_span(name, attributes=attributes or None)
+
+
+def set_attribute(key: str, value):
+    """Set an attribute on the current span"""
+    if _tracer is None:
+        return
+    trace.get_current_span().set_attribute(key, value)
+
+
+def traced(name: str):
+    """Decorator running every call of the function in a span called name"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.start_as_current_span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument(obj, prefix: str, method_names):
+    """
+    Wrap methods of an object (e.g. the API client) in spans called prefix + method name.
+    Does nothing when tracing is disabled, so that the methods are left untouched.
+    """
+    if _tracer is None:
+        return
+    for method_name in method_names:
+        method = getattr(obj, method_name, None)
+        if method is not None:
+            setattr(obj, method_name, traced(prefix + method_name)(method))
+
+
+def http_middleware(method: str, url: str, send):
+    """
+    Request middleware for KiaUvoApiEU.add_request_middleware(): one client span per HTTP request,
+    with the endpoint, the HTTP status and the size of the response
+    """
+    if _tracer is None:
+        return send()
+    endpoint = endpoint_name(method, url)
+    with _tracer.start_as_current_span(f"HTTP {endpoint}", kind=trace.SpanKind.CLIENT,
+                                       attributes={"http.request.method": method.upper(),
+                                                   "uvo.endpoint": endpoint}) as current:
+        response = send()
+        current.set_attribute("http.response.status_code", response.status_code)
+        length = response.headers.get("Content-Length")
+        current.set_attribute("http.response.body.size", int(length) if length else len(response.content))
+        if response.status_code >= 400:
+            current.set_status(trace.Status(trace.StatusCode.ERROR))
+        return response
@@ -1,6 +1,9 @@
 import datetime
 import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
 from enum import Enum
 
 from dateutil.relativedelta import relativedelta
@@ -15,10 +18,27 @@ from hyundai_kia_connect_api import Vehicle, VehicleManager
 from custom_hyundai_kia_connect_api.KiaUvoApiEU import KiaUvoApiEU
 from hyundai_kia_connect_api.exceptions import RateLimitingError, APIError, RequestTimeoutError, AuthenticationError
 from Logger import Logger
+from SingleFlight import SingleFlight
+from Metrics import ApiMetricsMiddleware, API_ERRORS, API_RETRIES
+import Tracing
+from Tracing import traced
+from RequestBudget import RequestBudget, BudgetExceededError
+from TokenStore import TokenStore, is_token_valid
 
 # Configure logger
 logger = Logger.get_logger(__name__)
 
+# KiaUvoApiEU methods making HTTP calls, traced as api.<method> when tracing is enabled
+TRACED_API_METHODS = (
+    "login", "refresh_access_token", "get_vehicles", "update_vehicle_with_cached_state", "force_refresh_vehicle_state",
+    "_get_cached_vehicle_state", "_get_location", "_get_forced_vehicle_state", "_get_charge_limits", "_get_trip_info",
+    "update_month_trip_info", "update_day_trip_info", "_get_driving_info", "charge_port_action", "valet_mode_action",
+    "start_charge", "stop_charge", "check_action_status", "_get_control_token",
+)
+
+_API_ERRORS = {kind: API_ERRORS.labels(kind) for kind in (
+    "token_expired", "authentication", "budget_exceeded", "rate_limited", "vehicle_timeout", "api_error", "other")}
+
 
 class ChargeType(Enum):
     DC = "DC"
@@ -32,12 +52,15 @@ class VehicleClient:
     Role:
     - store data into database
     - handle additional (calculated) attributes that the API does not provide
+    The HTTP server and the scheduler share one instance: operations that call the API or change the vehicle state
+    run one at a time (locked()), and concurrent identical ones are coalesced into a single API call (single_flight).
     """
 
     def __init__(self):
 
         # load env vars from .env file
         load_dotenv()
+        Tracing.configure()
 
         self.db_client = DatabaseClient(self)
 
@@ -49,6 +72,13 @@ class VehicleClient:
         self.trips = None  # vehicle trips. better motel than the one in the library
         self.logger = Logger.get_logger(__name__)
 
+        self.lock = threading.RLock()
+        self.single_flight = SingleFlight()
+        self._local = threading.local()
+        self._token_refreshed_at = None  # time.monotonic() of the last token refresh
+        # called with get_state() every time save_log() persisted the vehicle state
+        self.state_listeners = []
+
         # interval in seconds between checks for cached requests
         # we are limited to 200 requests a day, including cached
         # that's about one every 8 minutes
@@ -61,9 +91,23 @@ class VehicleClient:
         self.DC_CHARGE_FORCE_REFRESH_INTERVAL = 1800
         self.AC_CHARGE_FORCE_REFRESH_INTERVAL = 1800
 
+        # when DC charging gets close to a point where the charging power drops (see get_estimated_charging_power),
+        # poll more often to catch the taper
+        self.DC_CHARGE_TAPER_SOC_STEPS = (27, 40, 55, 75, 80, 90, 95)
+        self.DC_CHARGE_TAPER_SOC_MARGIN = 5
+        self.DC_CHARGE_TAPER_REFRESH_INTERVAL = 300
+
         # Maximum number of retries for API calls
         self.MAX_API_RETRIES = 1
 
+        # Refresh the access token this many seconds before it expires
+        self.TOKEN_REFRESH_MARGIN = 300
+        # A "token expired" error this soon after a refresh comes from a request made with the previous token
+        self.TOKEN_REFRESH_GRACE = 30
+
+        # Ledger of the API calls made in the last 24h, only available with the direct API
+        self.request_budget = None
+
         # Use direct KiaUvoApiEU to bypass VehicleManager initialization issues
         use_direct_api = os.getenv("UVO_USE_DIRECT_API", "True").lower() in ("true", "1", "yes")
         
@@ -73,14 +117,59 @@ class VehicleClient:
             self._init_vehicle_manager()
 
     def _init_direct_api(self):
-        """Initialize using direct KiaUvoApiEU to bypass authentication issues"""
-        self.api = KiaUvoApiEU(region=1, brand=1, language="en")
-        self.token = self.api.login(os.environ["UVO_USERNAME"], os.environ["UVO_PASSWORD"])
-        
+        """
+        Initialize using direct KiaUvoApiEU to bypass authentication issues.
+        The token and vehicle list are reused from the token store when possible, so a restart usually needs no
+        API calls at all. An expired token is refreshed, and only if there is nothing stored do we log in.
+        """
+        self.api = KiaUvoApiEU(
+            region=1,
+            brand=1,
+            language="en",
+            timeout=(float(os.getenv("UVO_API_CONNECT_TIMEOUT", 10)), float(os.getenv("UVO_API_READ_TIMEOUT", 30))),
+            max_retries=int(os.getenv("UVO_API_MAX_RETRIES", 2)),
+            base_url=os.getenv("UVO_API_BASE_URL") or None,
+            parallel_requests=int(os.getenv("UVO_API_PARALLEL_REQUESTS", 4)),
+        )
+        self.request_budget = RequestBudget(
+            path=os.getenv("UVO_REQUEST_BUDGET_PATH"),
+            daily_limit=int(os.getenv("UVO_API_DAILY_LIMIT", 200)),
+            reserve=int(os.getenv("UVO_API_RESERVE", 20)),
+        )
+        self.api.add_request_middleware(self.request_budget.middleware)
+        # added after the budget, so that it only sees the calls the budget let through
+        self.api.add_request_middleware(ApiMetricsMiddleware())
+        self.api.add_request_middleware(Tracing.http_middleware)
+        Tracing.instrument(self.api, "api.", TRACED_API_METHODS)
+        self.token_store = self._create_token_store()
+
+        self.token, self.vehicles = None, []
+        if self.token_store:
+            self.token, self.vehicles = self.token_store.load(os.environ["UVO_USERNAME"])
+
+        if self.token is not None:
+            self.token.password = os.environ["UVO_PASSWORD"]
+            self.token.pin = os.getenv("UVO_PIN", "")
+            for vehicle in self.vehicles:
+                vehicle.timezone = self.api.data_timezone
+            if is_token_valid(self.token, self.TOKEN_REFRESH_MARGIN):
+                self.logger.info(f"Reusing stored token, valid until {self.token.valid_until}")
+            else:
+                self.logger.info("Stored token is about to expire, refreshing it")
+                try:
+                    self.token = self.api.refresh_access_token(self.token)
+                except Exception as e:
+                    self.logger.warning(f"Could not refresh the stored token, logging in again: {e!r}")
+                    self.token = None
+
+        if self.token is None:
+            self.token = self.api.login(os.environ["UVO_USERNAME"], os.environ["UVO_PASSWORD"], os.getenv("UVO_PIN", ""))
+
         if self.token is None:
             raise RuntimeError("KiaUvoApiEU.login() did not return a valid token. Check credentials!")
-            
-        self.vehicles = self.api.get_vehicles(self.token)
+
+        if not self.vehicles:
+            self.vehicles = self.api.get_vehicles(self.token)
         
         # Set up VehicleManager with working API and token
         self.vm = VehicleManager(
@@ -93,6 +182,82 @@ class VehicleClient:
         self.vm.api = self.api
         self.vm.token = self.token
         self.vm.vehicles = {v.id: v for v in self.vehicles}
+        self._save_token()
+
+    def _create_token_store(self):
+        if os.getenv("UVO_TOKEN_STORE", "True").lower() not in ("true", "1", "yes"):
+            return None
+        return TokenStore(
+            path=os.getenv("UVO_TOKEN_STORE_PATH"),
+            secret=os.environ["UVO_PASSWORD"],
+            key=os.getenv("UVO_TOKEN_STORE_KEY"),
+        )
+
+    def _save_token(self):
+        """Persist the current token and vehicle list, if the token store is enabled"""
+        if getattr(self, "token_store", None) is None or self.vm.token is None:
+            return
+        try:
+            self.token_store.save(self.vm.token, list(self.vm.vehicles.values()))
+        except Exception as e:
+            self.logger.warning(f"Could not save token store: {e!r}")
+
+    @contextmanager
+    def locked(self):
+        """Hold the client lock: use it around anything reading or changing the vehicle state or the token"""
+        with self.lock:
+            self._local.depth = getattr(self._local, "depth", 0) + 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+
+    def _exclusive(self, key: str, function, join: tuple = ()):
+        """
+        Run an operation under the client lock, sharing the result of an identical operation already in flight.
+        Nested calls (from inside another operation) just run: the lock is already held.
+        """
+        if getattr(self._local, "depth", 0) > 0:
+            return function()
+
+        def run():
+            with self.locked():
+                return function()
+
+        return self.single_flight.do(key, run, join)
+
+    @traced("vehicle.check_and_refresh_token")
+    def check_and_refresh_token(self) -> bool:
+        """
+        vm.check_and_refresh_token(), but refresh the token a bit before it expires and persist it when it changed
+        """
+        return self._exclusive("token", self._check_and_refresh_token)
+
+    def _check_and_refresh_token(self) -> bool:
+        token = self.vm.token
+        if token is not None and not is_token_valid(token, self.TOKEN_REFRESH_MARGIN):
+            # make the library treat the token as expired, so it runs the refresh flow
+            self._expire_token(token)
+        result = self.vm.check_and_refresh_token()
+        if self.vm.token is not token or result:
+            self._token_refreshed_at = time.monotonic()
+            self._save_token()
+        return result
+
+    @staticmethod
+    def _day_trips_synced(synced_days: dict, day) -> bool:
+        """
+        True if the trips of the day were synced when the API reported the trip count it reports now
+        :param synced_days: dict yyyymmdd -> synced trip count, from get_trip_sync_state
+        :param day: DayTripCounts of the month trip info, a day without trip count is always fetched
+        """
+        return day.trip_count is not None and day.yyyymmdd in synced_days \
+            and synced_days[day.yyyymmdd] == day.trip_count
+
+    @staticmethod
+    def _expire_token(token) -> None:
+        """Mark the token as expired a second ago, a real timestamp that date arithmetic on it cannot overflow"""
+        token.valid_until = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)
 
     def _init_vehicle_manager(self):
         """Initialize using standard VehicleManager (fallback)"""
@@ -127,7 +292,7 @@ class VehicleClient:
         percent_remaining = 100 - self.vehicle.ev_battery_percentage
         kwh_remaining = estimated_niro_total_kwh_needed * percent_remaining / 100
 
-        print(f"Kilowatthours needed for full battery: {kwh_remaining} kWh")
+        self.logger.debug("Kilowatthours needed for full battery: %s kWh", kwh_remaining)
 
         # todo: there is a bug here: kwh_remaining does not take charge limits into account.
         #  however the "estimated charge time" provided by the car does.
@@ -186,7 +351,7 @@ class VehicleClient:
         else:
             self.charge_type = ChargeType.AC
 
-        print(f"Estimated charging power: {round(charging_power_in_kilowatts, 1)} kW")
+        self.logger.debug("Estimated charging power: %s kW", round(charging_power_in_kilowatts, 1))
         self.charging_power_in_kilowatts = round(charging_power_in_kilowatts, 1)
 
     def _convert_trip_time_to_datetime(self, day_date, trip_hhmmss):
@@ -207,7 +372,29 @@ class VehicleClient:
         except (ValueError, IndexError):
             return None
 
+    def trips_up_to_date(self, watermark: dict = None) -> bool:
+        """
+        True if the car has not moved since the last complete trip sync, and that sync ran on a later day than the
+        one the odometer was reached (trips of the current day are only fetched the day after).
+        Answered from the database only, without any API call.
+        """
+        if not self.vehicle or not self.vehicle.odometer:
+            return False
+        if watermark is None:
+            watermark = self.db_client.get_trip_sync_watermark()
+        if not watermark or not watermark["complete"] or watermark["odometer"] is None:
+            return False
+        if float(watermark["odometer"]) != float(self.vehicle.odometer):
+            return False
+        odometer_day = datetime.date.fromtimestamp(watermark["odometer_since"] or watermark["unix_timestamp"])
+        return datetime.date.fromtimestamp(watermark["unix_timestamp"]) > odometer_day
+
+    @traced("vehicle.process_trips")
     def process_trips(self):
+        """Get, process and save trip info, see _process_trips()"""
+        return self._exclusive("trips", self._process_trips)
+
+    def _process_trips(self):
         """
         Get, process and save trip info
         A trip contains the following data:
@@ -217,10 +404,18 @@ class VehicleClient:
         - distance
         - max speed
         - average speed
+        What was already fetched is kept as trip sync watermarks (per month and per day trip counts, odometer),
+        so that months and days that did not change are not fetched again, and nothing is fetched at all if the car
+        has not moved since the last complete sync.
         """
         if not self.vehicle.daily_stats:
             return
 
+        watermark = self.db_client.get_trip_sync_watermark()
+        if self.trips_up_to_date(watermark):
+            self.logger.info(f"Odometer unchanged since the last trip sync ({self.vehicle.odometer}), no new trips")
+            return
+
         # Meghatározzuk a legrégebbi és legújabb dátumot a daily_stats-ból
         dates = [stat.date for stat in self.vehicle.daily_stats]
         oldest_date = min(dates)
@@ -237,65 +432,133 @@ class VehicleClient:
 
 
         today = datetime.date.today()
+        now_unix = int(datetime.datetime.now().timestamp())
+        odometer = self.vehicle.odometer
+        # when this odometer value was first seen: its trips are only complete once synced on a later day
+        if watermark and watermark["odometer"] is not None and odometer is not None \
+                and float(watermark["odometer"]) == float(odometer) and watermark["odometer_since"]:
+            odometer_since = watermark["odometer_since"]
+        else:
+            odometer_since = now_unix
+
+        # Load what is already in the database once, instead of once per day and once per trip.
+        range_start = datetime.datetime.strptime(months_list[0], "%Y%m")
+        range_end = datetime.datetime.strptime(months_list[-1], "%Y%m") + relativedelta(months=1)
+        saved_trip_timestamps = self.db_client.get_saved_trip_timestamps(range_start, range_end)
+        most_recent_trip = self.db_client.get_most_recent_saved_trip_timestamp()
+        synced_months, synced_days = self.db_client.get_trip_sync_state(months_list)
+
         for yyyymm in months_list:
-            try:
-                self._retry_api_call(
-                    self.vm.update_month_trip_info, 
-                    self.vehicle.id, 
-                    yyyymm
-                )
-                self.logger.info(f"Successfully updated month trip info for {yyyymm}")
-            except Exception as e:
-                self.logger.error(f"Error updating month trip info for {yyyymm}: {str(e)}")
+            month_start = datetime.datetime.strptime(yyyymm, "%Y%m").date()
+            month_end = month_start + relativedelta(months=1)
+            synced_month = synced_months.get(yyyymm)
+            # a past month that was completely synced after it ended can't get new trips anymore
+            if synced_month and synced_month["complete"] and month_end <= today \
+                    and datetime.date.fromtimestamp(synced_month["unix_timestamp"]) >= month_end:
+                self.logger.info(f"Trips of {yyyymm} already synced, skipping")
                 continue
 
-            if self.vehicle.month_trip_info is not None:
-                for day in self.vehicle.month_trip_info.day_list:  # ordered on day
-                    # Skip current day's trips
-                    day_date = datetime.datetime.strptime(day.yyyymmdd, "%Y%m%d").date()
-                    if day_date == today:
+            self._retry_api_call(
+                self.vm.update_month_trip_info,
+                self.vehicle.id,
+                yyyymm
+            )
+            month_trip_info = self.vehicle.month_trip_info
+            if month_trip_info is None or month_trip_info.yyyymm != yyyymm:
+                self.logger.error(f"Error updating month trip info for {yyyymm}")
+                continue
+            self.logger.info(f"Successfully updated month trip info for {yyyymm}")
+
+            month_trip_count = sum(day.trip_count or 0 for day in month_trip_info.day_list)
+            month_distance = month_trip_info.summary.distance if month_trip_info.summary else None
+            if synced_month and synced_month["complete"] and synced_month["trip_count"] == month_trip_count \
+                    and synced_month["distance"] == month_distance:
+                self.logger.info(f"Trip counts and distance of {yyyymm} unchanged, no new trips")
+                self.db_client.save_trip_sync_month(yyyymm, month_trip_count, month_distance, True, odometer,
+                                                    odometer_since)
+                continue
+
+            # new trips of the month are written in one batch once every day has been processed
+            month_trips = []
+            month_days = []
+            complete = True
+
+            for day in month_trip_info.day_list:  # ordered on day
+                # Skip current day's trips, they are fetched tomorrow
+                day_date = datetime.datetime.strptime(day.yyyymmdd, "%Y%m%d").date()
+                if day_date == today:
+                    if day.trip_count:
+                        complete = False
+                    continue
+
+                if most_recent_trip is not None:
+                    if datetime.datetime.strptime(day.yyyymmdd, "%Y%m%d") < most_recent_trip:
                         continue
 
-                    most_recent_trip = self.db_client.get_most_recent_saved_trip_timestamp()
-                    if most_recent_trip is not None:
-                        if datetime.datetime.strptime(day.yyyymmdd, "%Y%m%d") < most_recent_trip:
+                if self._day_trips_synced(synced_days, day):
+                    continue
+
+                self._retry_api_call(
+                    self.vm.update_day_trip_info,
+                    self.vehicle.id,
+                    day.yyyymmdd
+                )
+                day_trip_info = self.vehicle.day_trip_info
+                if day_trip_info is None or day_trip_info.yyyymmdd != day.yyyymmdd:
+                    self.logger.error(f"Error updating day trip info for {day.yyyymmdd}")
+                    complete = False
+                    continue
+                self.logger.info(f"Successfully updated day trip info for {day.yyyymmdd}")
+
+                # process trips for this day
+                day_date = datetime.datetime.strptime(day_trip_info.yyyymmdd, "%Y%m%d")
+
+                trips_saved = 0
+                newest_trip_of_day = None
+                for trip in reversed(day_trip_info.trip_list):  # show oldest first
+                    trip_datetime = self._convert_trip_time_to_datetime(day_date, trip.hhmmss)
+
+                    # Skip trips that are older than or equal to the most recent saved trip
+                    if most_recent_trip and trip.hhmmss:
+                        if trip_datetime and trip_datetime <= most_recent_trip:
                             continue
 
-                    try:
-                        self._retry_api_call(
-                            self.vm.update_day_trip_info,
-                            self.vehicle.id,
-                            day.yyyymmdd
-                        )
-                        self.logger.info(f"Successfully updated day trip info for {day.yyyymmdd}")
-                    except Exception as e:
-                        self.logger.error(f"Error updating day trip info for {day.yyyymmdd}: {str(e)}")
-                        continue
+                    if trip_datetime:
+                        trip_unix_timestamp = int(trip_datetime.timestamp())
+                        if trip_unix_timestamp in saved_trip_timestamps:
+                            self.logger.debug("Trip already exists for timestamp %s, skipping...", trip_unix_timestamp)
+                            continue
+                        saved_trip_timestamps.add(trip_unix_timestamp)
+                        newest_trip_of_day = max(newest_trip_of_day or trip_datetime, trip_datetime)
+
+                    month_trips.append((day_date, trip))
+                    trips_saved += 1
 
-                    # process and save trips for this day
-                    if self.vehicle.day_trip_info is not None:
-                        day_date = datetime.datetime.strptime(self.vehicle.day_trip_info.yyyymmdd, "%Y%m%d")
-                        
-                        # Get the most recent saved trip timestamp to avoid duplicates
-                        most_recent_saved_trip = self.db_client.get_most_recent_saved_trip_timestamp()
-                        
-                        trips_saved = 0
-                        for trip in reversed(self.vehicle.day_trip_info.trip_list):  # show oldest first
-                            # Skip trips that are older than or equal to the most recent saved trip
-                            if most_recent_saved_trip and trip.hhmmss:
-                                trip_datetime = self._convert_trip_time_to_datetime(day_date, trip.hhmmss)
-                                if trip_datetime and trip_datetime <= most_recent_saved_trip:
-                                    continue
-                            
-                            self.db_client.save_trip(day_date, trip)
-                            trips_saved += 1
-                        
-                        if trips_saved > 0:
-                            self.logger.info(f"Saved {trips_saved} new trips for {day_date.strftime('%Y-%m-%d')}")
-                        else:
-                            self.logger.info(f"No new trips to save for {day_date.strftime('%Y-%m-%d')}")
+                # trips of this day now count as saved for the days that follow
+                if newest_trip_of_day and (most_recent_trip is None or newest_trip_of_day > most_recent_trip):
+                    most_recent_trip = newest_trip_of_day
+
+                month_days.append((day_date, trips_saved, day.yyyymmdd, day.trip_count))
+
+            self.db_client.save_trips(month_trips)
+
+            for day_date, trips_saved, yyyymmdd, trip_count in month_days:
+                # a day without trip count has nothing to compare with next time: it is fetched again
+                if trip_count is not None:
+                    self.db_client.save_trip_sync_day(yyyymmdd, trip_count)
+                if trips_saved > 0:
+                    self.logger.info(f"Saved {trips_saved} new trips for {day_date.strftime('%Y-%m-%d')}")
+                else:
+                    self.logger.info(f"No new trips to save for {day_date.strftime('%Y-%m-%d')}")
+
+            self.db_client.save_trip_sync_month(yyyymm, month_trip_count, month_distance, complete, odometer,
+                                                odometer_since)
 
     def save_log(self):
+        with self.locked():
+            self._save_log()
+
+    def _save_log(self):
         if not self.vehicle:
             self.logger.warning("save_log called without a valid vehicle; skipping")
             return
@@ -317,6 +580,30 @@ class VehicleClient:
 
         self.db_client.save_log()
 
+        if self.state_listeners:
+            state = self.get_state()
+            for listener in self.state_listeners:
+                try:
+                    listener(state)
+                except Exception as e:
+                    self.logger.error(f"Vehicle state listener failed: {str(e)}")
+
+    def get_state(self) -> dict:
+        """The main fields of the vehicle state, as saved by save_log()"""
+        vehicle = self.vehicle
+        return {
+            "battery_percentage": vehicle.ev_battery_percentage,
+            "accessory_battery_percentage": vehicle.car_battery_percentage,
+            "estimated_range_km": vehicle.ev_driving_range,
+            "charging": vehicle.ev_battery_is_charging,
+            "engine_is_running": vehicle.engine_is_running,
+            "rough_charging_power_estimate_kw": self.charging_power_in_kilowatts,
+            "latitude": vehicle.location_latitude,
+            "longitude": vehicle.location_longitude,
+            "odometer": vehicle.odometer,
+            "last_vehicule_update_timestamp": vehicle.last_updated_at.isoformat() if vehicle.last_updated_at else None,
+        }
+
     def _retry_api_call(self, api_function, *args, **kwargs):
         """
         Generic retry wrapper for API calls with token refresh capability
@@ -334,6 +621,8 @@ class VehicleClient:
                 should_retry = self.handle_api_exception(e)
                 if should_retry and retry_count < self.MAX_API_RETRIES:
                     retry_count += 1
+                    API_RETRIES.labels(operation_name).inc()
+                    Tracing.set_attribute("api.retry_count", retry_count)
                     self.logger.info(f"Retrying {operation_name} after token refresh (attempt {retry_count + 1})")
                     continue
                 else:
@@ -351,12 +640,19 @@ class VehicleClient:
         # authentication error: token expired, try to refresh
         if isinstance(exc, AuthenticationError):
             if "Token is expired" in str(exc):
+                _API_ERRORS["token_expired"].inc()
                 self.logger.warning("Token expired, attempting to refresh...")
                 try:
-                    # Reset token to force re-authentication
-                    self.vm.token = None
-                    # Force refresh to get new token
-                    self.vm.check_and_refresh_token()
+                    with self.locked():
+                        if self._token_refreshed_at is not None and \
+                                time.monotonic() - self._token_refreshed_at < self.TOKEN_REFRESH_GRACE:
+                            # another thread refreshed it while our request was in flight
+                            self.logger.info("Token was just refreshed by another request, retrying with it")
+                            return True
+                        # Mark the token as expired, so that it is refreshed (or a new login is done if there is none)
+                        if self.vm.token is not None:
+                            self._expire_token(self.vm.token)
+                        self.check_and_refresh_token()
                     self.logger.info("Token refreshed successfully")
                     return True  # Indicate that retry is possible
                 except Exception as refresh_exc:
@@ -364,15 +660,25 @@ class VehicleClient:
                     self.db_client.log_error(exception=refresh_exc)
                     return False
             else:
+                _API_ERRORS["authentication"].inc()
                 self.logger.exception("Authentication error (not token expiry):", exc_info=exc)
                 self.db_client.log_error(exception=exc)
                 return False
 
+        # our own budget refused the call: nothing was sent, retrying would be refused as well
+        elif isinstance(exc, BudgetExceededError):
+            _API_ERRORS["budget_exceeded"].inc()
+            self.logger.warning(f"API call skipped: {exc}")
+            return False
+
         # rate limiting: we are blocked for 24 hours
         elif isinstance(exc, RateLimitingError):
+            _API_ERRORS["rate_limited"].inc()
             self.logger.exception(
                 "we got rate limited, probably exceeded 200 requests. exiting",
                 exc_info=exc)
+            if self.request_budget:
+                self.request_budget.mark_rate_limited()
             self.db_client.log_error(exception=exc)
             # time.sleep(3600 * 4)
             return False
@@ -380,6 +686,7 @@ class VehicleClient:
         # request timeout: vehicle could not be reached.
         # to prevent too many unsuccessful requests in a row (which would lead to rate limiting) we sleep for a while.
         elif isinstance(exc, RequestTimeoutError):
+            _API_ERRORS["vehicle_timeout"].inc()
             self.logger.exception(
                 "The vehicle did not respond. Exiting to prevent too many unsuccessful requests "
                 "that would lead to rate limiting ",
@@ -390,6 +697,7 @@ class VehicleClient:
 
         # broad API error
         elif isinstance(exc, APIError):
+            _API_ERRORS["api_error"].inc()
             self.logger.exception("server responded with error:", exc_info=exc)
             self.db_client.log_error(exception=exc)
             return False
@@ -398,13 +706,18 @@ class VehicleClient:
 
         # any other exception
         else:
+            _API_ERRORS["other"].inc()
             self.logger.exception("generic error:", exc_info=exc)
             self.db_client.log_error(exception=exc)
             return False
             # self.logger.info("sleeping for 60 seconds before next attempt")
             # time.sleep(60)
 
+    @traced("vehicle.refresh")
     def refresh(self):
+        return self._exclusive("refresh", self._refresh)
+
+    def _refresh(self):
         self.logger.info("refreshing token...")
 
         if len(self.vm.vehicles) == 0 and self.vm.token:
@@ -413,7 +726,7 @@ class VehicleClient:
             self.vm.token = None
         # this command does NOT refresh vehicles (at least for EU and if there is not a preexisting token)
         try:
-            self.vm.check_and_refresh_token()
+            self.check_and_refresh_token()
         except Exception as e:
             should_retry = self.handle_api_exception(e)
             if not should_retry:
@@ -458,7 +771,7 @@ class VehicleClient:
             self.vm.api._update_vehicle_drive_info(self.vehicle, response)
             self.db_client.save_daily_stats()
             self.get_estimated_charging_power()
-            # process_trips() does at least 2 API calls even when there are no new trips.
+            # process_trips() does no API call when the odometer did not change since the last complete trip sync.
             # Only process trips if we have valid vehicle data
             if self.vehicle and hasattr(self.vehicle, 'daily_stats') and self.vehicle.daily_stats:
                 self.process_trips()
@@ -507,6 +820,68 @@ class VehicleClient:
             # process and save data to database.
             self.save_log()
 
+    @traced("vehicle.update_cached_state")
+    def update_cached_state(self) -> str:
+        """
+        vm.update_all_vehicles_with_cached_state(), shared by concurrent callers.
+        A forced or scheduled refresh already in flight is as good: its result is used instead of making another call.
+        :return: "cached" (or the mode of the refresh that was joined)
+        """
+        def update():
+            self.vm.update_all_vehicles_with_cached_state()
+            return "cached"
+
+        return self._exclusive("cached_state", update, join=("force_refresh", "update_state"))
+
+    @traced("vehicle.force_refresh")
+    def force_refresh(self) -> str:
+        """Wake the car up and fetch its state, shared by concurrent callers"""
+        def update():
+            self.vm.force_refresh_vehicle_state(self.vehicle.id)
+            self.vm.update_vehicle_with_cached_state(self.vehicle.id)
+            return "forced"
+
+        return self._exclusive("force_refresh", update)
+
+    @traced("vehicle.update_state")
+    def update_state(self, force_refresh_interval: int, allow_force: bool = True) -> str:
+        """
+        Scheduled update of the vehicle state, see _update_state(). A forced refresh in flight is used instead.
+        """
+        return self._exclusive("update_state", lambda: self._update_state(force_refresh_interval, allow_force),
+                               join=("force_refresh",))
+
+    def _update_state(self, force_refresh_interval: int, allow_force: bool = True) -> str:
+        """
+        Update the vehicle state with as few API calls as possible:
+        - cached state (1 call) if the data the car last reported is recent enough
+        - forced refresh (wakes the car up, state + location + driving info) if it is older than force_refresh_interval
+        :param force_refresh_interval: seconds after which the cached data is considered stale
+        :param allow_force: False to never wake the car up (e.g. when the 12V battery is low)
+        :return: "forced" or "cached"
+        """
+        if self.vehicle is None:
+            self.vehicle = self.vm.get_vehicle(os.environ["UVO_VEHICLE_UUID"])
+
+        last_updated_at = self.vehicle.last_updated_at
+        if last_updated_at is not None and last_updated_at.tzinfo is None:
+            last_updated_at = last_updated_at.replace(tzinfo=datetime.timezone.utc)
+        age = None
+        if last_updated_at is not None:
+            age = (datetime.datetime.now(datetime.timezone.utc) - last_updated_at).total_seconds()
+
+        if allow_force and age is not None and age > force_refresh_interval:
+            self.vm.force_refresh_vehicle_state(self.vehicle.id)
+            mode = "forced"
+        else:
+            state = self.vm.api._get_cached_vehicle_state(self.vm.token, self.vehicle)
+            self.vm.api._update_vehicle_properties(self.vehicle, state)
+            mode = "cached"
+
+        self.get_estimated_charging_power()
+        self.set_interval()
+        return mode
+
     def set_interval(self):
         if self.vehicle.engine_is_running and not self.vehicle.ev_battery_is_charging:
             # for an EV: "engine running" supposedly means the contact is set and the car is "ready to drive"
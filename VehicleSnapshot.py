@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import threading
+import time
+
+from RawPayload import to_json
+
+
+class VehicleSnapshot:
+    """
+    In-memory copy of the vehicle state served by the HTTP endpoints, so that reading it does not cost API calls.
+    Role:
+    - serve the last snapshot as long as it is younger than the TTL
+    - once it is older, keep serving it but refresh it in the background (stale-while-revalidate),
+      with at most one refresh in flight whatever the number of concurrent readers
+    - only make readers wait when there is no snapshot yet, or when it is older than max_stale
+    Scheduled refreshes publish their result with publish(), so that they refresh the snapshot for free.
+    """
+
+    def __init__(self, refresh, build, ttl: int = 600, max_stale: int = 3600, retry_delay: int = 60):
+        """
+        :param refresh: callable updating the vehicle state from the API, returns False on failure
+        :param build: callable returning the snapshot (a JSON serializable dict) from the current vehicle state
+        :param ttl: seconds a snapshot is served without refreshing it
+        :param max_stale: seconds after which readers wait for the refresh instead of getting the stale snapshot
+        :param retry_delay: seconds to wait after a failed refresh before trying again
+        """
+        self.refresh_function = refresh
+        self.build = build
+        self.ttl = ttl
+        self.max_stale = max(max_stale, ttl)
+        self.retry_delay = retry_delay
+        self.data = None
+        self.etag = None
+        self.fetched_at = None  # time.monotonic() of the refresh the data comes from
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._condition = threading.Condition()
+        self._refreshing = False
+        self._retry_at = 0
+        self.logger = logging.getLogger(__name__)
+
+    def age(self) -> float:
+        """Seconds since the snapshot was taken, None if there is none"""
+        if self.fetched_at is None:
+            return None
+        return time.monotonic() - self.fetched_at
+
+    def publish(self):
+        """Take a new snapshot from the current vehicle state (after it has been refreshed by someone else)"""
+        data = self.build()
+        with self._condition:
+            self._set(data)
+
+    def _set(self, data: dict):
+        self.data = data
+        self.etag = '"' + hashlib.sha1(to_json(data)).hexdigest() + '"'
+        self.fetched_at = time.monotonic()
+
+    def get(self, timeout: float = 60):
+        """
+        :param timeout: seconds to wait for a refresh when there is no usable snapshot
+        :return: (snapshot dict, ETag, age in seconds), or (None, None, None) if there is no snapshot at all
+        """
+        with self._condition:
+            age = self.age()
+            if age is not None and age <= self.ttl:
+                return self.data, self.etag, age
+
+            if time.monotonic() < self._retry_at:
+                # the last refresh failed, don't hammer the API: serve what we have
+                return self.data, self.etag, age
+            self._start_refresh()
+            if age is None or age > self.max_stale:
+                # nothing usable to serve: wait for the refresh in flight
+                self._condition.wait_for(lambda: not self._refreshing, timeout=timeout)
+            return self.data, self.etag, self.age()
+
+    def _start_refresh(self):
+        """Start a background refresh unless one is already in flight, called with the condition held"""
+        if self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh, name="vehicle-snapshot-refresh", daemon=True).start()
+
+    def _refresh(self):
+        data = None
+        try:
+            if self.refresh_function():
+                data = self.build()
+        except Exception as e:
+            self.logger.error(f"Vehicle snapshot refresh failed: {str(e)}")
+        with self._condition:
+            self.refreshes += 1
+            if data is None:
+                # keep serving the previous snapshot, a reader tries again after the retry delay
+                self.refresh_failures += 1
+                self._retry_at = time.monotonic() + self.retry_delay
+            else:
+                self._set(data)
+            self._refreshing = False
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        age = self.age()
+        return {
+            "ttl": self.ttl,
+            "max_stale": self.max_stale,
+            "age": round(age, 1) if age is not None else None,
+            "etag": self.etag,
+            "refreshing": self._refreshing,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
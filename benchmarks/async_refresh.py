@@ -0,0 +1,81 @@
+"""
+Cached refresh of many accounts against benchmarks/fake_kia_api.py (one vehicle each, --latency seconds per API call):
+the blocking KiaUvoApiEU one account after the other and from a thread pool, and AsyncRunner with AsyncKiaUvoApiEU
+from one event loop. Without aiohttp the async client runs the blocking one in worker threads.
+
+    python benchmarks/async_refresh.py --accounts 50 --concurrency 16 --latency 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_kia_api import DEFAULT_FIXTURE, FakeKiaApi, load_fixtures  # noqa: E402
+
+from AsyncRunner import AsyncRunner  # noqa: E402
+from custom_hyundai_kia_connect_api.AsyncKiaUvoApiEU import AsyncKiaUvoApiEU  # noqa: E402
+from custom_hyundai_kia_connect_api.KiaUvoApiEU import KiaUvoApiEU  # noqa: E402
+
+
+def refresh_blocking(api: KiaUvoApiEU, username: str):
+    token = api.login(username, "password")
+    for vehicle in api.get_vehicles(token):
+        api.update_vehicle_with_cached_state(token, vehicle)
+
+
+async def refresh_async(base_url: str, accounts: int, concurrency: int) -> int:
+    async with AsyncKiaUvoApiEU(region=1, brand=1, language="en", base_url=base_url,
+                                pool_size=concurrency) as api:
+        runner = AsyncRunner(api, max_concurrency=concurrency)
+        for number in range(accounts):
+            runner.add_account(f"user{number}@example.com", "password")
+        results = await runner.run()
+    return sum(1 for result in results if result["error"] is not None)
+
+
+def timed(label: str, function, fake: FakeKiaApi, accounts: int):
+    fake.requests.clear()
+    started = time.perf_counter()
+    errors = function()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed:7.2f} s  {accounts / elapsed:7.1f} accounts/s  "
+          f"{sum(fake.requests.values())} requests{f', {errors} errors' if errors else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake API call")
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    fake = FakeKiaApi(load_fixtures(DEFAULT_FIXTURE), latency=args.latency)
+    base_url = fake.start()
+    usernames = [f"user{number}@example.com" for number in range(args.accounts)]
+    api = KiaUvoApiEU(region=1, brand=1, language="en", base_url=base_url, pool_size=2 * args.concurrency)
+    print(f"{args.accounts} accounts, {args.latency} s per API call, concurrency {args.concurrency}")
+    try:
+        if not args.skip_sequential:
+            timed("blocking, sequential", lambda: [refresh_blocking(api, username) for username in usernames] and 0,
+                  fake, args.accounts)
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            timed("blocking, thread pool",
+                  lambda: list(executor.map(lambda username: refresh_blocking(api, username), usernames)) and 0,
+                  fake, args.accounts)
+        timed("AsyncRunner", lambda: asyncio.run(refresh_async(base_url, args.accounts, args.concurrency)),
+              fake, args.accounts)
+    finally:
+        api.close()
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""
+Local stand-in for the Kia Connect EU API, to run the tracker, load tests and benchmarks without touching the real
+API and its daily quota.
+
+    python benchmarks/fake_kia_api.py --port 8899 --latency 0.3 --error-rate 0.05
+    UVO_API_BASE_URL=http://127.0.0.1:8899 UVO_REQUEST_BUDGET_PATH=/tmp/budget.json python http_server.py
+
+It serves what KiaUvoApiEU calls: the Kia login (device registration, cookies, language, token grant), the vehicle
+list, cached status (status/latest, ccs2/carstatus/latest), forced status, location, month and day trip info,
+drvhistory, charge/port/valet commands with their status records and the PIN check.
+Status answers replay recorded fixtures in turn (db/tracker.json by default: the vehicleStatusInfo of a
+status/latest answer, as JSON or as a Python repr; a ccs2 'Vehicle' state makes the vehicle a ccs2 one).
+Trips and driving statistics are generated, the same on every run.
+
+Errors can be injected at random (--error-rate, --errors) or on demand (POST /_fake/inject {"kind": ..., "count": n}),
+and --daily-limit answers like the real rate limiting once that many vehicle calls were made in 24h.
+GET /_fake/stats counts the requests per endpoint, POST /_fake/reset clears the counters and the injected errors.
+"""
+import argparse
+import collections
+import copy
+import datetime
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from dateutil import tz
+from flask import Flask, jsonify, make_response, request
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import RawPayload  # noqa: E402
+from RequestBudget import endpoint_name  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "tracker.json")
+VEHICLE_ID = "00000000-0000-4000-8000-00000000c0de"
+DATA_TIMEZONE = tz.gettz("Europe/Berlin")
+
+# rate_limit, vehicle_timeout and token_expired are answered like the real API does; server_error is a 503 from
+# the load balancer, timeout a request that gets no answer before the client gives up
+ERROR_KINDS = ("rate_limit", "vehicle_timeout", "token_expired", "server_error", "timeout")
+
+SPA = "/api/v1/spa"
+SPA_V2 = "/api/v2/spa"
+USER = "/api/v1/user"
+
+
+def load_fixtures(path: str) -> list:
+    """Status payloads of a fixture file, or of every *.json file of a directory"""
+    paths = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+    fixtures = []
+    for fixture_path in paths:
+        with open(fixture_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = RawPayload.decode_legacy(text)
+        if not isinstance(data, dict):
+            raise ValueError(f"{fixture_path} is neither a JSON object nor a Python dict literal")
+        fixtures.append(data)
+    if not fixtures:
+        raise ValueError(f"No fixture found in {path}")
+    return fixtures
+
+
+def _ok(res_msg, **extra) -> dict:
+    return {"retCode": "S", "resCode": "0000", "resMsg": res_msg, "msgId": str(uuid.uuid4()), **extra}
+
+
+def _fail(res_code: str, message: str) -> dict:
+    return {"retCode": "F", "resCode": res_code, "resMsg": message, "msgId": str(uuid.uuid4())}
+
+
+class FakeKiaApi:
+    """The fake API server: a Flask app, run on a background thread by start() or in the foreground by serve()"""
+
+    def __init__(self, fixtures: list = None, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 errors: tuple = ERROR_KINDS, daily_limit: int = 0, token_ttl: int = 3600, hang_seconds: float = 60,
+                 trips_per_day: int = 2, daily_stats_days: int = 30, action_delay: float = 2.0,
+                 fresh_timestamps: bool = True, clock=None, seed: int = 0):
+        """
+        :param fixtures: status payloads replayed in turn, db/tracker.json by default
+        :param latency: seconds added to every answer
+        :param jitter: up to this many seconds added at random on top of latency
+        :param error_rate: probability of answering a request with one of the errors kinds
+        :param errors: kinds of errors injected at random, see ERROR_KINDS
+        :param daily_limit: vehicle calls allowed in a rolling 24h window, 0 for no limit
+        :param token_ttl: lifetime of the access tokens in seconds
+        :param hang_seconds: how long a "timeout" error takes to answer
+        :param trips_per_day: average number of generated trips per day
+        :param daily_stats_days: days of driving statistics in the 30 days drvhistory answer
+        :param action_delay: seconds before a command gets its result in the notification records
+        :param fresh_timestamps: give replayed states the current time, so that every poll is a new vehicle update
+        :param clock: clock() returns the (aware) time given to replayed states, the current time by default
+        :param seed: seed of the generated trips, statistics and injected errors
+        """
+        self.fixtures = fixtures or load_fixtures(DEFAULT_FIXTURE)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.errors = tuple(errors)
+        self.daily_limit = daily_limit
+        self.token_ttl = token_ttl
+        self.hang_seconds = hang_seconds
+        self.trips_per_day = trips_per_day
+        self.daily_stats_days = daily_stats_days
+        self.action_delay = action_delay
+        self.fresh_timestamps = fresh_timestamps
+        self.clock = clock or (lambda: datetime.datetime.now(DATA_TIMEZONE))
+        self.seed = seed
+        self.ccs2 = "vehicleStatus" not in self.fixtures[0]
+
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._fixture_index = 0
+        self._tokens = {}  # Authorization header value -> expiry (time.time())
+        self._injected = collections.deque()  # error kinds the next requests are answered with
+        self._vehicle_calls = collections.deque()  # time of the vehicle calls of the last 24h, for daily_limit
+        self._actions = {}  # msgId -> time its result is available
+        self.requests = collections.Counter()
+        self.injected_errors = collections.Counter()
+        self.app = self._create_app()
+        self._server = None
+
+    # --- state ---
+
+    def _next_state(self) -> dict:
+        """The next fixture, with the current time if fresh_timestamps"""
+        with self._lock:
+            state = copy.deepcopy(self.fixtures[self._fixture_index % len(self.fixtures)])
+            self._fixture_index += 1
+        if self.fresh_timestamps:
+            now = self.clock().astimezone(DATA_TIMEZONE).strftime("%Y%m%d%H%M%S")
+            if "vehicleStatus" in state:
+                state["vehicleStatus"]["time"] = now
+                if isinstance(state.get("vehicleLocation"), dict):
+                    state["vehicleLocation"]["time"] = now
+            else:
+                state["Date"] = now
+        return state
+
+    def _issue_token(self, prefix: str) -> str:
+        token = f"{prefix}-{uuid.uuid4().hex}"
+        with self._lock:
+            self._tokens["Bearer " + token] = time.time() + self.token_ttl
+        return token
+
+    def _day_trips(self, yyyymmdd: str) -> list:
+        """Generated trips of a day, none in the future"""
+        day = datetime.datetime.strptime(yyyymmdd, "%Y%m%d").date()
+        if day > datetime.date.today():
+            return []
+        rng = random.Random(f"{self.seed}:{yyyymmdd}")
+        count = rng.randint(0, 2 * self.trips_per_day)
+        trips = []
+        for minute in sorted(rng.sample(range(6 * 60, 23 * 60), count)):
+            drive_time = rng.randint(5, 60)
+            distance = rng.randint(1, 80)
+            trips.append({
+                "tripTime": f"{minute // 60:02d}{minute % 60:02d}{rng.randint(0, 59):02d}",
+                "tripDrvTime": drive_time,
+                "tripIdleTime": rng.randint(0, 10),
+                "tripDist": distance,
+                "tripAvgSpeed": round(distance * 60 / drive_time),
+                "tripMaxSpeed": rng.randint(50, 130),
+            })
+        return trips
+
+    @staticmethod
+    def _summary(trips: list) -> dict:
+        return {
+            "tripDrvTime": sum(trip["tripDrvTime"] for trip in trips),
+            "tripIdleTime": sum(trip["tripIdleTime"] for trip in trips),
+            "tripDist": sum(trip["tripDist"] for trip in trips),
+            "tripAvgSpeed": round(sum(trip["tripAvgSpeed"] for trip in trips) / len(trips)) if trips else 0,
+            "tripMaxSpeed": max((trip["tripMaxSpeed"] for trip in trips), default=0),
+        }
+
+    def _month_trip_info(self, yyyymm: str) -> dict:
+        first = datetime.datetime.strptime(yyyymm, "%Y%m").date()
+        days = []
+        day = first
+        while day.month == first.month:
+            trips = self._day_trips(day.strftime("%Y%m%d"))
+            if trips:
+                days.append((day.strftime("%Y%m%d"), trips))
+            day += datetime.timedelta(days=1)
+        all_trips = [trip for _, trips in days for trip in trips]
+        return {
+            "monthTripDayCnt": len(days),
+            "tripDayList": [{"tripDayInMonth": yyyymmdd, "tripCntDay": len(trips)} for yyyymmdd, trips in days],
+            **self._summary(all_trips),
+        }
+
+    def _day_trip_info(self, yyyymmdd: str) -> dict:
+        trips = self._day_trips(yyyymmdd)
+        if not trips:
+            return {"dayTripList": []}
+        return {"dayTripList": [{"tripDay": yyyymmdd, "dayTripCnt": len(trips), **self._summary(trips),
+                                 "tripList": trips}]}
+
+    def _driving_stats(self, day: datetime.date) -> dict:
+        rng = random.Random(f"{self.seed}:drv:{day:%Y%m%d}")
+        motor, climate, electronics, care = (rng.randint(2000, 12000), rng.randint(0, 3000), rng.randint(100, 600),
+                                             rng.randint(0, 300))
+        return {
+            "drivingDate": day.strftime("%Y%m%d"),
+            "totalPwrCsp": motor + climate + electronics + care,
+            "motorPwrCsp": motor,
+            "climatePwrCsp": climate,
+            "eDPwrCsp": electronics,
+            "batteryMgPwrCsp": care,
+            "regenPwr": rng.randint(500, 4000),
+            "calculativeOdo": rng.randint(10, 120),
+        }
+
+    def _driving_info(self, period_target: int) -> dict:
+        today = datetime.date.today()
+        days = [self._driving_stats(today - datetime.timedelta(days=i)) for i in range(self.daily_stats_days)]
+        total = {key: sum(day[key] for day in days) for key in
+                 ("totalPwrCsp", "motorPwrCsp", "climatePwrCsp", "eDPwrCsp", "batteryMgPwrCsp", "regenPwr",
+                  "calculativeOdo")}
+        if period_target == 1:
+            # all time: scale the last days up to a plausible lifetime
+            return {"drivingInfo": [{"drivingPeriod": 3, **{key: value * 40 for key, value in total.items()}}]}
+        return {"drivingInfo": [{"drivingPeriod": 0, **total}], "drivingInfoDetail": days}
+
+    # --- errors, authentication and rate limiting ---
+
+    def inject(self, kind: str, count: int = 1):
+        """Answer the next count requests with an error of this kind"""
+        if kind not in ERROR_KINDS:
+            raise ValueError(f"Unknown error kind {kind!r}, use one of {', '.join(ERROR_KINDS)}")
+        with self._lock:
+            self._injected.extend([kind] * count)
+
+    def _next_error(self, authenticated: bool):
+        with self._lock:
+            if self._injected and (authenticated or self._injected[0] != "token_expired"):
+                return self._injected.popleft()
+            if self.error_rate and self._random.random() < self.error_rate:
+                kinds = [kind for kind in self.errors if authenticated or kind != "token_expired"]
+                return self._random.choice(kinds) if kinds else None
+        return None
+
+    def _error_response(self, kind: str):
+        with self._lock:
+            self.injected_errors[kind] += 1
+        if kind == "rate_limit":
+            return jsonify(_fail("5091", "Exceeds number of requests")), 429
+        if kind == "vehicle_timeout":
+            return jsonify(_fail("4081", "Request timeout")), 400
+        if kind == "token_expired":
+            return jsonify({"error": "Key not authorized: Token is expired"}), 401
+        if kind == "server_error":
+            return "Service Unavailable", 503
+        time.sleep(self.hang_seconds)
+        return "Gateway Timeout", 504
+
+    def _authorized(self) -> bool:
+        expiry = self._tokens.get(request.headers.get("Authorization", ""))
+        return expiry is not None and expiry > time.time()
+
+    def _over_daily_limit(self) -> bool:
+        now = time.time()
+        with self._lock:
+            while self._vehicle_calls and self._vehicle_calls[0] < now - 86400:
+                self._vehicle_calls.popleft()
+            if len(self._vehicle_calls) >= self.daily_limit:
+                return True
+            self._vehicle_calls.append(now)
+        return False
+
+    def _before_request(self):
+        with self._lock:
+            self.requests[endpoint_name(request.method, request.path)] += 1
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if request.path.startswith("/_fake/"):
+            return None
+
+        # vehicle calls need a token, the login flow and the device registration don't
+        authenticated = request.path.startswith((SPA, SPA_V2)) and request.path != SPA + "/notifications/register"
+        kind = self._next_error(authenticated)
+        if kind:
+            return self._error_response(kind)
+        if authenticated:
+            if not self._authorized():
+                return jsonify({"error": "Key not authorized: Token is expired"}), 401
+            if self.daily_limit and self._over_daily_limit():
+                return jsonify(_fail("5091", "Exceeds number of requests")), 429
+        return None
+
+    # --- endpoints ---
+
+    def _create_app(self) -> Flask:
+        app = Flask(__name__)
+        app.before_request(self._before_request)
+
+        @app.route(USER + "/oauth2/authorize")
+        def authorize():
+            response = make_response("", 200)
+            response.set_cookie("account", uuid.uuid4().hex)
+            return response
+
+        @app.route(USER + "/language", methods=["POST"])
+        def language():
+            return jsonify({})
+
+        @app.route("/auth/api/v2/user/oauth2/token", methods=["POST"])
+        @app.route(USER + "/oauth2/token", methods=["POST"])
+        def token():
+            return jsonify({
+                "token_type": "Bearer",
+                "access_token": self._issue_token("access"),
+                "refresh_token": request.form.get("refresh_token") or uuid.uuid4().hex,
+                "expires_in": self.token_ttl,
+            })
+
+        @app.route(USER + "/pin", methods=["PUT"])
+        def pin():
+            return jsonify({"controlToken": self._issue_token("control"), "expiresTime": 600})
+
+        @app.route(SPA + "/notifications/register", methods=["POST"])
+        def register():
+            return jsonify(_ok({"deviceId": str(uuid.uuid4())}))
+
+        @app.route(SPA + "/vehicles")
+        def vehicles():
+            return jsonify(_ok({"vehicles": [{
+                "vehicleId": VEHICLE_ID, "nickname": "Fake", "vehicleName": "EV6", "regDate": "2023-01-01 00:00:00.000",
+                "vin": "KNAFAKE0000000001", "type": "EV", "ccuCCS2ProtocolSupport": 1 if self.ccs2 else 0}]}))
+
+        @app.route(SPA + "/vehicles/<vehicle_id>/status/latest")
+        def status_latest(vehicle_id):
+            if self.ccs2:
+                return jsonify(_fail("5921", "No Data Found v2")), 400
+            return jsonify(_ok({"vehicleStatusInfo": self._next_state()}))
+
+        @app.route(SPA + "/vehicles/<vehicle_id>/ccs2/carstatus/latest")
+        def ccs2_status_latest(vehicle_id):
+            if not self.ccs2:
+                return jsonify(_fail("5921", "No Data Found v2")), 400
+            return jsonify(_ok({"state": {"Vehicle": self._next_state()}}))
+
+        @app.route(SPA + "/vehicles/<vehicle_id>/status")
+        def forced_status(vehicle_id):
+            if self.ccs2:
+                return jsonify(_fail("5921", "No Data Found v2")), 400
+            return jsonify(_ok(self._next_state()["vehicleStatus"]))
+
+        @app.route(SPA + "/vehicles/<vehicle_id>/location")
+        def location(vehicle_id):
+            if self.ccs2:
+                return jsonify(_fail("5921", "No Data Found v2")), 400
+            return jsonify(_ok({"gpsDetail": self._next_state().get("vehicleLocation")}))
+
+        @app.route(SPA + "/vehicles/<vehicle_id>/tripinfo", methods=["POST"])
+        def trip_info(vehicle_id):
+            payload = request.get_json(force=True)
+            if payload.get("tripPeriodType") == 0:
+                return jsonify(_ok(self._month_trip_info(payload["setTripMonth"])))
+            return jsonify(_ok(self._day_trip_info(payload["setTripDay"])))
+
+        @app.route(SPA + "/vehicles/<vehicle_id>/drvhistory", methods=["POST"])
+        def driving_history(vehicle_id):
+            return jsonify(_ok(self._driving_info(request.get_json(force=True).get("periodTarget"))))
+
+        @app.route(SPA + "/vehicles/<vehicle_id>/control/charge", methods=["POST"])
+        @app.route(SPA_V2 + "/vehicles/<vehicle_id>/ccs2/control/charge", methods=["POST"])
+        @app.route(SPA_V2 + "/vehicles/<vehicle_id>/control/portdoor", methods=["POST"])
+        @app.route(SPA_V2 + "/vehicles/<vehicle_id>/control/valet", methods=["POST"])
+        def control(vehicle_id):
+            response = _ok({})
+            with self._lock:
+                self._actions[response["msgId"]] = time.time() + self.action_delay
+            return jsonify(response)
+
+        @app.route(SPA + "/notifications/<vehicle_id>/records")
+        def records(vehicle_id):
+            now = time.time()
+            with self._lock:
+                actions = list(self._actions.items())
+            return jsonify(_ok([{"recordId": msg_id, "result": "success" if now >= ready_at else None}
+                                for msg_id, ready_at in actions]))
+
+        @app.route("/_fake/stats")
+        def stats():
+            with self._lock:
+                return jsonify({"requests": dict(self.requests), "injected_errors": dict(self.injected_errors),
+                                "pending_injected_errors": list(self._injected)})
+
+        @app.route("/_fake/inject", methods=["POST"])
+        def inject():
+            payload = request.get_json(force=True)
+            try:
+                self.inject(payload["kind"], int(payload.get("count", 1)))
+            except (KeyError, ValueError) as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"status": "ok"})
+
+        @app.route("/_fake/reset", methods=["POST"])
+        def reset():
+            with self._lock:
+                self.requests.clear()
+                self.injected_errors.clear()
+                self._injected.clear()
+                self._vehicle_calls.clear()
+            return jsonify({"status": "ok"})
+
+        return app
+
+    # --- server ---
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on a background thread (port 0: any free port), return the base URL for UVO_API_BASE_URL"""
+        self._server = make_server(host, port, self.app, threaded=True)
+        threading.Thread(target=self._server.serve_forever, name="fake-kia-api", daemon=True).start()
+        return f"http://{host}:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8899):
+        self._server = make_server(host, port, self.app, threaded=True)
+        self._server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="status payload file, or directory of *.json")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many random seconds on top")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected error")
+    parser.add_argument("--errors", default=",".join(ERROR_KINDS), help="kinds of errors injected at random")
+    parser.add_argument("--daily-limit", type=int, default=0, help="vehicle calls allowed per 24h, 0: no limit")
+    parser.add_argument("--token-ttl", type=int, default=3600, help="access token lifetime in seconds")
+    parser.add_argument("--hang-seconds", type=float, default=60, help="duration of a 'timeout' error")
+    parser.add_argument("--trips-per-day", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    fake = FakeKiaApi(load_fixtures(args.fixture), latency=args.latency, jitter=args.jitter,
+                      error_rate=args.error_rate, errors=tuple(kind for kind in args.errors.split(",") if kind),
+                      daily_limit=args.daily_limit, token_ttl=args.token_ttl, hang_seconds=args.hang_seconds,
+                      trips_per_day=args.trips_per_day, seed=args.seed)
+    logging.info(f"Fake Kia Connect API on http://{args.host}:{args.port} (vehicle {VEHICLE_ID}), "
+                 f"use UVO_API_BASE_URL=http://{args.host}:{args.port}")
+    fake.serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
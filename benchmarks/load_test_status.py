@@ -0,0 +1,157 @@
+"""
+Load test of GET /status, with the Kia/Hyundai API replaced by a stub that sleeps for --api-latency seconds.
+Shows the throughput of the HTTP server and how many upstream calls the requests caused.
+
+    python benchmarks/load_test_status.py --server waitress --clients 16 --duration 10
+    python benchmarks/load_test_status.py --server flask --ttl 1
+"""
+import argparse
+import datetime
+import http.client
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_server  # noqa: E402
+from JobRunner import JobRunner  # noqa: E402
+from SingleFlight import SingleFlight  # noqa: E402
+from VehicleSnapshot import VehicleSnapshot  # noqa: E402
+
+
+class StubVehicleClient:
+    """The parts of VehicleClient the read endpoints use, with a slow fake API call"""
+
+    def __init__(self, api_latency: float):
+        self.api_latency = api_latency
+        self.upstream_calls = 0
+        self.lock = threading.RLock()
+        self.single_flight = SingleFlight()
+        self.charging_power_in_kilowatts = 0
+        self.request_budget = None
+        self.vehicle = SimpleNamespace(
+            id="stub", ev_battery_percentage=80, car_battery_percentage=90, ev_driving_range=300,
+            last_updated_at=datetime.datetime.now(datetime.timezone.utc), odometer=12345,
+            ev_battery_is_charging=False, engine_is_running=False, ev_charge_limits_ac=80, ev_charge_limits_dc=80,
+            daily_stats=None)
+        self.db_client = SimpleNamespace(
+            get_last_update_timestamp=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    @contextmanager
+    def locked(self):
+        with self.lock:
+            yield
+
+    def update_cached_state(self):
+        def update():
+            self.upstream_calls += 1
+            time.sleep(self.api_latency)
+            self.vehicle.last_updated_at = datetime.datetime.now(datetime.timezone.utc)
+            return "cached"
+
+        return self.single_flight.do("cached_state", update)
+
+    def save_log(self):
+        pass
+
+    def handle_api_exception(self, exc):
+        return False
+
+
+def start_server(server: str, port: int):
+    if server == "waitress":
+        from waitress.server import create_server
+        wsgi_server = create_server(http_server.app, host="127.0.0.1", port=port, threads=8)
+
+        def serve():
+            try:
+                wsgi_server.run()
+            except OSError:
+                pass  # the socket was closed under the loop by close()
+
+        threading.Thread(target=serve, daemon=True).start()
+        return wsgi_server.close
+    from werkzeug.serving import make_server
+    wsgi_server = make_server("127.0.0.1", port, http_server.app, threaded=True)
+    threading.Thread(target=wsgi_server.serve_forever, daemon=True).start()
+    return wsgi_server.shutdown
+
+
+def client(port: int, deadline: float, latencies: list, errors: list):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", "/status")
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run(server: str = "waitress", port: int = 5099, clients: int = 16, duration: float = 10, ttl: int = 600,
+        api_latency: float = 0.5) -> dict:
+    """Load /status for duration seconds, return the throughput, latencies (sorted, in seconds) and upstream calls"""
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    stub = StubVehicleClient(api_latency)
+    http_server.vehicle_client = stub
+    http_server.vehicle_snapshot = VehicleSnapshot(http_server.refresh_vehicle_snapshot,
+                                                   http_server.build_vehicle_snapshot, ttl=ttl)
+    http_server.job_runner = JobRunner()
+
+    stop_server = start_server(server, port)
+    time.sleep(0.5)
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(port, deadline, latencies, errors))
+               for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop_server()
+
+    latencies.sort()
+    return {"requests": len(latencies), "elapsed": elapsed, "requests_per_second": len(latencies) / elapsed,
+            "latencies": latencies, "errors": len(errors), "upstream_calls": stub.upstream_calls,
+            "coalesced": stub.single_flight.coalesced}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=["waitress", "flask"], default="waitress")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--ttl", type=int, default=600, help="snapshot TTL in seconds")
+    parser.add_argument("--api-latency", type=float, default=0.5, help="seconds per stubbed API call")
+    args = parser.parse_args()
+
+    result = run(args.server, args.port, args.clients, args.duration, args.ttl, args.api_latency)
+    latencies = result["latencies"]
+    print(f"server={args.server} clients={args.clients} ttl={args.ttl}s api_latency={args.api_latency}s")
+    print(f"requests: {result['requests']} in {result['elapsed']:.1f}s -> {result['requests_per_second']:.0f} req/s, "
+          f"errors: {result['errors']}")
+    if latencies:
+        print(f"latency: p50 {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print(f"upstream API calls: {result['upstream_calls']}, coalesced: {result['coalesced']}")
+
+if __name__ == "__main__":
+    main()
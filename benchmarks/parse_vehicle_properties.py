@@ -0,0 +1,54 @@
+"""
+Parse time of a status payload (db/tracker.json by default, JSON or Python repr) by
+KiaUvoApiEU._update_vehicle_properties, and of the field reads alone: the compiled field map, which walks the payload
+once, against one get_child_value() walk from the root per field.
+
+    python benchmarks/parse_vehicle_properties.py
+    python benchmarks/parse_vehicle_properties.py --fixture status.json --iterations 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_kia_api import DEFAULT_FIXTURE, load_fixtures  # noqa: E402
+from hyundai_kia_connect_api.Vehicle import Vehicle  # noqa: E402
+from hyundai_kia_connect_api.const import ENGINE_TYPES  # noqa: E402
+from hyundai_kia_connect_api.utils import get_child_value  # noqa: E402
+
+from custom_hyundai_kia_connect_api import KiaUvoApiEU as api_module  # noqa: E402
+
+
+def per_call(function, iterations: int) -> float:
+    """Best of 5 runs, in microseconds per call"""
+    return min(timeit.repeat(function, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    state = load_fixtures(args.fixture)[0]
+    ccs2 = "vehicleStatus" not in state
+    api = api_module.KiaUvoApiEU(region=1, brand=1, language="en")
+    vehicle = Vehicle(id="benchmark", engine_type=ENGINE_TYPES.EV, ccu_ccs2_protocol_support=1 if ccs2 else 0)
+    update = api._update_vehicle_properties_ccs2 if ccs2 else api._update_vehicle_properties
+    fields = api_module._CCS2_STATUS_FIELDS if ccs2 else api_module._STATUS_FIELDS
+    paths = [path for _, path, _ in fields.fields] + list(fields.paths.values())
+
+    def walk_each_path():
+        for path in paths:
+            get_child_value(state, path)
+
+    print(f"fixture={args.fixture} ({'ccs2' if ccs2 else 'status/latest'}, {len(paths)} fields)")
+    print(f"  _update_vehicle_properties   {per_call(lambda: update(vehicle, state), args.iterations):8.2f} us/payload")
+    print(f"  field map read               {per_call(lambda: fields.read(state), args.iterations):8.2f} us/payload")
+    print(f"  get_child_value per field    {per_call(walk_each_path, args.iterations):8.2f} us/payload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Write latency of save_log, save_trip and save_daily_stats on each storage backend.
+SQLite runs on a temporary file; MySQL only when UVO_DB_HOST, UVO_DB_USER and UVO_DB_NAME are set (use a
+scratch database: rows are written to it).
+
+    python benchmarks/storage_write_latency.py --iterations 500
+    python benchmarks/storage_write_latency.py --backend sqlite --writers 4
+    python benchmarks/storage_write_latency.py --spool
+
+With --spool, the rows go through the write-behind spool: the latency is the fsync'd append, the database writes
+happen in the background (the time to drain the spool is shown too).
+"""
+import argparse
+import datetime
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Storage  # noqa: E402
+import VehicleClient  # noqa: E402,F401  (imported first: DatabaseClient and VehicleClient import each other)
+from DatabaseClient import DatabaseClient  # noqa: E402
+
+
+class StubVehicleClient:
+    """The parts of VehicleClient DatabaseClient uses, with a vehicle whose state changes on every save"""
+
+    def __init__(self):
+        now = datetime.datetime.now()
+        self.charging_power_in_kilowatts = 7.2
+        self.vehicle = SimpleNamespace(
+            ev_battery_percentage=80, car_battery_percentage=90, ev_driving_range=300, odometer=12345,
+            last_updated_at=now, location_last_updated_at=now, location_latitude=47.5, location_longitude=19.0,
+            ev_battery_is_charging=True, engine_is_running=False, ev_charge_limits_ac=80, ev_charge_limits_dc=80,
+            air_temperature=21, data={"vehicleStatus": {"evStatus": {"batteryStatus": 80}}}, daily_stats=[])
+
+    def _convert_trip_time_to_datetime(self, day_date, trip_hhmmss):
+        return day_date.replace(hour=int(trip_hhmmss[:2]), minute=int(trip_hhmmss[2:4]),
+                                second=int(trip_hhmmss[4:]))
+
+
+def measure(function, calls: list, writers: int) -> list:
+    """Run the calls (argument tuples) spread over writer threads, return the latency of each in seconds"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        own = []
+        for args in chunk:
+            start = time.perf_counter()
+            function(*args)
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker, args=(calls[i::writers],)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies)
+
+
+def run(storage: Storage.Storage, iterations: int, writers: int, spool_dir: str = None):
+    spool_path = os.path.join(spool_dir, f"{storage.name}.spool") if spool_dir else None
+    stub = StubVehicleClient()
+    db_client = DatabaseClient(stub, storage=storage, spool=spool_path is not None, spool_path=spool_path)
+    vehicle = stub.vehicle
+    # start after anything a previous run wrote, so that every trip and day is new
+    base = datetime.datetime.fromtimestamp(max(db_client._last_trip_unix_ts or 0, time.time()) + 86400)
+    base = base.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def save_log(i):
+        vehicle.odometer += 1
+        vehicle.ev_battery_percentage = i % 100
+        vehicle.data = {"vehicleStatus": {"evStatus": {"batteryStatus": i % 100}}, "i": i}
+        db_client.save_log()
+
+    def save_trip(i):
+        day = base + datetime.timedelta(days=i // 1440)
+        minute = i % 1440
+        trip = SimpleNamespace(hhmmss=f"{minute // 60:02d}{minute % 60:02d}00", drive_time=20, idle_time=2,
+                               distance=15, avg_speed=45, max_speed=90)
+        db_client.save_trip(day, trip)
+
+    def save_daily_stats(i):
+        day = SimpleNamespace(date=base - datetime.timedelta(days=10000 + i), total_consumed=12000,
+                              engine_consumption=9000, climate_consumption=2000,
+                              onboard_electronics_consumption=500, battery_care_consumption=500,
+                              regenerated_energy=3000, distance=80)
+        vehicle.daily_stats = [day]
+        db_client.save_daily_stats()
+
+    print(f"backend={storage.name} iterations={iterations} writers={writers} spool={spool_path is not None}")
+    for name, function in (("save_log", save_log), ("save_trip", save_trip),
+                           ("save_daily_stats", save_daily_stats)):
+        # the stub vehicle's daily_stats is shared state: a single writer saves them
+        latencies = measure(function, [(i,) for i in range(iterations)],
+                            1 if name == "save_daily_stats" else writers)
+        print(f"  {name:<17} p50 {statistics.median(latencies) * 1000:7.3f} ms   "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.3f} ms   "
+              f"max {latencies[-1] * 1000:7.3f} ms")
+    if db_client.spool:
+        start = time.perf_counter()
+        db_client.spool.flush()
+        print(f"  spool drained {(time.perf_counter() - start) * 1000:.1f} ms after the last save")
+        db_client.spool.close()
+    print(f"  stats: {db_client.get_pool_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["all", "sqlite", "mysql"], default="all")
+    parser.add_argument("--iterations", type=int, default=500, help="calls per operation")
+    parser.add_argument("--writers", type=int, default=1, help="threads writing concurrently")
+    parser.add_argument("--spool", action="store_true", help="write through the spool (in a temporary file)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    directory = tempfile.TemporaryDirectory()
+    spool_dir = directory.name if args.spool else None
+    if args.backend in ("all", "sqlite"):
+        storage = Storage.SQLiteStorage(os.path.join(directory.name, "bench.db"))
+        try:
+            run(storage, args.iterations, args.writers, spool_dir)
+        finally:
+            storage.close()
+
+    if args.backend in ("all", "mysql"):
+        if not (os.environ.get("UVO_DB_HOST") and os.environ.get("UVO_DB_USER") and os.environ.get("UVO_DB_NAME")):
+            print("backend=mysql skipped: UVO_DB_HOST, UVO_DB_USER and UVO_DB_NAME are not set")
+            return
+        os.environ["UVO_DB_BACKEND"] = "mysql"
+        storage = Storage.create_storage()
+        try:
+            run(storage, args.iterations, args.writers, spool_dir)
+        finally:
+            storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Benchmarks of the hot paths, against the fake API (benchmarks/fake_kia_api.py) and a throwaway database:
+- refresh: VehicleClient.refresh() end to end, with a new vehicle state at every call (1 API call + save_log)
+- process_trips_<n>m: trip backfill throughput over n months of history, from an empty trips table
+- save_daily_stats_<n>: save_daily_stats() with n days of statistics, new ones and already saved ones
+- parse_vehicle_properties: KiaUvoApiEU._update_vehicle_properties per payload (db/tracker.json)
+- status: GET /status requests per second (benchmarks/load_test_status.py)
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json --tolerance 0.2
+    python benchmarks/suite.py --only refresh,parse_vehicle_properties --api-latency 0.05
+
+The results are written as JSON (--output): every result has a name, a value, its unit and whether higher is better.
+With --baseline, the results are compared to an earlier run and the exit code is 1 if one regressed by more than
+the tolerance. SQLite runs on a temporary file; --backend mysql uses the UVO_DB_* database, which must be a scratch
+one: its trips, trip sync and daily stats tables are emptied.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import load_test_status  # noqa: E402
+from fake_kia_api import DATA_TIMEZONE, VEHICLE_ID, FakeKiaApi  # noqa: E402
+from hyundai_kia_connect_api.Vehicle import DailyDrivingStats  # noqa: E402
+from dateutil.relativedelta import relativedelta  # noqa: E402
+
+import VehicleClient  # noqa: E402
+from DatabaseClient import DatabaseClient  # noqa: E402
+
+BENCHMARKS = ("refresh", "process_trips", "save_daily_stats", "parse_vehicle_properties", "status")
+# emptied before the trip and daily stats benchmarks, so that they start from the same state on every run
+BENCHMARK_TABLES = ("trips", "trip_sync_months", "trip_sync_days", "stats_per_day")
+
+
+class StepClock:
+    """Clock of the fake API's vehicle states: one second later at every call, never after the current time"""
+
+    def __init__(self, steps: int):
+        self.start = datetime.datetime.now(DATA_TIMEZONE) - datetime.timedelta(seconds=steps)
+        self.calls = 0
+
+    def __call__(self) -> datetime.datetime:
+        self.calls += 1
+        return min(self.start + datetime.timedelta(seconds=self.calls), datetime.datetime.now(DATA_TIMEZONE))
+
+
+def result(name: str, value: float, unit: str, higher_is_better: bool, **extra) -> dict:
+    return {"name": name, "value": round(value, 6), "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+
+def percentiles(latencies: list, scale: float) -> dict:
+    latencies = sorted(latencies)
+    return {"p50": round(statistics.median(latencies) * scale, 3),
+            "p99": round(latencies[max(int(len(latencies) * 0.99) - 1, 0)] * scale, 3),
+            "max": round(latencies[-1] * scale, 3), "samples": len(latencies)}
+
+
+def create_vehicle_client(directory: str, base_url: str, backend: str) -> VehicleClient.VehicleClient:
+    """A VehicleClient talking to the fake API, with its ledger, token store, spool and database in directory"""
+    os.environ.update({
+        "UVO_API_BASE_URL": base_url,
+        "UVO_USERNAME": "benchmark",
+        "UVO_PASSWORD": "benchmark",
+        "UVO_PIN": "0000",
+        "UVO_VEHICLE_UUID": VEHICLE_ID,
+        "UVO_API_DAILY_LIMIT": str(10 ** 9),
+        "UVO_API_MAX_RETRIES": "0",
+        "UVO_REQUEST_BUDGET_PATH": os.path.join(directory, "request_budget.json"),
+        "UVO_TOKEN_STORE_PATH": os.path.join(directory, "token_store.json"),
+        "UVO_SPOOL_PATH": os.path.join(directory, "spool.jsonl"),
+        "UVO_DB_BACKEND": backend,
+        "UVO_DB_PATH": os.path.join(directory, "tracker.db"),
+    })
+    vehicle_client = VehicleClient.VehicleClient()
+    logging.getLogger().setLevel(logging.WARNING)
+    return vehicle_client
+
+
+def reset_database(vehicle_client, directory: str, name: str):
+    """Empty the benchmark tables and give the vehicle client a new DatabaseClient, which has nothing cached"""
+    db_client = vehicle_client.db_client
+    if db_client.spool:
+        db_client.spool.flush()
+        db_client.spool.close()
+
+    def clear(cur):
+        for table in BENCHMARK_TABLES:
+            cur.execute(f"DELETE FROM {table}")
+    db_client.storage.write(clear)
+    vehicle_client.db_client = DatabaseClient(vehicle_client, storage=db_client.storage,
+                                              spool_path=os.path.join(directory, f"{name}.spool.jsonl"))
+
+
+def flush(vehicle_client):
+    if vehicle_client.db_client.spool:
+        vehicle_client.db_client.spool.flush()
+
+
+def count_rows(vehicle_client, table: str) -> int:
+    with vehicle_client.db_client.storage.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        return cur.fetchone()[0]
+
+
+def bench_refresh(vehicle_client, fake: FakeKiaApi, iterations: int) -> list:
+    latencies = []
+    api_calls = sum(fake.requests.values())
+    for _ in range(iterations):
+        start = time.perf_counter()
+        vehicle_client.refresh()
+        latencies.append(time.perf_counter() - start)
+    flush(vehicle_client)
+    stats = percentiles(latencies, 1000)
+    return [result("refresh", stats["p50"], "ms", False, **stats,
+                   api_calls_per_refresh=(sum(fake.requests.values()) - api_calls) / iterations)]
+
+
+def bench_process_trips(vehicle_client, fake: FakeKiaApi, months: list, directory: str) -> list:
+    results = []
+    yesterday = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=1), datetime.time())
+    for month_count in months:
+        reset_database(vehicle_client, directory, f"trips_{month_count}m")
+        first_day = yesterday.replace(day=1) - relativedelta(months=month_count - 1)
+        vehicle_client.vehicle.daily_stats = [DailyDrivingStats(date=first_day + datetime.timedelta(days=i))
+                                              for i in range((yesterday - first_day).days + 1)]
+        api_calls = sum(fake.requests.values())
+        start = time.perf_counter()
+        vehicle_client.process_trips()
+        flush(vehicle_client)
+        elapsed = time.perf_counter() - start
+        trips = count_rows(vehicle_client, "trips")
+        results.append(result(f"process_trips_{month_count}m", trips / elapsed, "trips/s", True, trips=trips,
+                              seconds=round(elapsed, 3), api_calls=sum(fake.requests.values()) - api_calls))
+    return results
+
+
+def bench_save_daily_stats(vehicle_client, sizes: list, directory: str) -> list:
+    results = []
+    yesterday = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=1), datetime.time())
+    for size in sizes:
+        reset_database(vehicle_client, directory, f"daily_stats_{size}")
+        vehicle_client.vehicle.daily_stats = [
+            DailyDrivingStats(date=yesterday - datetime.timedelta(days=i), total_consumed=12000,
+                              engine_consumption=9000, climate_consumption=2000, onboard_electronics_consumption=500,
+                              battery_care_consumption=500, regenerated_energy=3000, distance=80)
+            for i in range(size)]
+        # first call: every day is new, second call: every day is already saved (the usual case)
+        for variant in ("new", "saved"):
+            start = time.perf_counter()
+            vehicle_client.db_client.save_daily_stats()
+            elapsed = time.perf_counter() - start
+            results.append(result(f"save_daily_stats_{size}_{variant}", size / elapsed, "days/s", True,
+                                  days=size, ms=round(elapsed * 1000, 3)))
+    return results
+
+
+def bench_parse(vehicle_client, fake: FakeKiaApi, iterations: int) -> list:
+    api = vehicle_client.api
+    state = fake.fixtures[0]
+    update = api._update_vehicle_properties_ccs2 if fake.ccs2 else api._update_vehicle_properties
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        update(vehicle_client.vehicle, state)
+        latencies.append(time.perf_counter() - start)
+    stats = percentiles(latencies, 1000000)
+    return [result("parse_vehicle_properties", stats["p50"], "us", False, **stats)]
+
+
+def bench_status(duration: float, clients: int, port: int) -> list:
+    load = load_test_status.run("waitress", port, clients, duration, ttl=600, api_latency=0)
+    stats = percentiles(load["latencies"], 1000) if load["latencies"] else {}
+    return [result("status", load["requests_per_second"], "req/s", True, clients=clients, errors=load["errors"],
+                   latency_ms=stats)]
+
+
+def metadata(args) -> dict:
+    def git(*command):
+        try:
+            return subprocess.run(("git",) + command, capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except OSError:
+            return None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "arguments": vars(args),
+    }
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """Print the change of every result present in the baseline, return the names of those that regressed"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {entry["name"]: entry for entry in json.load(f)["results"]}
+    regressions = []
+    print(f"compared to {baseline_path} (tolerance {tolerance:.0%}):")
+    for entry in results:
+        before = baseline.get(entry["name"])
+        if not before or not before["value"]:
+            continue
+        change = (entry["value"] - before["value"]) / before["value"]
+        regressed = -change > tolerance if entry["higher_is_better"] else change > tolerance
+        if regressed:
+            regressions.append(entry["name"])
+        print(f"  {entry['name']:<36} {before['value']:>12.3f} -> {entry['value']:>12.3f} {entry['unit']:<8} "
+              f"{change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="benchmarks to run, comma separated")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds added by the fake API per call")
+    parser.add_argument("--refresh-iterations", type=int, default=100)
+    parser.add_argument("--months", default="1,12,36", help="months of trip history to backfill")
+    parser.add_argument("--daily-stats-sizes", default="100,1000,10000", help="days of statistics saved at once")
+    parser.add_argument("--parse-iterations", type=int, default=5000)
+    parser.add_argument("--status-duration", type=float, default=5, help="seconds of /status load")
+    parser.add_argument("--status-clients", type=int, default=16)
+    parser.add_argument("--port", type=int, default=5099, help="port of the HTTP server under /status load")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    only = set(args.only.split(","))
+    unknown = only - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks {', '.join(sorted(unknown))}, use {', '.join(BENCHMARKS)}")
+    if args.backend == "mysql" and not (os.environ.get("UVO_DB_HOST") and os.environ.get("UVO_DB_USER")
+                                        and os.environ.get("UVO_DB_NAME")):
+        parser.error("--backend mysql needs UVO_DB_HOST, UVO_DB_USER and UVO_DB_NAME")
+
+    directory = tempfile.TemporaryDirectory()
+    fake = FakeKiaApi(latency=args.api_latency, clock=StepClock(args.refresh_iterations + 60))
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    # waitress warns about its queue depth all along the /status load
+    logging.getLogger("waitress.queue").setLevel(logging.ERROR)
+    base_url = fake.start()
+    results = []
+    try:
+        if only - {"status"}:
+            vehicle_client = create_vehicle_client(directory.name, base_url, args.backend)
+            # first refresh: loads the vehicle and saves its first state
+            vehicle_client.refresh()
+            if "refresh" in only:
+                results += bench_refresh(vehicle_client, fake, args.refresh_iterations)
+            if "process_trips" in only:
+                results += bench_process_trips(vehicle_client, fake, [int(n) for n in args.months.split(",")],
+                                               directory.name)
+            if "save_daily_stats" in only:
+                results += bench_save_daily_stats(vehicle_client, [int(n) for n in args.daily_stats_sizes.split(",")],
+                                                  directory.name)
+            if "parse_vehicle_properties" in only:
+                results += bench_parse(vehicle_client, fake, args.parse_iterations)
+            if vehicle_client.db_client.spool:
+                vehicle_client.db_client.spool.close()
+            vehicle_client.db_client.storage.close()
+        if "status" in only:
+            results += bench_status(args.status_duration, args.status_clients, args.port)
+    finally:
+        fake.stop()
+
+    print(f"backend={args.backend} api_latency={args.api_latency}s")
+    for entry in results:
+        print(f"  {entry['name']:<36} {entry['value']:>12.3f} {entry['unit']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": metadata(args), "results": results}, f, indent=2)
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
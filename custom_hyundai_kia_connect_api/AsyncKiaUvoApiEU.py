@@ -0,0 +1,488 @@
+"""AsyncKiaUvoApiEU.py"""
+
+# pylint:disable=invalid-name,logging-fstring-interpolation,broad-except,line-too-long
+
+import asyncio
+import datetime as dt
+import functools
+import json
+import logging
+
+import pytz
+
+from hyundai_kia_connect_api.ApiImplType1 import _check_response_for_errors
+from hyundai_kia_connect_api.Token import Token
+from hyundai_kia_connect_api.Vehicle import Vehicle
+from hyundai_kia_connect_api.const import (
+    BRAND_KIA,
+    BRANDS,
+    CHARGE_PORT_ACTION,
+    DOMAIN,
+    ENGINE_TYPES,
+    ORDER_STATUS,
+    VALET_MODE_ACTION,
+)
+from hyundai_kia_connect_api.exceptions import APIError
+
+from .KiaUvoApiEU import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_TIMEOUT,
+    KiaUvoApiEU,
+)
+
+try:
+    import aiohttp
+except ImportError:  # optional: pip install aiohttp, the blocking API then runs in worker threads
+    aiohttp = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# same retry policy as the session of KiaUvoApiEU: connection errors, and 502/503/504 answers to GETs
+_RETRY_STATUSES = (502, 503, 504)
+_BACKOFF_FACTOR = 0.5
+# seconds between two polls of check_action_status(synchronous=True)
+_ACTION_STATUS_POLL_SECONDS = 5
+
+
+def _blocking_fallback(method):
+    """Without aiohttp, run the KiaUvoApiEU method of the same name in a worker thread instead"""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if aiohttp is None:
+            return await asyncio.to_thread(getattr(self.api, method.__name__), *args, **kwargs)
+        return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
+async def _gather(*awaitables) -> list:
+    """
+    Await independent calls at the same time and return their results in order. Like KiaUvoApiEU._call_all(),
+    every call is waited for, then the exception of the first failed one (in call order) is raised.
+    """
+    outcomes = await asyncio.gather(*awaitables, return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return outcomes
+
+
+class _Response:
+    """The parts of a requests.Response that the API code and the request middleware use"""
+
+    def __init__(self, status_code: int, headers, content: bytes) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncKiaUvoApiEU:
+    """
+    Asyncio variant of KiaUvoApiEU, on an aiohttp connection pool.
+    Role:
+    - the same calls as KiaUvoApiEU (login, cached and forced refresh, trips, driving info, charge/port/valet
+      commands and their status), as coroutines
+    - the URLs, headers and the parsing of the answers are KiaUvoApiEU's (self.api), only the I/O is different
+    - independent calls of one refresh are awaited together, like KiaUvoApiEU does with its thread pool
+    Hyundai and Genesis log in with the blocking redirect and form flow in a worker thread, it runs once a day
+    at most. Without aiohttp, every call runs the blocking KiaUvoApiEU in a worker thread.
+    """
+
+    def __init__(
+        self,
+        region: int,
+        brand: int,
+        language: str,
+        timeout=DEFAULT_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_url: str = None,
+    ) -> None:
+        """
+        :param pool_size: connections open at the same time, the other requests wait for one
+        The other parameters are KiaUvoApiEU's.
+        """
+        self.api = KiaUvoApiEU(
+            region,
+            brand,
+            language,
+            timeout=timeout,
+            pool_size=pool_size,
+            max_retries=max_retries,
+            base_url=base_url,
+            parallel_requests=1,
+        )
+        # middleware(method, url, send) wrapping every HTTP request, see add_request_middleware()
+        self.request_middleware = []
+        # created on first use, inside the event loop
+        self._connector = None
+        self._timeout = None
+        self.session = None
+        if aiohttp is None:
+            _LOGGER.warning("aiohttp is not installed, AsyncKiaUvoApiEU runs the blocking API in worker threads")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def add_request_middleware(self, middleware) -> None:
+        """
+        Wrap every HTTP request with middleware(method, url, send), like KiaUvoApiEU.add_request_middleware().
+        send() returns an awaitable of the response: middleware acting before the request (RequestBudget.middleware)
+        just returns it and works for both clients, a coroutine function middleware may await it.
+        """
+        self.request_middleware.append(middleware)
+        # used by the calls made with the blocking API
+        self.api.add_request_middleware(middleware)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            await self._connector.close()
+            self.session = self._connector = None
+        self.api.close()
+
+    def _create_session(self):
+        if self._connector is None:
+            timeout = self.api.timeout
+            connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            self._connector = aiohttp.TCPConnector(limit=self.api.pool_size)
+            self._timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        # unsafe: also keep the cookies of IP addresses (e.g. of benchmarks/fake_kia_api.py)
+        return aiohttp.ClientSession(
+            connector=self._connector,
+            connector_owner=False,
+            timeout=self._timeout,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+        )
+
+    async def _request(self, method: str, url: str, session=None, **kwargs) -> _Response:
+        """
+        Send a request through the middleware, retrying connection errors and 502/503/504 answers to GETs.
+        session: the login session, defaults to the shared one
+        """
+        if session is None:
+            if self.session is None:
+                self.session = self._create_session()
+            session = self.session
+
+        async def send() -> _Response:
+            for attempt in range(self.api.max_retries + 1):
+                if attempt:
+                    await asyncio.sleep(_BACKOFF_FACTOR * 2 ** (attempt - 1))
+                try:
+                    async with session.request(method, url, **kwargs) as answer:
+                        response = _Response(answer.status, answer.headers, await answer.read())
+                except aiohttp.ClientConnectorError:
+                    if attempt == self.api.max_retries:
+                        raise
+                    continue
+                if (
+                    method != "GET"
+                    or response.status_code not in _RETRY_STATUSES
+                    or attempt == self.api.max_retries
+                ):
+                    return response
+
+        call = send
+        for middleware in reversed(self.request_middleware):
+            call = functools.partial(middleware, method, url, call)
+        return await call()
+
+    async def _get_json(self, method: str, url: str, **kwargs) -> dict:
+        return (await self._request(method, url, **kwargs)).json()
+
+    @_blocking_fallback
+    async def login(self, username: str, password: str, pin: str = None) -> Token:
+        if BRANDS[self.api.brand] != BRAND_KIA:
+            return await asyncio.to_thread(self.api.login, username, password, pin)
+
+        stamp = self.api._get_stamp()
+        device_id = await self._get_device_id(stamp)
+        # the login flow relies on cookies, keep them out of the shared session
+        async with self._create_session() as login_session:
+            url = self.api._cookies_url()
+            _LOGGER.debug("%s - Get cookies request: %s", DOMAIN, url)
+            await self._request("GET", url, session=login_session)
+            cookies = {cookie.key: cookie.value for cookie in login_session.cookie_jar}
+            _LOGGER.debug("%s - Get cookies response: %s", DOMAIN, cookies)
+            await self._request(
+                "POST",
+                self.api.USER_API_URL + "language",
+                session=login_session,
+                json={"lang": self.api.LANGUAGE},
+                headers={"Content-type": "application/json"},
+                cookies=cookies,
+            )
+
+        # for Kia the password is the refresh token
+        _, access_token, _, expires_in = await self._get_access_token(stamp, password)
+        return Token(
+            username=username,
+            password=password,
+            access_token=access_token,
+            refresh_token=password,
+            device_id=device_id,
+            valid_until=dt.datetime.now(pytz.utc) + dt.timedelta(seconds=expires_in),
+            pin=pin,
+        )
+
+    @_blocking_fallback
+    async def refresh_access_token(self, token: Token) -> Token:
+        """Same as KiaUvoApiEU.refresh_access_token(): the refresh token grant for Kia, a new login otherwise"""
+        if BRANDS[self.api.brand] != BRAND_KIA or not token.refresh_token:
+            return await self.login(token.username, token.password, token.pin)
+
+        _, access_token, _, expires_in = await self._get_access_token(
+            self.api._get_stamp(), token.refresh_token
+        )
+        return Token(
+            username=token.username,
+            password=token.password,
+            access_token=access_token,
+            refresh_token=token.refresh_token,
+            device_id=token.device_id,
+            valid_until=dt.datetime.now(pytz.utc) + dt.timedelta(seconds=expires_in),
+            pin=token.pin,
+        )
+
+    async def _get_access_token(self, stamp, authorization_code) -> tuple:
+        url, kwargs = self.api._access_token_request(stamp, authorization_code)
+        return self.api._access_token_from_response(await self._get_json("POST", url, **kwargs))
+
+    @_blocking_fallback
+    async def _get_device_id(self, stamp: str) -> str:
+        url, headers, payload = self.api._device_id_request(stamp)
+        _LOGGER.debug("%s - Get Device ID request: %s %s %s", DOMAIN, url, headers, payload)
+        response = await self._get_json("POST", url, headers=headers, json=payload)
+        return self.api._device_id_from_response(response)
+
+    @_blocking_fallback
+    async def get_vehicles(self, token: Token) -> list[Vehicle]:
+        response = await self._get_json(
+            "GET",
+            self.api.SPA_API_URL + "vehicles",
+            headers=self.api._get_authenticated_headers(token),
+        )
+        _LOGGER.debug("%s - Get Vehicles Response: %s", DOMAIN, response)
+        _check_response_for_errors(response)
+        return self.api._vehicles_from_response(response)
+
+    @_blocking_fallback
+    async def update_vehicle_with_cached_state(self, token: Token, vehicle: Vehicle) -> None:
+        state = await self._get_cached_vehicle_state(token, vehicle)
+        if vehicle.ccu_ccs2_protocol_support == 0:
+            self.api._update_vehicle_properties(vehicle, state)
+        else:
+            self.api._update_vehicle_properties_ccs2(vehicle, state)
+        await self._update_driving_info(token, vehicle)
+
+    @_blocking_fallback
+    async def force_refresh_vehicle_state(self, token: Token, vehicle: Vehicle) -> None:
+        # the location is only worth its API call once the car answered the forced status request, as in KiaUvoApiEU
+        state = await self._get_forced_vehicle_state(token, vehicle)
+        state["vehicleLocation"] = await self._get_location(token, vehicle)
+        self.api._update_vehicle_properties(vehicle, state)
+        await self._update_driving_info(token, vehicle)
+
+    async def _update_driving_info(self, token: Token, vehicle: Vehicle) -> None:
+        # Only call for driving info on cars we know have a chance of supporting it, as KiaUvoApiEU does
+        if vehicle.engine_type not in (ENGINE_TYPES.EV, ENGINE_TYPES.PHEV):
+            return
+        try:
+            state = await self._get_driving_info(token, vehicle)
+        except Exception as e:
+            # we don't know if all car types provide this information, nor what the API returns if it is
+            # unavailable, so catch any exception and move on
+            _LOGGER.exception(
+                """Failed to parse driving info. Possible reasons:
+                                    - new API format
+                                    - API outage
+                            """,
+                exc_info=e,
+            )
+        else:
+            self.api._update_vehicle_drive_info(vehicle, state)
+
+    @_blocking_fallback
+    async def _get_cached_vehicle_state(self, token: Token, vehicle: Vehicle) -> dict:
+        url = self.api.SPA_API_URL + "vehicles/" + vehicle.id
+        if vehicle.ccu_ccs2_protocol_support == 0:
+            url = url + "/status/latest"
+        else:
+            url = url + "/ccs2/carstatus/latest"
+        response = await self._get_json(
+            "GET",
+            url,
+            headers=self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support),
+        )
+        _LOGGER.debug("%s - get_cached_vehicle_status response: %s", DOMAIN, response)
+        _check_response_for_errors(response)
+        if vehicle.ccu_ccs2_protocol_support == 0:
+            return response["resMsg"]["vehicleStatusInfo"]
+        return response["resMsg"]["state"]["Vehicle"]
+
+    @_blocking_fallback
+    async def _get_location(self, token: Token, vehicle: Vehicle) -> dict:
+        url = self.api.SPA_API_URL + "vehicles/" + vehicle.id + "/location"
+        try:
+            response = await self._get_json(
+                "GET",
+                url,
+                headers=self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support),
+            )
+            _LOGGER.debug("%s - _get_location response: %s", DOMAIN, response)
+            _check_response_for_errors(response)
+            return response["resMsg"]["gpsDetail"]
+        except Exception:
+            _LOGGER.warning(f"{DOMAIN} - _get_location failed")
+            return None
+
+    @_blocking_fallback
+    async def _get_forced_vehicle_state(self, token: Token, vehicle: Vehicle) -> dict:
+        url = self.api.SPA_API_URL + "vehicles/" + vehicle.id + "/status"
+        response = await self._get_json(
+            "GET",
+            url,
+            headers=self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support),
+        )
+        _LOGGER.debug("%s - Received forced vehicle data: %s", DOMAIN, response)
+        _check_response_for_errors(response)
+        return {"vehicleStatus": response["resMsg"]}
+
+    @_blocking_fallback
+    async def _get_trip_info(
+        self, token: Token, vehicle: Vehicle, date_string: str, trip_period_type: int
+    ) -> dict:
+        url = self.api.SPA_API_URL + "vehicles/" + vehicle.id + "/tripinfo"
+        if trip_period_type == 0:  # month
+            payload = {"tripPeriodType": 0, "setTripMonth": date_string}
+        else:
+            payload = {"tripPeriodType": 1, "setTripDay": date_string}
+
+        _LOGGER.debug("%s - get_trip_info Request %s", DOMAIN, payload)
+        response = await self._get_json(
+            "POST",
+            url,
+            json=payload,
+            headers=self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support),
+        )
+        _LOGGER.debug("%s - get_trip_info response %s", DOMAIN, response)
+        _check_response_for_errors(response)
+        return response
+
+    @_blocking_fallback
+    async def update_month_trip_info(self, token, vehicle, yyyymm_string) -> None:
+        vehicle.month_trip_info = None
+        json_result = await self._get_trip_info(token, vehicle, yyyymm_string, 0)
+        vehicle.month_trip_info = self.api._month_trip_info(yyyymm_string, json_result)
+
+    @_blocking_fallback
+    async def update_day_trip_info(self, token, vehicle, yyyymmdd_string) -> None:
+        vehicle.day_trip_info = None
+        json_result = await self._get_trip_info(token, vehicle, yyyymmdd_string, 1)
+        vehicle.day_trip_info = self.api._day_trip_info(yyyymmdd_string, json_result)
+
+    @_blocking_fallback
+    async def _get_driving_info(self, token: Token, vehicle: Vehicle) -> dict:
+        url = self.api.SPA_API_URL + "vehicles/" + vehicle.id + "/drvhistory"
+
+        def get_period(period_target: int):
+            return self._get_json(
+                "POST",
+                url,
+                json={"periodTarget": period_target},
+                headers=self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support),
+            )
+
+        responseAlltime, response30d = await _gather(get_period(1), get_period(0))
+        return self.api._driving_info(vehicle, responseAlltime, response30d)
+
+    @_blocking_fallback
+    async def _get_control_token(self, token: Token) -> tuple:
+        url, headers, data = self.api._control_token_request(token)
+        response = await self._get_json("PUT", url, json=data, headers=headers)
+        return self.api._control_token_from_response(response)
+
+    async def _get_control_headers(self, token: Token, vehicle: Vehicle) -> dict:
+        control_token, _ = await self._get_control_token(token)
+        return self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support) | {
+            "Authorization": control_token,
+            "AuthorizationCCSP": control_token,
+        }
+
+    async def _send_action(self, token: Token, name: str, url: str, payload: dict, headers: dict) -> str:
+        """Send a command, then register a new device ID as KiaUvoApiEU does, return the message ID"""
+        _LOGGER.debug("%s - %s Request: %s", DOMAIN, name, payload)
+        response = await self._get_json("POST", url, json=payload, headers=headers)
+        _LOGGER.debug("%s - %s Response: %s", DOMAIN, name, response)
+        _check_response_for_errors(response)
+        token.device_id = await self._get_device_id(self.api._get_stamp())
+        return response["msgId"]
+
+    @_blocking_fallback
+    async def charge_port_action(self, token: Token, vehicle: Vehicle, action: CHARGE_PORT_ACTION) -> str:
+        url = self.api.SPA_API_URL_V2 + "vehicles/" + vehicle.id + "/control/portdoor"
+        headers = await self._get_control_headers(token, vehicle)
+        return await self._send_action(token, "Charge Port Action", url, {"action": action.value}, headers)
+
+    @_blocking_fallback
+    async def valet_mode_action(self, token: Token, vehicle: Vehicle, action: VALET_MODE_ACTION) -> str:
+        url = self.api.SPA_API_URL_V2 + "vehicles/" + vehicle.id + "/control/valet"
+        headers = await self._get_control_headers(token, vehicle)
+        return await self._send_action(token, "Valet Mode Action", url, {"action": action.value}, headers)
+
+    @_blocking_fallback
+    async def start_charge(self, token: Token, vehicle: Vehicle) -> str:
+        return await self._charge_action(token, vehicle, "start")
+
+    @_blocking_fallback
+    async def stop_charge(self, token: Token, vehicle: Vehicle) -> str:
+        return await self._charge_action(token, vehicle, "stop")
+
+    async def _charge_action(self, token: Token, vehicle: Vehicle, action: str) -> str:
+        if not vehicle.ccu_ccs2_protocol_support:
+            url = self.api.SPA_API_URL + "vehicles/" + vehicle.id + "/control/charge"
+            payload = {"action": action, "deviceId": token.device_id}
+            headers = self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support)
+        else:
+            url = self.api.SPA_API_URL_V2 + "vehicles/" + vehicle.id + "/ccs2/control/charge"
+            payload = {"command": action}
+            headers = await self._get_control_headers(token, vehicle)
+        return await self._send_action(token, f"{action.capitalize()} Charge Action", url, payload, headers)
+
+    @_blocking_fallback
+    async def check_action_status(
+        self,
+        token: Token,
+        vehicle: Vehicle,
+        action_id: str,
+        synchronous: bool = False,
+        timeout: int = 0,
+    ) -> ORDER_STATUS:
+        if synchronous:
+            if timeout < 1:
+                raise APIError("Timeout must be 1 or higher")
+            end_time = dt.datetime.now() + dt.timedelta(seconds=timeout)
+            while end_time > dt.datetime.now():
+                state = await self.check_action_status(token, vehicle, action_id)
+                if state != ORDER_STATUS.PENDING:
+                    return state
+                await asyncio.sleep(_ACTION_STATUS_POLL_SECONDS)
+            return ORDER_STATUS.TIMEOUT
+
+        response = await self._get_json(
+            "GET",
+            self.api.SPA_API_URL + "notifications/" + vehicle.id + "/records",
+            headers=self.api._get_authenticated_headers(token, vehicle.ccu_ccs2_protocol_support),
+        )
+        _LOGGER.debug("%s - Check last action status Response: %s", DOMAIN, response)
+        _check_response_for_errors(response)
+        return self.api._action_status(response, action_id)
@@ -0,0 +1,81 @@
+"""Precompiled access to the fields of nested API payloads"""
+
+
+def _compile(entries) -> tuple:
+    """
+    Build the tree of (key, index, leaves, children) nodes of dotted paths, sharing their common prefixes.
+    entries: (path, name, converter) triples, leaves: the (name, converter) pairs of the paths ending at a node.
+    """
+    root = {}
+    for path, name, converter in entries:
+        node = root
+        segments = path.split(".")
+        for depth, segment in enumerate(segments):
+            child = node.setdefault(segment, {"leaves": [], "children": {}})
+            if depth == len(segments) - 1:
+                child["leaves"].append((name, converter))
+            node = child["children"]
+
+    def freeze(nodes: dict) -> tuple:
+        return tuple(
+            (segment, int(segment) if segment.lstrip("-").isdigit() else None, tuple(node["leaves"]),
+             freeze(node["children"]))
+            for segment, node in nodes.items())
+
+    return freeze(root)
+
+
+def _walk(value, nodes: tuple, values: dict) -> None:
+    for key, index, leaves, children in nodes:
+        # same lookup as get_child_value: the key, else the list index, else the path does not exist
+        try:
+            child = value[key]
+        except Exception:
+            if index is None:
+                continue
+            try:
+                child = value[index]
+            except Exception:
+                continue
+        for name, converter in leaves:
+            values[name] = converter(child) if converter else child
+        if children:
+            _walk(child, children, values)
+
+
+class FieldMap:
+    """
+    Declarative mapping of payload fields, compiled once.
+    Role:
+    - fields: (attribute, path) or (attribute, path, converter) entries, copied to an object by apply()
+    - paths: {name: path} of the values the caller processes itself
+    - read() walks the payload once, every shared prefix only once, instead of one get_child_value() walk from the
+      root per field. Paths have the get_child_value() syntax and meaning ("a.b.0.c", a segment is a key or else
+      a list index), a missing path reads as None (converted, for fields with a converter).
+    """
+
+    def __init__(self, fields=(), paths: dict = None):
+        self.fields = tuple((field[0], field[1], field[2] if len(field) > 2 else None) for field in fields)
+        self.paths = dict(paths or {})
+        names = [attribute for attribute, _, _ in self.fields] + list(self.paths)
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Names mapped more than once: {', '.join(sorted(duplicates))}")
+
+        entries = [(path, attribute, converter) for attribute, path, converter in self.fields]
+        entries += [(path, name, None) for name, path in self.paths.items()]
+        self._tree = _compile(entries)
+        self._defaults = {attribute: converter(None) if converter else None
+                          for attribute, _, converter in self.fields}
+        self._defaults.update(dict.fromkeys(self.paths))
+
+    def read(self, data) -> dict:
+        """Values of the fields and paths in data, by name"""
+        values = dict(self._defaults)
+        _walk(data, self._tree, values)
+        return values
+
+    def apply(self, values: dict, target) -> None:
+        """Set the fields read by read() on target, in the order they were declared"""
+        for attribute, _, _ in self.fields:
+            setattr(target, attribute, values[attribute])
@@ -3,16 +3,24 @@
 # pylint:disable=missing-timeout,missing-class-docstring,missing-function-docstring,wildcard-import,unused-wildcard-import,invalid-name,logging-fstring-interpolation,broad-except,bare-except,super-init-not-called,unused-argument,line-too-long,too-many-lines
 
 import base64
+import contextvars
+import functools
 import random
 import datetime as dt
 import logging
 import uuid
 import re
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
 from urllib.parse import parse_qs, urlparse
 
 import pytz
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dateutil import tz
 
 
@@ -37,11 +45,13 @@ from hyundai_kia_connect_api.const import (
     DISTANCE_UNITS,
     DOMAIN,
     ENGINE_TYPES,
+    ORDER_STATUS,
     SEAT_STATUS,
     TEMPERATURE_UNITS,
     VALET_MODE_ACTION,
 )
 from hyundai_kia_connect_api.exceptions import (
+    APIError,
     AuthenticationError,
 )
 from hyundai_kia_connect_api.utils import (
@@ -50,12 +60,26 @@ from hyundai_kia_connect_api.utils import (
     parse_datetime,
 )
 
+from .FieldMap import FieldMap
+
 _LOGGER = logging.getLogger(__name__)
 
 USER_AGENT_OK_HTTP: str = "okhttp/3.12.0"
 USER_AGENT_MOZILLA: str = "Mozilla/5.0 (Linux; Android 4.1.1; Galaxy Nexus Build/JRO03C) AppleWebKit/535.19 (KHTML, like Gecko) Chrome/18.0.1025.166 Mobile Safari/535.19"  # noqa
 ACCEPT_HEADER_ALL: str = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9"  # noqa
 
+# get_vehicles, check_action_status, start_charge/stop_charge and _get_control_token are copies of the ApiImplType1
+# methods, with the requests sent through the pooled session (the library calls requests.* directly) and split into
+# request and answer helpers that AsyncKiaUvoApiEU shares. tests/test_library_copies.py fails when the library changes
+# one of them.
+
+# (connect, read) timeouts in seconds, the API occasionally hangs without ever answering
+DEFAULT_TIMEOUT = (10, 30)
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 2
+# independent calls of one refresh (status and location, the two driving info periods) made at the same time
+DEFAULT_PARALLEL_REQUESTS = 4
+
 SUPPORTED_LANGUAGES_LIST = [
     "en",  # English
     "de",  # German
@@ -75,11 +99,266 @@ SUPPORTED_LANGUAGES_LIST = [
 ]
 
 
+def _minutes(value):
+    return value, "m"
+
+
+def _outcome(call) -> tuple:
+    """(result, None) if call() succeeded, else (None, exception)"""
+    try:
+        return call(), None
+    except Exception as e:
+        return None, e
+
+
+# Fields of a status payload (status/latest vehicleStatusInfo, or forced status + location), read in one walk by
+# _update_vehicle_properties: the fields are copied to the vehicle as they are, the paths are processed there.
+_EV_STATUS = "vehicleStatus.evStatus."
+_EV_RANGE = _EV_STATUS + "drvDistance.0.rangeByFuel."
+_RESERVATION = _EV_STATUS + "reservChargeInfos."
+_DEPARTURE_1 = _RESERVATION + "reservChargeInfo.reservChargeInfoDetail."
+_DEPARTURE_2 = _RESERVATION + "reserveChargeInfo2.reservChargeInfoDetail."
+_OFF_PEAK = _RESERVATION + "offpeakPowerInfo.offPeakPowerTime1."
+_STATUS_FIELDS = FieldMap(
+    fields=(
+        ("car_battery_percentage", "vehicleStatus.battery.batSoc"),
+        ("engine_is_running", "vehicleStatus.engine"),
+        ("defrost_is_on", "vehicleStatus.defrost"),
+        ("back_window_heater_is_on", "vehicleStatus.sideBackWindowHeat"),
+        ("side_mirror_heater_is_on", "vehicleStatus.sideMirrorHeat"),
+        ("front_left_seat_status", "vehicleStatus.seatHeaterVentState.flSeatHeatState", SEAT_STATUS.__getitem__),
+        ("front_right_seat_status", "vehicleStatus.seatHeaterVentState.frSeatHeatState", SEAT_STATUS.__getitem__),
+        ("rear_left_seat_status", "vehicleStatus.seatHeaterVentState.rlSeatHeatState", SEAT_STATUS.__getitem__),
+        ("rear_right_seat_status", "vehicleStatus.seatHeaterVentState.rrSeatHeatState", SEAT_STATUS.__getitem__),
+        ("is_locked", "vehicleStatus.doorLock"),
+        ("front_left_door_is_open", "vehicleStatus.doorOpen.frontLeft"),
+        ("front_right_door_is_open", "vehicleStatus.doorOpen.frontRight"),
+        ("back_left_door_is_open", "vehicleStatus.doorOpen.backLeft"),
+        ("back_right_door_is_open", "vehicleStatus.doorOpen.backRight"),
+        ("hood_is_open", "vehicleStatus.hoodOpen"),
+        ("front_left_window_is_open", "vehicleStatus.windowOpen.frontLeft"),
+        ("front_right_window_is_open", "vehicleStatus.windowOpen.frontRight"),
+        ("back_left_window_is_open", "vehicleStatus.windowOpen.backLeft"),
+        ("back_right_window_is_open", "vehicleStatus.windowOpen.backRight"),
+        ("tire_pressure_rear_left_warning_is_on", "vehicleStatus.tirePressureLamp.tirePressureLampRL", bool),
+        ("tire_pressure_front_left_warning_is_on", "vehicleStatus.tirePressureLamp.tirePressureLampFL", bool),
+        ("tire_pressure_front_right_warning_is_on", "vehicleStatus.tirePressureLamp.tirePressureLampFR", bool),
+        ("tire_pressure_rear_right_warning_is_on", "vehicleStatus.tirePressureLamp.tirePressureLampRR", bool),
+        ("tire_pressure_all_warning_is_on", "vehicleStatus.tirePressureLamp.tirePressureLampAll", bool),
+        ("trunk_is_open", "vehicleStatus.trunkOpen"),
+        ("ev_battery_percentage", _EV_STATUS + "batteryStatus"),
+        ("ev_battery_is_charging", _EV_STATUS + "batteryCharge"),
+        ("ev_battery_is_plugged_in", _EV_STATUS + "batteryPlugin"),
+        ("ev_charging_power", _EV_STATUS + "batteryPower.batteryStndChrgPower"),
+        ("ev_estimated_current_charge_duration", _EV_STATUS + "remainTime2.atc.value", _minutes),
+        ("ev_estimated_fast_charge_duration", _EV_STATUS + "remainTime2.etc1.value", _minutes),
+        ("ev_estimated_portable_charge_duration", _EV_STATUS + "remainTime2.etc2.value", _minutes),
+        ("ev_estimated_station_charge_duration", _EV_STATUS + "remainTime2.etc3.value", _minutes),
+        ("ev_first_departure_enabled", _DEPARTURE_1 + "reservChargeSet"),
+        ("ev_second_departure_enabled", _DEPARTURE_2 + "reservChargeSet"),
+        ("ev_first_departure_days", _DEPARTURE_1 + "reservInfo.day"),
+        ("ev_second_departure_days", _DEPARTURE_2 + "reservInfo.day"),
+        ("ev_first_departure_climate_enabled", _DEPARTURE_1 + "reservFatcSet.airCtrl", bool),
+        ("ev_second_departure_climate_enabled", _DEPARTURE_2 + "reservFatcSet.airCtrl", bool),
+        ("ev_first_departure_climate_defrost", _DEPARTURE_1 + "reservFatcSet.defrost"),
+        ("ev_second_departure_climate_defrost", _DEPARTURE_2 + "reservFatcSet.defrost"),
+        ("washer_fluid_warning_is_on", "vehicleStatus.washerFluidStatus"),
+        ("brake_fluid_warning_is_on", "vehicleStatus.breakOilStatus"),
+        ("fuel_level", "vehicleStatus.fuelLevel"),
+        ("fuel_level_is_low", "vehicleStatus.lowFuelLight"),
+        ("air_control_is_on", "vehicleStatus.airCtrlOn"),
+        ("smart_key_battery_warning_is_on", "vehicleStatus.smartKeyBatteryWarning"),
+    ),
+    paths={
+        "time": "vehicleStatus.time",
+        "odometer": "odometer.value",
+        "odometer_unit": "odometer.unit",
+        "air_temperature": "vehicleStatus.airTemp.value",
+        "air_temperature_unit": "vehicleStatus.airTemp.unit",
+        "steering_wheel_heat": "vehicleStatus.steerWheelHeat",
+        "charge_port_door": _EV_STATUS + "chargePortDoorOpenStatus",
+        "total_range": _EV_RANGE + "totalAvailableRange.value",
+        "total_range_unit": _EV_RANGE + "totalAvailableRange.unit",
+        "ev_range": _EV_RANGE + "evModeRange.value",
+        "ev_range_unit": _EV_RANGE + "evModeRange.unit",
+        "gas_range": _EV_RANGE + "gasModeRange.value",
+        "gas_range_unit": _EV_RANGE + "gasModeRange.unit",
+        "dte": "vehicleStatus.dte.value",
+        "dte_unit": "vehicleStatus.dte.unit",
+        "target_soc_list": _RESERVATION + "targetSOClist",
+        "target_range_ac": _RESERVATION + "targetSOClist.1.dte.rangeByFuel.totalAvailableRange.value",
+        "target_range_ac_unit": _RESERVATION + "targetSOClist.1.dte.rangeByFuel.totalAvailableRange.unit",
+        "target_range_dc": _RESERVATION + "targetSOClist.0.dte.rangeByFuel.totalAvailableRange.value",
+        "target_range_dc_unit": _RESERVATION + "targetSOClist.0.dte.rangeByFuel.totalAvailableRange.unit",
+        "first_departure_time": _DEPARTURE_1 + "reservInfo.time.time",
+        "first_departure_time_section": _DEPARTURE_1 + "reservInfo.time.timeSection",
+        "second_departure_time": _DEPARTURE_2 + "reservInfo.time.time",
+        "second_departure_time_section": _DEPARTURE_2 + "reservInfo.time.timeSection",
+        "first_departure_temperature": _DEPARTURE_1 + "reservFatcSet.airTemp.value",
+        "first_departure_temperature_unit": _DEPARTURE_1 + "reservFatcSet.airTemp.unit",
+        "second_departure_temperature": _DEPARTURE_2 + "reservFatcSet.airTemp.value",
+        "second_departure_temperature_unit": _DEPARTURE_2 + "reservFatcSet.airTemp.unit",
+        "off_peak_start": _OFF_PEAK + "starttime.time",
+        "off_peak_start_section": _OFF_PEAK + "starttime.timeSection",
+        "off_peak_end": _OFF_PEAK + "endtime.time",
+        "off_peak_end_section": _OFF_PEAK + "endtime.timeSection",
+        "off_peak_flag": _RESERVATION + "offpeakPowerInfo.offPeakPowerFlag",
+        "reservation_flag": _RESERVATION + "reservFlag",
+        "latitude": "vehicleLocation.coord.lat",
+        "longitude": "vehicleLocation.coord.lon",
+        "location_time": "vehicleLocation.time",
+    },
+)
+
+# Fields of a ccs2 status payload (ccs2/carstatus/latest state.Vehicle), for _update_vehicle_properties_ccs2
+_CCS2_STATUS_FIELDS = FieldMap(
+    fields=(
+        ("car_battery_percentage", "Electronics.Battery.Level"),
+        ("engine_is_running", "DrivingReady"),
+        ("front_left_seat_status", "Cabin.Seat.Row1.Driver.Climate.State", SEAT_STATUS.__getitem__),
+        ("front_right_seat_status", "Cabin.Seat.Row1.Passenger.Climate.State", SEAT_STATUS.__getitem__),
+        ("rear_left_seat_status", "Cabin.Seat.Row2.Left.Climate.State", SEAT_STATUS.__getitem__),
+        ("rear_right_seat_status", "Cabin.Seat.Row2.Right.Climate.State", SEAT_STATUS.__getitem__),
+        ("front_left_door_is_open", "Cabin.Door.Row1.Driver.Open"),
+        ("front_right_door_is_open", "Cabin.Door.Row1.Passenger.Open"),
+        ("back_left_door_is_open", "Cabin.Door.Row2.Left.Open"),
+        ("back_right_door_is_open", "Cabin.Door.Row2.Right.Open"),
+        ("hood_is_open", "Body.Hood.Open"),
+        ("front_left_window_is_open", "Cabin.Window.Row1.Driver.Open"),
+        ("front_right_window_is_open", "Cabin.Window.Row1.Passenger.Open"),
+        ("back_left_window_is_open", "Cabin.Window.Row2.Left.Open"),
+        ("back_right_window_is_open", "Cabin.Window.Row2.Right.Open"),
+        ("tire_pressure_rear_left_warning_is_on", "Chassis.Axle.Row2.Left.Tire.PressureLow", bool),
+        ("tire_pressure_front_left_warning_is_on", "Chassis.Axle.Row1.Left.Tire.PressureLow", bool),
+        ("tire_pressure_front_right_warning_is_on", "Chassis.Axle.Row1.Right.Tire.PressureLow", bool),
+        ("tire_pressure_rear_right_warning_is_on", "Chassis.Axle.Row2.Right.Tire.PressureLow", bool),
+        ("tire_pressure_all_warning_is_on", "Chassis.Axle.Tire.PressureLow", bool),
+        ("trunk_is_open", "Body.Trunk.Open"),
+        ("ev_battery_percentage", "Green.BatteryManagement.BatteryRemain.Ratio"),
+        ("ev_battery_remain", "Green.BatteryManagement.BatteryRemain.Value"),
+        ("ev_battery_capacity", "Green.BatteryManagement.BatteryCapacity.Value"),
+        ("ev_battery_soh_percentage", "Green.BatteryManagement.SoH.Ratio"),
+        ("ev_battery_is_plugged_in", "Green.ChargingInformation.ConnectorFastening.State"),
+        ("washer_fluid_warning_is_on", "Body.Windshield.Front.WasherFluid.LevelLow"),
+        ("ev_estimated_current_charge_duration", "Green.ChargingInformation.Charging.RemainTime", _minutes),
+        ("ev_estimated_fast_charge_duration", "Green.ChargingInformation.EstimatedTime.Standard", _minutes),
+        ("ev_estimated_portable_charge_duration", "Green.ChargingInformation.EstimatedTime.ICCB", _minutes),
+        ("ev_estimated_station_charge_duration", "Green.ChargingInformation.EstimatedTime.Quick", _minutes),
+        ("ev_charge_limits_ac", "Green.ChargingInformation.TargetSoC.Standard"),
+        ("ev_charge_limits_dc", "Green.ChargingInformation.TargetSoC.Quick"),
+        ("ev_charging_current", "Green.ChargingInformation.ElectricCurrentLevel.State"),
+        ("ev_v2l_discharge_limit", "Green.Electric.SmartGrid.VehicleToLoad.DischargeLimitation.SoC"),
+        ("ev_first_departure_enabled", "Green.Reservation.Departure.Schedule1.Enable", bool),
+        ("ev_second_departure_enabled", "Green.Reservation.Departure.Schedule2.Enable", bool),
+        ("brake_fluid_warning_is_on", "Chassis.Brake.Fluid.Warning"),
+        ("fuel_level", "Drivetrain.FuelSystem.FuelLevel"),
+        ("fuel_level_is_low", "Drivetrain.FuelSystem.LowFuelWarning"),
+        ("air_control_is_on", "Cabin.HVAC.Row1.Driver.Blower.SpeedLevel"),
+        ("smart_key_battery_warning_is_on", "Electronics.FOB.LowBattery", bool),
+    ),
+    paths={
+        "offset": "Offset",
+        "date": "Date",
+        "odometer": "Drivetrain.Odometer",
+        "air_temperature": "Cabin.HVAC.Row1.Driver.Temperature.Value",
+        "defrost": "Body.Windshield.Front.Defog.State",
+        "rear_defrost": "Body.Windshield.Rear.Defog.State",
+        "steering_wheel_heat": "Cabin.SteeringWheel.Heat.State",
+        "front_left_lock": "Cabin.Door.Row1.Driver.Lock",
+        "front_right_lock": "Cabin.Door.Row1.Passenger.Lock",
+        "back_left_lock": "Cabin.Door.Row2.Left.Lock",
+        "back_right_lock": "Cabin.Door.Row2.Right.Lock",
+        "sunroof": "Body.Sunroof.Glass.Open",
+        "charging_power": "Green.Electric.SmartGrid.RealTimePower",
+        "charging_door": "Green.ChargingDoor.State",
+        "total_range": "Drivetrain.FuelSystem.DTE.Total",
+        "range_unit": "Drivetrain.FuelSystem.DTE.Unit",
+        "target_range_ac": "Green.ChargingInformation.DTE.TargetSoC.Standard",
+        "target_range_dc": "Green.ChargingInformation.DTE.TargetSoC.Quick",
+        "latitude": "Location.GeoCoord.Latitude",
+        "longitude": "Location.GeoCoord.Longitude",
+        "location_time": "Location.TimeStamp",
+        "location_year": "Location.TimeStamp.Year",
+        "location_month": "Location.TimeStamp.Mon",
+        "location_day": "Location.TimeStamp.Day",
+        "location_hour": "Location.TimeStamp.Hour",
+        "location_minute": "Location.TimeStamp.Min",
+        "location_second": "Location.TimeStamp.Sec",
+    },
+)
+
+# driving info (all time, with the last 30 days) and its days, for _update_vehicle_drive_info and _get_driving_info
+_DRIVE_INFO_FIELDS = FieldMap(fields=(
+    ("total_power_consumed", "totalPwrCsp"),
+    ("total_power_regenerated", "regenPwr"),
+    ("power_consumption_30d", "consumption30d"),
+    ("daily_stats", "dailyStats"),
+))
+_DAILY_STATS_FIELDS = FieldMap(paths={
+    "total_consumed": "totalPwrCsp",
+    "engine_consumption": "motorPwrCsp",
+    "climate_consumption": "climatePwrCsp",
+    "onboard_electronics_consumption": "eDPwrCsp",
+    "battery_care_consumption": "batteryMgPwrCsp",
+    "regenerated_energy": "regenPwr",
+    "distance": "calculativeOdo",
+})
+
+
+class _ApiSession(requests.Session):
+    """requests.Session that applies a default timeout and the request middleware to every request"""
+
+    def __init__(self, timeout, middleware: list) -> None:
+        super().__init__()
+        self.timeout = timeout
+        self.middleware = middleware
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        send = functools.partial(super().request, method, url, **kwargs)
+        for middleware in reversed(self.middleware):
+            send = functools.partial(middleware, method, url, send)
+        return send()
+
+
 class KiaUvoApiEU(ApiImplType1):
     data_timezone = tz.gettz("Europe/Berlin")
     temperature_range = [x * 0.5 for x in range(28, 60)]
 
-    def __init__(self, region: int, brand: int, language: str) -> None:
+    def __init__(
+        self,
+        region: int,
+        brand: int,
+        language: str,
+        timeout=DEFAULT_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_url: str = None,
+        parallel_requests: int = DEFAULT_PARALLEL_REQUESTS,
+    ) -> None:
+        """
+        :param base_url: send every request (login included) to this server instead of the brand's,
+                         e.g. http://127.0.0.1:8899 for benchmarks/fake_kia_api.py
+        :param parallel_requests: how many independent calls of one refresh are made at the same time,
+                                  1 to make them one after the other
+        """
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.parallel_requests = max(1, parallel_requests)
+        # the calling thread makes the first call itself, the pool the others
+        self._executor = None
+        if self.parallel_requests > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.parallel_requests - 1, thread_name_prefix="api"
+            )
+        # callables middleware(method, url, send) wrapping every HTTP request, see add_request_middleware()
+        self.request_middleware = []
+        # keep-alive session shared by all API calls, the login flow uses its own (see login())
+        self.session = self._create_session()
+        # the session of the login in progress, per thread: logins of several accounts may run at the same time
+        self._login_state = threading.local()
+
         language = language.lower()
         # Strip language variants (e.g. en-Gb)
         if len(language) > 2:
@@ -130,6 +409,12 @@ class KiaUvoApiEU(ApiImplType1):
         self.USER_API_URL: str = "https://" + self.BASE_URL + "/api/v1/user/"
         self.SPA_API_URL: str = "https://" + self.BASE_URL + "/api/v1/spa/"
         self.SPA_API_URL_V2: str = "https://" + self.BASE_URL + "/api/v2/spa/"
+        if base_url:
+            base_url = base_url.rstrip("/")
+            self.USER_API_URL = base_url + "/api/v1/user/"
+            self.SPA_API_URL = base_url + "/api/v1/spa/"
+            self.SPA_API_URL_V2 = base_url + "/api/v2/spa/"
+            self.LOGIN_FORM_HOST = base_url
 
         self.CLIENT_ID: str = self.CCSP_SERVICE_ID
         self.GCM_SENDER_ID = 199360397125
@@ -173,7 +458,83 @@ class KiaUvoApiEU(ApiImplType1):
                 + "&state=$service_id:$user_id"
             )
 
-    def login(self, username: str, password: str) -> Token:
+    def _create_session(self) -> requests.Session:
+        """
+        Create a session with a connection pool, default timeouts and a retry policy.
+        Only connection errors and 502/503/504 answers are retried, and POSTs are only retried
+        when the connection could not be established, so a command is never sent twice.
+        """
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=2, pool_maxsize=self.pool_size, max_retries=retry
+        )
+        session = _ApiSession(self.timeout, self.request_middleware)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # requests already asks for (and decodes) gzip, this just makes it explicit for every call
+        session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        return session
+
+    def add_request_middleware(self, middleware) -> None:
+        """
+        Wrap every HTTP request made by this API (login included) with middleware(method, url, send).
+        The middleware must call send() and return its response, or raise to prevent the request.
+        """
+        self.request_middleware.append(middleware)
+
+    @property
+    def login_session(self) -> requests.Session:
+        return getattr(self._login_state, "session", None)
+
+    @login_session.setter
+    def login_session(self, session: requests.Session) -> None:
+        self._login_state.session = session
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def _call_all(self, *calls) -> list:
+        """
+        Make independent API calls at the same time and return their results in the order of the calls.
+        Every call is waited for, then the exception of the first failed one (in call order) is raised, so the
+        outcome does not depend on which answer came first. Each call runs in a copy of the caller's context,
+        for the request budget priority and the tracing span.
+        """
+        if self._executor is None or len(calls) < 2:
+            return [call() for call in calls]
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, call)
+            for call in calls[1:]
+        ]
+        outcomes = [_outcome(calls[0])] + [_outcome(future.result) for future in futures]
+        for _, error in outcomes:
+            if error is not None:
+                raise error
+        return [result for result, _ in outcomes]
+
+    def login(self, username: str, password: str, pin: str = None) -> Token:
+        # the login flow relies on cookies, keep them out of the shared session
+        self.login_session = self._create_session()
+        try:
+            token = self._login(username, password)
+            token.pin = pin
+            return token
+        finally:
+            self.login_session.close()
+            self.login_session = None
+
+    def _login(self, username: str, password: str) -> Token:
         stamp = self._get_stamp()
         device_id = self._get_device_id(stamp)
         cookies = self._get_cookies()
@@ -202,7 +563,7 @@ class KiaUvoApiEU(ApiImplType1):
                     username, password, cookies
                 )
             except Exception:
-                _LOGGER.debug(f"{DOMAIN} - get_authorization_code_with_redirect_url failed")
+                _LOGGER.debug("%s - get_authorization_code_with_redirect_url failed", DOMAIN)
                 authorization_code = self._get_authorization_code_with_form(
                     username, password, cookies
                 )
@@ -226,6 +587,64 @@ class KiaUvoApiEU(ApiImplType1):
                 valid_until=valid_until,
             )
 
+    def refresh_access_token(self, token: Token) -> Token:
+        """
+        For Kia the refresh token grant is all the login does, so skip the device registration,
+        cookies and session language and keep the existing device ID. Other brands log in again.
+        """
+        if BRANDS[self.brand] != BRAND_KIA or not token.refresh_token:
+            return self.login(token.username, token.password)
+
+        _, access_token, _, expires_in = self._get_access_token(
+            self._get_stamp(), token.refresh_token
+        )
+        return Token(
+            username=token.username,
+            password=token.password,
+            access_token=access_token,
+            refresh_token=token.refresh_token,
+            device_id=token.device_id,
+            valid_until=dt.datetime.now(pytz.utc) + dt.timedelta(seconds=expires_in),
+            pin=token.pin,
+        )
+
+    def get_vehicles(self, token: Token) -> list[Vehicle]:
+        url = self.SPA_API_URL + "vehicles"
+        response = self.session.get(
+            url,
+            headers=self._get_authenticated_headers(token),
+        ).json()
+        _LOGGER.debug("%s - Get Vehicles Response: %s", DOMAIN, response)
+        _check_response_for_errors(response)
+        return self._vehicles_from_response(response)
+
+    def _vehicles_from_response(self, response: dict) -> list[Vehicle]:
+        result = []
+        for entry in response["resMsg"]["vehicles"]:
+            entry_engine_type = None
+            if entry["type"] == "GN":
+                entry_engine_type = ENGINE_TYPES.ICE
+            elif entry["type"] == "EV":
+                entry_engine_type = ENGINE_TYPES.EV
+            elif entry["type"] == "PHEV":
+                entry_engine_type = ENGINE_TYPES.PHEV
+            elif entry["type"] == "HV":
+                entry_engine_type = ENGINE_TYPES.HEV
+            elif entry["type"] == "PE":
+                entry_engine_type = ENGINE_TYPES.PHEV
+            vehicle: Vehicle = Vehicle(
+                id=entry["vehicleId"],
+                name=entry["nickname"],
+                model=entry["vehicleName"],
+                registration_date=entry["regDate"],
+                VIN=entry["vin"],
+                timezone=self.data_timezone,
+                engine_type=entry_engine_type,
+                ccu_ccs2_protocol_support=entry["ccuCCS2ProtocolSupport"],
+            )
+            result.append(vehicle)
+        return result
+
     def update_vehicle_with_cached_state(self, token: Token, vehicle: Vehicle) -> None:
         url = self.SPA_API_URL + "vehicles/" + vehicle.id
         is_ccs2 = vehicle.ccu_ccs2_protocol_support != 0
@@ -238,14 +657,14 @@ class KiaUvoApiEU(ApiImplType1):
         else:
             url += "/status/latest"
 
-        response = requests.get(
+        response = self.session.get(
             url,
             headers=self._get_authenticated_headers(
                 token, vehicle.ccu_ccs2_protocol_support
             ),
         ).json()
 
-        _LOGGER.debug(f"{DOMAIN} - get_cached_vehicle_status response: {response}")
+        _LOGGER.debug("%s - get_cached_vehicle_status response: %s", DOMAIN, response)
         _check_response_for_errors(response)
 
         if vehicle.ccu_ccs2_protocol_support == 0:
@@ -278,6 +697,7 @@ class KiaUvoApiEU(ApiImplType1):
                 self._update_vehicle_drive_info(vehicle, state)
 
     def force_refresh_vehicle_state(self, token: Token, vehicle: Vehicle) -> None:
+        # the location is only worth its API call once the car answered the forced status request
         state = self._get_forced_vehicle_state(token, vehicle)
         state["vehicleLocation"] = self._get_location(token, vehicle)
         self._update_vehicle_properties(vehicle, state)
@@ -304,202 +724,48 @@ class KiaUvoApiEU(ApiImplType1):
                 self._update_vehicle_drive_info(vehicle, state)
 
     def _update_vehicle_properties(self, vehicle: Vehicle, state: dict) -> None:
-        if get_child_value(state, "vehicleStatus.time"):
-            vehicle.last_updated_at = parse_datetime(
-                get_child_value(state, "vehicleStatus.time"), self.data_timezone
-            )
+        values = _STATUS_FIELDS.read(state)
+        if values["time"]:
+            vehicle.last_updated_at = parse_datetime(values["time"], self.data_timezone)
         else:
             vehicle.last_updated_at = dt.datetime.now(self.data_timezone)
-        if get_child_value(state, "odometer.value"):
-            vehicle.odometer = (
-                get_child_value(state, "odometer.value"),
-                DISTANCE_UNITS[
-                    get_child_value(
-                        state,
-                        "odometer.unit",
-                    )
-                ],
-            )
-        vehicle.car_battery_percentage = get_child_value(
-            state, "vehicleStatus.battery.batSoc"
-        )
-        vehicle.engine_is_running = get_child_value(state, "vehicleStatus.engine")
+        if values["odometer"]:
+            vehicle.odometer = (values["odometer"], DISTANCE_UNITS[values["odometer_unit"]])
+        _STATUS_FIELDS.apply(values, vehicle)
 
         # Converts temp to usable number. Currently only support celsius.
         # Future to do is check unit in case the care itself is set to F.
-        if get_child_value(state, "vehicleStatus.airTemp.value"):
-            tempIndex = get_hex_temp_into_index(
-                get_child_value(state, "vehicleStatus.airTemp.value")
-            )
+        if values["air_temperature"]:
+            tempIndex = get_hex_temp_into_index(values["air_temperature"])
 
             vehicle.air_temperature = (
                 self.temperature_range[tempIndex],
-                TEMPERATURE_UNITS[
-                    get_child_value(
-                        state,
-                        "vehicleStatus.airTemp.unit",
-                    )
-                ],
+                TEMPERATURE_UNITS[values["air_temperature_unit"]],
             )
-        vehicle.defrost_is_on = get_child_value(state, "vehicleStatus.defrost")
-        steer_wheel_heat = get_child_value(state, "vehicleStatus.steerWheelHeat")
+        steer_wheel_heat = values["steering_wheel_heat"]
         if steer_wheel_heat in [0, 2]:
             vehicle.steering_wheel_heater_is_on = False
         elif steer_wheel_heat == 1:
             vehicle.steering_wheel_heater_is_on = True
 
-        vehicle.back_window_heater_is_on = get_child_value(
-            state, "vehicleStatus.sideBackWindowHeat"
-        )
-        vehicle.side_mirror_heater_is_on = get_child_value(
-            state, "vehicleStatus.sideMirrorHeat"
-        )
-        vehicle.front_left_seat_status = SEAT_STATUS[
-            get_child_value(state, "vehicleStatus.seatHeaterVentState.flSeatHeatState")
-        ]
-        vehicle.front_right_seat_status = SEAT_STATUS[
-            get_child_value(state, "vehicleStatus.seatHeaterVentState.frSeatHeatState")
-        ]
-        vehicle.rear_left_seat_status = SEAT_STATUS[
-            get_child_value(state, "vehicleStatus.seatHeaterVentState.rlSeatHeatState")
-        ]
-        vehicle.rear_right_seat_status = SEAT_STATUS[
-            get_child_value(state, "vehicleStatus.seatHeaterVentState.rrSeatHeatState")
-        ]
-        vehicle.is_locked = get_child_value(state, "vehicleStatus.doorLock")
-        vehicle.front_left_door_is_open = get_child_value(
-            state, "vehicleStatus.doorOpen.frontLeft"
-        )
-        vehicle.front_right_door_is_open = get_child_value(
-            state, "vehicleStatus.doorOpen.frontRight"
-        )
-        vehicle.back_left_door_is_open = get_child_value(
-            state, "vehicleStatus.doorOpen.backLeft"
-        )
-        vehicle.back_right_door_is_open = get_child_value(
-            state, "vehicleStatus.doorOpen.backRight"
-        )
-        vehicle.hood_is_open = get_child_value(state, "vehicleStatus.hoodOpen")
-        vehicle.front_left_window_is_open = get_child_value(
-            state, "vehicleStatus.windowOpen.frontLeft"
-        )
-        vehicle.front_right_window_is_open = get_child_value(
-            state, "vehicleStatus.windowOpen.frontRight"
-        )
-        vehicle.back_left_window_is_open = get_child_value(
-            state, "vehicleStatus.windowOpen.backLeft"
-        )
-        vehicle.back_right_window_is_open = get_child_value(
-            state, "vehicleStatus.windowOpen.backRight"
-        )
-        vehicle.tire_pressure_rear_left_warning_is_on = bool(
-            get_child_value(state, "vehicleStatus.tirePressureLamp.tirePressureLampRL")
-        )
-        vehicle.tire_pressure_front_left_warning_is_on = bool(
-            get_child_value(state, "vehicleStatus.tirePressureLamp.tirePressureLampFL")
-        )
-        vehicle.tire_pressure_front_right_warning_is_on = bool(
-            get_child_value(state, "vehicleStatus.tirePressureLamp.tirePressureLampFR")
-        )
-        vehicle.tire_pressure_rear_right_warning_is_on = bool(
-            get_child_value(state, "vehicleStatus.tirePressureLamp.tirePressureLampRR")
-        )
-        vehicle.tire_pressure_all_warning_is_on = bool(
-            get_child_value(state, "vehicleStatus.tirePressureLamp.tirePressureLampAll")
-        )
-        vehicle.trunk_is_open = get_child_value(state, "vehicleStatus.trunkOpen")
-        vehicle.ev_battery_percentage = get_child_value(
-            state, "vehicleStatus.evStatus.batteryStatus"
-        )
-        vehicle.ev_battery_is_charging = get_child_value(
-            state, "vehicleStatus.evStatus.batteryCharge"
-        )
-
-        vehicle.ev_battery_is_plugged_in = get_child_value(
-            state, "vehicleStatus.evStatus.batteryPlugin"
-        )
-
-        ev_charge_port_door_is_open = get_child_value(
-            state, "vehicleStatus.evStatus.chargePortDoorOpenStatus"
-        )
-
+        ev_charge_port_door_is_open = values["charge_port_door"]
         if ev_charge_port_door_is_open == 1:
             vehicle.ev_charge_port_door_is_open = True
         elif ev_charge_port_door_is_open == 2:
             vehicle.ev_charge_port_door_is_open = False
 
-        vehicle.ev_charging_power = get_child_value(
-            state, "vehicleStatus.evStatus.batteryPower.batteryStndChrgPower"
-        )
-
-        if (
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.totalAvailableRange.value",  # noqa
-            )
-            is not None
-        ):
+        if values["total_range"] is not None:
             vehicle.total_driving_range = (
-                round(
-                    float(
-                        get_child_value(
-                            state,
-                            "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.totalAvailableRange.value",  # noqa
-                        )
-                    ),
-                    1,
-                ),
-                DISTANCE_UNITS[
-                    get_child_value(
-                        state,
-                        "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.totalAvailableRange.unit",  # noqa
-                    )
-                ],
-            )
-        if (
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.evModeRange.value",
+                round(float(values["total_range"]), 1),
+                DISTANCE_UNITS[values["total_range_unit"]],
             )
-            is not None
-        ):
+        if values["ev_range"] is not None:
             vehicle.ev_driving_range = (
-                round(
-                    float(
-                        get_child_value(
-                            state,
-                            "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.evModeRange.value",  # noqa
-                        )
-                    ),
-                    1,
-                ),
-                DISTANCE_UNITS[
-                    get_child_value(
-                        state,
-                        "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.evModeRange.unit",  # noqa
-                    )
-                ],
+                round(float(values["ev_range"]), 1),
+                DISTANCE_UNITS[values["ev_range_unit"]],
             )
-        vehicle.ev_estimated_current_charge_duration = (
-            get_child_value(state, "vehicleStatus.evStatus.remainTime2.atc.value"),
-            "m",
-        )
-        vehicle.ev_estimated_fast_charge_duration = (
-            get_child_value(state, "vehicleStatus.evStatus.remainTime2.etc1.value"),
-            "m",
-        )
-        vehicle.ev_estimated_portable_charge_duration = (
-            get_child_value(state, "vehicleStatus.evStatus.remainTime2.etc2.value"),
-            "m",
-        )
-        vehicle.ev_estimated_station_charge_duration = (
-            get_child_value(state, "vehicleStatus.evStatus.remainTime2.etc3.value"),
-            "m",
-        )
 
-        target_soc_list = get_child_value(
-            state, "vehicleStatus.evStatus.reservChargeInfos.targetSOClist"
-        )
+        target_soc_list = values["target_soc_list"]
         try:
             vehicle.ev_charge_limits_ac = [
                 x["targetSOClevel"] for x in target_soc_list if x["plugType"] == 1
@@ -508,255 +774,186 @@ class KiaUvoApiEU(ApiImplType1):
                 x["targetSOClevel"] for x in target_soc_list if x["plugType"] == 0
             ][-1]
         except Exception:
-            _LOGGER.debug(f"{DOMAIN} - SOC Levels couldn't be found. May not be an EV.")
-        if (
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.gasModeRange.value",
-            )
-            is not None
-        ):
+            _LOGGER.debug("%s - SOC Levels couldn't be found. May not be an EV.", DOMAIN)
+        if values["gas_range"] is not None:
             vehicle.fuel_driving_range = (
-                get_child_value(
-                    state,
-                    "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.gasModeRange.value",  # noqa
-                ),
-                DISTANCE_UNITS[
-                    get_child_value(
-                        state,
-                        "vehicleStatus.evStatus.drvDistance.0.rangeByFuel.gasModeRange.unit",  # noqa
-                    )
-                ],
+                values["gas_range"],
+                DISTANCE_UNITS[values["gas_range_unit"]],
             )
-        elif get_child_value(
-            state,
-            "vehicleStatus.dte.value",
-        ):
+        elif values["dte"]:
             vehicle.fuel_driving_range = (
-                get_child_value(
-                    state,
-                    "vehicleStatus.dte.value",
-                ),
-                DISTANCE_UNITS[get_child_value(state, "vehicleStatus.dte.unit")],
+                values["dte"],
+                DISTANCE_UNITS[values["dte_unit"]],
             )
 
         vehicle.ev_target_range_charge_AC = (
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.targetSOClist.1.dte.rangeByFuel.totalAvailableRange.value",  # noqa
-            ),
-            DISTANCE_UNITS[
-                get_child_value(
-                    state,
-                    "vehicleStatus.evStatus.reservChargeInfos.targetSOClist.1.dte.rangeByFuel.totalAvailableRange.unit",  # noqa
-                )
-            ],
+            values["target_range_ac"],
+            DISTANCE_UNITS[values["target_range_ac_unit"]],
         )
         vehicle.ev_target_range_charge_DC = (
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.targetSOClist.0.dte.rangeByFuel.totalAvailableRange.value",  # noqa
-            ),
-            DISTANCE_UNITS[
-                get_child_value(
-                    state,
-                    "vehicleStatus.evStatus.reservChargeInfos.targetSOClist.0.dte.rangeByFuel.totalAvailableRange.unit",  # noqa
-                )
-            ],
-        )
-        vehicle.ev_first_departure_enabled = get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservChargeSet",  # noqa
-        )
-        vehicle.ev_second_departure_enabled = get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservChargeSet",  # noqa
-        )
-        vehicle.ev_first_departure_days = get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservInfo.day",  # noqa
-        )
-        vehicle.ev_second_departure_days = get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservInfo.day",  # noqa
+            values["target_range_dc"],
+            DISTANCE_UNITS[values["target_range_dc_unit"]],
         )
 
         vehicle.ev_first_departure_time = self._get_time_from_string(
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservInfo.time.time",  # noqa
-            ),
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservInfo.time.timeSection",  # noqa
-            ),
+            values["first_departure_time"], values["first_departure_time_section"]
         )
-
         vehicle.ev_second_departure_time = self._get_time_from_string(
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservInfo.time.time",  # noqa
-            ),
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservInfo.time.timeSection",  # noqa
-            ),
-        )
-
-        vehicle.ev_first_departure_climate_enabled = bool(
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservFatcSet.airCtrl",  # noqa
-            )
-        )
-
-        vehicle.ev_second_departure_climate_enabled = bool(
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservFatcSet.airCtrl",  # noqa
-            )
+            values["second_departure_time"], values["second_departure_time_section"]
         )
 
-        if get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservFatcSet.airTemp.value",  # noqa
-        ):
-            temp_index = get_hex_temp_into_index(
-                get_child_value(
-                    state,
-                    "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservFatcSet.airTemp.value",  # noqa
-                )
-            )
+        if values["first_departure_temperature"]:
+            temp_index = get_hex_temp_into_index(values["first_departure_temperature"])
 
             vehicle.ev_first_departure_climate_temperature = (
                 self.temperature_range[temp_index],
-                TEMPERATURE_UNITS[
-                    get_child_value(
-                        state,
-                        "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservFatcSet.airTemp.unit",  # noqa
-                    )
-                ],
+                TEMPERATURE_UNITS[values["first_departure_temperature_unit"]],
             )
 
-        if get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservFatcSet.airTemp.value",  # noqa
-        ):
-            temp_index = get_hex_temp_into_index(
-                get_child_value(
-                    state,
-                    "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservFatcSet.airTemp.value",  # noqa
-                )
-            )
+        if values["second_departure_temperature"]:
+            temp_index = get_hex_temp_into_index(values["second_departure_temperature"])
 
             vehicle.ev_second_departure_climate_temperature = (
                 self.temperature_range[temp_index],
-                TEMPERATURE_UNITS[
-                    get_child_value(
-                        state,
-                        "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservFatcSet.airTemp.unit",  # noqa
-                    )
-                ],
+                TEMPERATURE_UNITS[values["second_departure_temperature_unit"]],
             )
 
-        vehicle.ev_first_departure_climate_defrost = get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reservChargeInfo.reservChargeInfoDetail.reservFatcSet.defrost",  # noqa
-        )
-
-        vehicle.ev_second_departure_climate_defrost = get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.reserveChargeInfo2.reservChargeInfoDetail.reservFatcSet.defrost",  # noqa
-        )
-
         vehicle.ev_off_peak_start_time = self._get_time_from_string(
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.offpeakPowerInfo.offPeakPowerTime1.starttime.time",  # noqa
-            ),
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.offpeakPowerInfo.offPeakPowerTime1.starttime.timeSection",  # noqa
-            ),
+            values["off_peak_start"], values["off_peak_start_section"]
         )
-
         vehicle.ev_off_peak_end_time = self._get_time_from_string(
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.offpeakPowerInfo.offPeakPowerTime1.endtime.time",  # noqa
-            ),
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.offpeakPowerInfo.offPeakPowerTime1.endtime.timeSection",  # noqa
-            ),
+            values["off_peak_end"], values["off_peak_end_section"]
         )
 
-        if get_child_value(
-            state,
-            "vehicleStatus.evStatus.reservChargeInfos.offpeakPowerInfo.offPeakPowerFlag",  # noqa
-        ):
-            if (
-                get_child_value(
-                    state,
-                    "vehicleStatus.evStatus.reservChargeInfos.offpeakPowerInfo.offPeakPowerFlag",  # noqa
-                )
-                == 1
-            ):
-                vehicle.ev_off_peak_charge_only_enabled = True
-            elif (
-                get_child_value(
-                    state,
-                    "vehicleStatus.evStatus.reservChargeInfos.offpeakPowerInfo.offPeakPowerFlag",  # noqa
-                )
-                == 2
-            ):
-                vehicle.ev_off_peak_charge_only_enabled = False
+        if values["off_peak_flag"] == 1:
+            vehicle.ev_off_peak_charge_only_enabled = True
+        elif values["off_peak_flag"] == 2:
+            vehicle.ev_off_peak_charge_only_enabled = False
 
-        if (
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reservFlag",  # noqa
-            )
-            == 1
-        ):
+        if values["reservation_flag"] == 1:
             vehicle.ev_schedule_charge_enabled = True
-        elif (
-            get_child_value(
-                state,
-                "vehicleStatus.evStatus.reservChargeInfos.reservFlag",  # noqa
+        elif values["reservation_flag"] == 0:
+            vehicle.ev_schedule_charge_enabled = False
+
+        if values["latitude"]:
+            vehicle.location = (
+                values["latitude"],
+                values["longitude"],
+                parse_datetime(values["location_time"], self.data_timezone),
             )
-            == 0
+        vehicle.data = state
+
+    def _update_vehicle_properties_ccs2(self, vehicle: Vehicle, state: dict) -> None:
+        # ApiImplType1's, reading the payload in one walk
+        values = _CCS2_STATUS_FIELDS.read(state)
+        if values["offset"]:
+            offset = float(values["offset"])
+            hours = int(offset)
+            minutes = int((offset - hours) * 60)
+            vehicle.timezone = dt.timezone(dt.timedelta(hours=hours, minutes=minutes))
+        if values["date"]:
+            vehicle.last_updated_at = parse_datetime(values["date"], vehicle.timezone)
+        else:
+            vehicle.last_updated_at = dt.datetime.now(self.data_timezone)
+
+        vehicle.odometer = (values["odometer"], DISTANCE_UNITS[1])
+        _CCS2_STATUS_FIELDS.apply(values, vehicle)
+
+        if values["air_temperature"] != "OFF":
+            vehicle.air_temperature = (values["air_temperature"], TEMPERATURE_UNITS[1])
+
+        if values["defrost"] in [0, 2]:
+            vehicle.defrost_is_on = False
+        elif values["defrost"] == 1:
+            vehicle.defrost_is_on = True
+
+        if values["steering_wheel_heat"] in [0, 2]:
+            vehicle.steering_wheel_heater_is_on = False
+        elif values["steering_wheel_heat"] == 1:
+            vehicle.steering_wheel_heater_is_on = True
+
+        if values["rear_defrost"] in [0, 2]:
+            vehicle.back_window_heater_is_on = False
+        elif values["rear_defrost"] == 1:
+            vehicle.back_window_heater_is_on = True
+
+        # the API reports whether a door is unlocked
+        for attribute, lock in (
+            ("front_left_door_is_locked", "front_left_lock"),
+            ("front_right_door_is_locked", "front_right_lock"),
+            ("back_left_door_is_locked", "back_left_lock"),
+            ("back_right_door_is_locked", "back_right_lock"),
         ):
-            vehicle.ev_schedule_charge_enabled = False
+            setattr(vehicle, attribute, not bool(values[lock]) if values[lock] is not None else None)
 
-        vehicle.washer_fluid_warning_is_on = get_child_value(
-            state, "vehicleStatus.washerFluidStatus"
+        vehicle.is_locked = (
+            vehicle.front_left_door_is_locked
+            and vehicle.front_right_door_is_locked
+            and vehicle.back_left_door_is_locked
+            and vehicle.back_right_door_is_locked
         )
-        vehicle.brake_fluid_warning_is_on = get_child_value(
-            state, "vehicleStatus.breakOilStatus"
+
+        vehicle.sunroof_is_open = (
+            bool(values["sunroof"]) if values["sunroof"] is not None else None
         )
-        vehicle.fuel_level = get_child_value(state, "vehicleStatus.fuelLevel")
-        vehicle.fuel_level_is_low = get_child_value(state, "vehicleStatus.lowFuelLight")
-        vehicle.air_control_is_on = get_child_value(state, "vehicleStatus.airCtrlOn")
-        vehicle.smart_key_battery_warning_is_on = get_child_value(
-            state, "vehicleStatus.smartKeyBatteryWarning"
+        if values["charging_power"] is not None:
+            vehicle.ev_charging_power = values["charging_power"]
+        if values["charging_door"] in [0, 2]:
+            vehicle.ev_charge_port_door_is_open = False
+        elif values["charging_door"] == 1:
+            vehicle.ev_charge_port_door_is_open = True
+
+        vehicle.total_driving_range = (
+            float(values["total_range"]),
+            DISTANCE_UNITS[values["range_unit"]],
         )
+        if vehicle.engine_type == ENGINE_TYPES.EV:
+            # ev_driving_range is the same as total_driving_range for pure EV
+            vehicle.ev_driving_range = (
+                vehicle.total_driving_range,
+                vehicle.total_driving_range_unit,
+            )
+
+        vehicle.ev_target_range_charge_AC = (
+            values["target_range_ac"],
+            DISTANCE_UNITS[values["range_unit"]],
+        )
+        vehicle.ev_target_range_charge_DC = (
+            values["target_range_dc"],
+            DISTANCE_UNITS[values["range_unit"]],
+        )
+
+        if vehicle._ev_estimated_current_charge_duration is not None:
+            if vehicle._ev_estimated_current_charge_duration == 0:
+                vehicle.ev_battery_is_charging = False
+            elif vehicle._ev_estimated_current_charge_duration > 0:
+                vehicle.ev_battery_is_charging = True
+
+        if values["latitude"]:
+            location_last_updated_at = dt.datetime(
+                2000, 1, 1, tzinfo=self.data_timezone
+            )
+            if values["location_time"] is not None:
+                location_last_updated_at = dt.datetime(
+                    year=int(values["location_year"]),
+                    month=int(values["location_month"]),
+                    day=int(values["location_day"]),
+                    hour=int(values["location_hour"]),
+                    minute=int(values["location_minute"]),
+                    second=int(values["location_second"]),
+                    tzinfo=self.data_timezone,
+                )
 
-        if get_child_value(state, "vehicleLocation.coord.lat"):
             vehicle.location = (
-                get_child_value(state, "vehicleLocation.coord.lat"),
-                get_child_value(state, "vehicleLocation.coord.lon"),
-                parse_datetime(
-                    get_child_value(state, "vehicleLocation.time"), self.data_timezone
-                ),
+                values["latitude"],
+                values["longitude"],
+                location_last_updated_at,
             )
+
         vehicle.data = state
 
     def _update_vehicle_drive_info(self, vehicle: Vehicle, state: dict) -> None:
-        vehicle.total_power_consumed = get_child_value(state, "totalPwrCsp")
-        vehicle.total_power_regenerated = get_child_value(state, "regenPwr")
-        vehicle.power_consumption_30d = get_child_value(state, "consumption30d")
-        vehicle.daily_stats = get_child_value(state, "dailyStats")
+        _DRIVE_INFO_FIELDS.apply(_DRIVE_INFO_FIELDS.read(state), vehicle)
 
     def _get_cached_vehicle_state(self, token: Token, vehicle: Vehicle) -> dict:
         url = self.SPA_API_URL + "vehicles/" + vehicle.id
@@ -764,13 +961,13 @@ class KiaUvoApiEU(ApiImplType1):
             url = url + "/status/latest"
         else:
             url = url + "/ccs2/carstatus/latest"
-        response = requests.get(
+        response = self.session.get(
             url,
             headers=self._get_authenticated_headers(
                 token, vehicle.ccu_ccs2_protocol_support
             ),
         ).json()
-        _LOGGER.debug(f"{DOMAIN} - get_cached_vehicle_status response: {response}")
+        _LOGGER.debug("%s - get_cached_vehicle_status response: %s", DOMAIN, response)
         _check_response_for_errors(response)
         if vehicle.ccu_ccs2_protocol_support == 0:
             response = response["resMsg"]["vehicleStatusInfo"]
@@ -782,13 +979,13 @@ class KiaUvoApiEU(ApiImplType1):
         url = self.SPA_API_URL + "vehicles/" + vehicle.id + "/location"
 
         try:
-            response = requests.get(
+            response = self.session.get(
                 url,
                 headers=self._get_authenticated_headers(
                     token, vehicle.ccu_ccs2_protocol_support
                 ),
             ).json()
-            _LOGGER.debug(f"{DOMAIN} - _get_location response: {response}")
+            _LOGGER.debug("%s - _get_location response: %s", DOMAIN, response)
             _check_response_for_errors(response)
             return response["resMsg"]["gpsDetail"]
         except Exception:
@@ -797,13 +994,13 @@ class KiaUvoApiEU(ApiImplType1):
 
     def _get_forced_vehicle_state(self, token: Token, vehicle: Vehicle) -> dict:
         url = self.SPA_API_URL + "vehicles/" + vehicle.id + "/status"
-        response = requests.get(
+        response = self.session.get(
             url,
             headers=self._get_authenticated_headers(
                 token, vehicle.ccu_ccs2_protocol_support
             ),
         ).json()
-        _LOGGER.debug(f"{DOMAIN} - Received forced vehicle data: {response}")
+        _LOGGER.debug("%s - Received forced vehicle data: %s", DOMAIN, response)
         _check_response_for_errors(response)
         mapped_response = {}
         mapped_response["vehicleStatus"] = response["resMsg"]
@@ -815,12 +1012,12 @@ class KiaUvoApiEU(ApiImplType1):
         url = self.SPA_API_URL_V2 + "vehicles/" + vehicle.id + "/control/portdoor"
 
         payload = {"action": action.value}
-        _LOGGER.debug(f"{DOMAIN} - Charge Port Action Request: {payload}")
-        response = requests.post(
+        _LOGGER.debug("%s - Charge Port Action Request: %s", DOMAIN, payload)
+        response = self.session.post(
             url, json=payload, headers=self._get_control_headers(token, vehicle)
         ).json()
 
-        _LOGGER.debug(f"{DOMAIN} - Charge Port Action Response: {response}")
+        _LOGGER.debug("%s - Charge Port Action Response: %s", DOMAIN, response)
         _check_response_for_errors(response)
         token.device_id = self._get_device_id(self._get_stamp())
         return response["msgId"]
@@ -830,14 +1027,14 @@ class KiaUvoApiEU(ApiImplType1):
         # Most likely this forces the car the update it.
         url = f"{self.SPA_API_URL}vehicles/{vehicle.id}/charge/target"
 
-        _LOGGER.debug(f"{DOMAIN} - Get Charging Limits Request")
-        response = requests.get(
+        _LOGGER.debug("%s - Get Charging Limits Request", DOMAIN)
+        response = self.session.get(
             url,
             headers=self._get_authenticated_headers(
                 token, vehicle.ccu_ccs2_protocol_support
             ),
         ).json()
-        _LOGGER.debug(f"{DOMAIN} - Get Charging Limits Response: {response}")
+        _LOGGER.debug("%s - Get Charging Limits Response: %s", DOMAIN, response)
         _check_response_for_errors(response)
         # API sometimes returns multiple entries per plug type and they conflict.
         # The car itself says the last entry per plug type is the truth when tested
@@ -858,8 +1055,8 @@ class KiaUvoApiEU(ApiImplType1):
         else:
             payload = {"tripPeriodType": 1, "setTripDay": date_string}
 
-        _LOGGER.debug(f"{DOMAIN} - get_trip_info Request {payload}")
-        response = requests.post(
+        _LOGGER.debug("%s - get_trip_info Request %s", DOMAIN, payload)
+        response = self.session.post(
             url,
             json=payload,
             headers=self._get_authenticated_headers(
@@ -867,7 +1064,7 @@ class KiaUvoApiEU(ApiImplType1):
             ),
         )
         response = response.json()
-        _LOGGER.debug(f"{DOMAIN} - get_trip_info response {response}")
+        _LOGGER.debug("%s - get_trip_info response %s", DOMAIN, response)
         _check_response_for_errors(response)
         return response
 
@@ -892,6 +1089,9 @@ class KiaUvoApiEU(ApiImplType1):
             yyyymm_string,
             0,  # month trip info
         )
+        vehicle.month_trip_info = self._month_trip_info(yyyymm_string, json_result)
+
+    def _month_trip_info(self, yyyymm_string: str, json_result: dict) -> MonthTripInfo:
         msg = json_result["resMsg"]
         if msg["monthTripDayCnt"] > 0:
             result = MonthTripInfo(
@@ -913,7 +1113,8 @@ class KiaUvoApiEU(ApiImplType1):
                 )
                 result.day_list.append(processed_day)
 
-            vehicle.month_trip_info = result
+            return result
+        return None
 
     def update_day_trip_info(
         self,
@@ -936,6 +1137,9 @@ class KiaUvoApiEU(ApiImplType1):
             yyyymmdd_string,
             1,  # day trip info
         )
+        vehicle.day_trip_info = self._day_trip_info(yyyymmdd_string, json_result)
+
+    def _day_trip_info(self, yyyymmdd_string: str, json_result: dict) -> DayTripInfo:
         day_trip_list = json_result["resMsg"]["dayTripList"]
         if len(day_trip_list) > 0:
             msg = day_trip_list[0]
@@ -961,31 +1165,31 @@ class KiaUvoApiEU(ApiImplType1):
                 )
                 result.trip_list.append(processed_trip)
 
-            vehicle.day_trip_info = result
+            return result
+        return None
 
     def _get_driving_info(self, token: Token, vehicle: Vehicle) -> dict:
         url = self.SPA_API_URL + "vehicles/" + vehicle.id + "/drvhistory"
 
-        responseAlltime = requests.post(
-            url,
-            json={"periodTarget": 1},
-            headers=self._get_authenticated_headers(
-                token, vehicle.ccu_ccs2_protocol_support
-            ),
-        )
-        responseAlltime = responseAlltime.json()
-        _LOGGER.debug(f"{DOMAIN} - get_driving_info responseAlltime {responseAlltime}")
-        _check_response_for_errors(responseAlltime)
+        def get_period(period_target: int) -> dict:
+            return self.session.post(
+                url,
+                json={"periodTarget": period_target},
+                headers=self._get_authenticated_headers(
+                    token, vehicle.ccu_ccs2_protocol_support
+                ),
+            ).json()
 
-        response30d = requests.post(
-            url,
-            json={"periodTarget": 0},
-            headers=self._get_authenticated_headers(
-                token, vehicle.ccu_ccs2_protocol_support
-            ),
+        responseAlltime, response30d = self._call_all(
+            lambda: get_period(1), lambda: get_period(0)
         )
-        response30d = response30d.json()
-        _LOGGER.debug(f"{DOMAIN} - get_driving_info response30d {response30d}")
+        return self._driving_info(vehicle, responseAlltime, response30d)
+
+    def _driving_info(self, vehicle: Vehicle, responseAlltime: dict, response30d: dict) -> dict:
+        """Driving info of the all-time and 30 day drvhistory answers, merged"""
+        _LOGGER.debug("%s - get_driving_info responseAlltime %s", DOMAIN, responseAlltime)
+        _check_response_for_errors(responseAlltime)
+        _LOGGER.debug("%s - get_driving_info response30d %s", DOMAIN, response30d)
         _check_response_for_errors(response30d)
         if get_child_value(responseAlltime, "resMsg.drivingInfo.0"):
             drivingInfo = responseAlltime["resMsg"]["drivingInfo"][0]
@@ -995,18 +1199,8 @@ class KiaUvoApiEU(ApiImplType1):
                 for day in response30d["resMsg"]["drivingInfoDetail"]:
                     processedDay = DailyDrivingStats(
                         date=dt.datetime.strptime(day["drivingDate"], "%Y%m%d"),
-                        total_consumed=get_child_value(day, "totalPwrCsp"),
-                        engine_consumption=get_child_value(day, "motorPwrCsp"),
-                        climate_consumption=get_child_value(day, "climatePwrCsp"),
-                        onboard_electronics_consumption=get_child_value(
-                            day, "eDPwrCsp"
-                        ),
-                        battery_care_consumption=get_child_value(
-                            day, "batteryMgPwrCsp"
-                        ),
-                        regenerated_energy=get_child_value(day, "regenPwr"),
-                        distance=get_child_value(day, "calculativeOdo"),
                         distance_unit=vehicle.odometer_unit,
+                        **_DAILY_STATS_FIELDS.read(day),
                     )
                     drivingInfo["dailyStats"].append(processedDay)
 
@@ -1042,21 +1236,140 @@ class KiaUvoApiEU(ApiImplType1):
         url = self.SPA_API_URL_V2 + "vehicles/" + vehicle.id + "/control/valet"
 
         payload = {"action": action.value}
-        _LOGGER.debug(f"{DOMAIN} - Valet Mode Action Request: {payload}")
-        response = requests.post(
+        _LOGGER.debug("%s - Valet Mode Action Request: %s", DOMAIN, payload)
+        response = self.session.post(
             url, json=payload, headers=self._get_control_headers(token, vehicle)
         ).json()
-        _LOGGER.debug(f"{DOMAIN} - Valet Mode Action Response: {response}")
+        _LOGGER.debug("%s - Valet Mode Action Response: %s", DOMAIN, response)
         _check_response_for_errors(response)
         token.device_id = self._get_device_id(self._get_stamp())
         return response["msgId"]
 
+    def start_charge(self, token: Token, vehicle: Vehicle) -> str:
+        return self._charge_action(token, vehicle, "start")
+
+    def stop_charge(self, token: Token, vehicle: Vehicle) -> str:
+        return self._charge_action(token, vehicle, "stop")
+
+    def _charge_action(self, token: Token, vehicle: Vehicle, action: str) -> str:
+        if not vehicle.ccu_ccs2_protocol_support:
+            url = self.SPA_API_URL + "vehicles/" + vehicle.id + "/control/charge"
+
+            payload = {"action": action, "deviceId": token.device_id}
+            headers = self._get_authenticated_headers(
+                token, vehicle.ccu_ccs2_protocol_support
+            )
+
+        else:
+            url = (
+                self.SPA_API_URL_V2 + "vehicles/" + vehicle.id + "/ccs2/control/charge"
+            )
+
+            payload = {"command": action}
+            headers = self._get_control_headers(token, vehicle)
+
+        _LOGGER.debug("%s - %s Charge Action Request: %s", DOMAIN, action.capitalize(), payload)
+        response = self.session.post(url, json=payload, headers=headers).json()
+        _LOGGER.debug("%s - %s Charge Action Response: %s", DOMAIN, action.capitalize(), response)
+        _check_response_for_errors(response)
+        token.device_id = self._get_device_id(self._get_stamp())
+        return response["msgId"]
+
+    def check_action_status(
+        self,
+        token: Token,
+        vehicle: Vehicle,
+        action_id: str,
+        synchronous: bool = False,
+        timeout: int = 0,
+    ) -> ORDER_STATUS:
+        url = self.SPA_API_URL + "notifications/" + vehicle.id + "/records"
+
+        if synchronous:
+            if timeout < 1:
+                raise APIError("Timeout must be 1 or higher")
+
+            end_time = dt.datetime.now() + dt.timedelta(seconds=timeout)
+            while end_time > dt.datetime.now():
+                state = self.check_action_status(
+                    token, vehicle, action_id, synchronous=False
+                )
+                if state == ORDER_STATUS.PENDING:
+                    # still pending: recheck until we get a final state or exceed the timeout
+                    sleep(5)
+                else:
+                    return state
+
+            return ORDER_STATUS.TIMEOUT
+
+        response = self.session.get(
+            url,
+            headers=self._get_authenticated_headers(
+                token, vehicle.ccu_ccs2_protocol_support
+            ),
+        ).json()
+        _LOGGER.debug("%s - Check last action status Response: %s", DOMAIN, response)
+        _check_response_for_errors(response)
+        return self._action_status(response, action_id)
+
+    def _action_status(self, response: dict, action_id: str) -> ORDER_STATUS:
+        for action in response["resMsg"]:
+            if action["recordId"] == action_id:
+                if action["result"] == "success":
+                    return ORDER_STATUS.SUCCESS
+                elif action["result"] == "fail":
+                    return ORDER_STATUS.FAILED
+                elif action["result"] == "non-response":
+                    return ORDER_STATUS.TIMEOUT
+                elif action["result"] is None:
+                    _LOGGER.info(
+                        "Action status not set yet by server - try again in a few seconds"
+                    )
+                    return ORDER_STATUS.PENDING
+
+        return ORDER_STATUS.UNKNOWN
+
+    def _get_control_token(self, token: Token) -> tuple:
+        """(control token, expiry timestamp)"""
+        url, headers, data = self._control_token_request(token)
+        response = self.session.put(url, json=data, headers=headers)
+        return self._control_token_from_response(response.json())
+
+    def _control_token_request(self, token: Token) -> tuple:
+        url = self.USER_API_URL + "pin?token="
+        headers = {
+            "Authorization": token.access_token,
+            "Content-type": "application/json",
+            "Host": self.BASE_URL,
+            "Accept-Encoding": "gzip",
+            "User-Agent": USER_AGENT_OK_HTTP,
+        }
+
+        data = {"deviceId": token.device_id, "pin": token.pin}
+        return url, headers, data
+
+    def _control_token_from_response(self, response: dict) -> tuple:
+        _LOGGER.debug("%s - Get Control Token Response %s", DOMAIN, response)
+        if response.get("controlToken") is None:
+            raise APIError("PIN verification failed, ensure PIN is entered correctly.")
+        control_token = "Bearer " + response["controlToken"]
+        control_token_expire_at = math.floor(
+            dt.datetime.now().timestamp() + response["expiresTime"]
+        )
+        return control_token, control_token_expire_at
+
     def _get_stamp(self) -> str:
         raw_data = f"{self.APP_ID}:{int(dt.datetime.now().timestamp())}".encode()
         result = bytes(b1 ^ b2 for b1, b2 in zip(self.CFB, raw_data))
         return base64.b64encode(result).decode("utf-8")
 
     def _get_device_id(self, stamp: str):
+        url, headers, payload = self._device_id_request(stamp)
+        _LOGGER.debug("%s - Get Device ID request: %s %s %s", DOMAIN, url, headers, payload)
+        response = self.session.post(url, headers=headers, json=payload)
+        return self._device_id_from_response(response.json())
+
+    def _device_id_request(self, stamp: str) -> tuple:
         my_hex = "%064x" % random.randrange(  # pylint: disable=consider-using-f-string
             10**80
         )
@@ -1079,18 +1392,24 @@ class KiaUvoApiEU(ApiImplType1):
             "User-Agent": USER_AGENT_OK_HTTP,
         }
 
-        _LOGGER.debug(f"{DOMAIN} - Get Device ID request: {url} {headers} {payload}")
-        response = requests.post(url, headers=headers, json=payload)
-        response = response.json()
+        return url, headers, payload
+
+    def _device_id_from_response(self, response: dict) -> str:
         _check_response_for_errors(response)
-        _LOGGER.debug(f"{DOMAIN} - Get Device ID response: {response}")
+        _LOGGER.debug("%s - Get Device ID response: %s", DOMAIN, response)
 
         device_id = response["resMsg"]["deviceId"]
         return device_id
 
     def _get_cookies(self) -> dict:
-        # Get Cookies #
-        url = (
+        url = self._cookies_url()
+        _LOGGER.debug("%s - Get cookies request: %s", DOMAIN, url)
+        _ = self.login_session.get(url)
+        _LOGGER.debug("%s - Get cookies response: %s", DOMAIN, self.login_session.cookies.get_dict())
+        return self.login_session.cookies.get_dict()
+
+    def _cookies_url(self) -> str:
+        return (
             self.USER_API_URL
             + "oauth2/authorize?response_type=code&state=test&client_id="
             + self.CLIENT_ID
@@ -1100,12 +1419,11 @@ class KiaUvoApiEU(ApiImplType1):
             + self.LANGUAGE
         )
 
-        _LOGGER.debug(f"{DOMAIN} - Get cookies request: {url}")
-        session = requests.Session()
-        _ = session.get(url)
-        _LOGGER.debug(f"{DOMAIN} - Get cookies response: {session.cookies.get_dict()}")
-        return session.cookies.get_dict()
-        # return session
+    def _set_session_language(self, cookies) -> None:
+        url = self.USER_API_URL + "language"
+        headers = {"Content-type": "application/json"}
+        payload = {"lang": self.LANGUAGE}
+        _ = self.login_session.post(url, json=payload, headers=headers, cookies=cookies)
 
     def _get_authorization_code_with_redirect_url(
         self, username, password, cookies
@@ -1114,86 +1432,87 @@ class KiaUvoApiEU(ApiImplType1):
             url = self.USER_API_URL + "signin"
             headers = {"Content-type": "application/json"}
             data = {"email": username, "password": password}
-            response = requests.post(
+            response = self.login_session.post(
                 url, json=data, headers=headers, cookies=cookies
             ).json()
-            _LOGGER.debug(f"{DOMAIN} - Sign In Response: {response}")
+            _LOGGER.debug("%s - Sign In Response: %s", DOMAIN, response)
             parsed_url = urlparse(response["redirectUrl"])
             authorization_code = "".join(parse_qs(parsed_url.query)["code"])
             return authorization_code
         elif BRANDS[self.brand] == BRAND_KIA:
-            session = requests.session()
-            session.headers.update({"User-Agent": USER_AGENT_MOZILLA})
-            url = self.LOGIN_FORM_HOST + "/auth/account/signin"
-            headers = {"content-type": "application/x-www-form-urlencoded"}
-            data = {
-                "client_id": "peukiaidm-online-sales",
-                "encryptedPassword": "false",
-                "username": username,
-                "password": password,
-                "redirect_uri": "https://www.kia.com/api/bin/oneid/login",
-                "state": "aHR0cHM6Ly93d3cua2lhLmNvbTo0NDMvZGUvP3ZlZD0yYWhVS0V3akI2ZFc3dDQtUEF4WFBSZkVESGNDQ0J4UVFnVTk2QkFnY0VBZyZfdG09MTc1NTg1NTY2ODE2Mg==_default",
-                "remember_me": "false",
-            }
-            response = session.post(url, headers=headers, data=data, cookies=cookies)
-
-            device_id = self._get_device_id(self._get_stamp())
-
-            # Authorize
-            url = (
-                self.LOGIN_FORM_HOST
-                + "/auth/api/v2/user/oauth2/authorize?response_type=code&client_id="
-                + self.CCSP_SERVICE_ID
-                + "&redirect_uri=https://"
-                + self.BASE_URL
-                + "/api/v1/user/oauth2/redirect&state=ccsp&lang=en"
-            )
-            headers = {
-                "ccsp-application-id": self.APP_ID,
-                "ccsp-service-id": self.CCSP_SERVICE_ID,
-                "ccsp-device-id": device_id,
-            }
-            response = session.get(url, headers=headers, allow_redirects=False)
-            url_location = response.headers["location"]
-
-            # Authorize2: Get connector_session_key
-            response = session.get(url_location, headers=headers, allow_redirects=False)
-            url_location = response.headers["location"]
-            parsed_redirect = urlparse(url_location)
-            next_uri = parse_qs(parsed_redirect.query).get("next_uri")[0]
-            parsed_next_uri = urlparse(next_uri)
-            connector_session_key = parse_qs(parsed_next_uri.query).get(
-                "connector_session_key"
-            )[0]
-
-            # Authorize3
-            response = session.get(url_location, headers=headers, allow_redirects=False)
-
-            # Authorize: Get Code
-            url = (
-                self.LOGIN_FORM_HOST
-                + "/auth/api/v2/user/oauth2/authorize?client_id="
-                + self.CCSP_SERVICE_ID
-                + "&redirect_uri=https://"
-                + self.BASE_URL
-                + "/api/v1/user/oauth2/redirect&response_type=code&scope=&state=ccsp&connector_client_id=hmgid1.0-"
-                + self.CCSP_SERVICE_ID
-                + "&ui_locales=de&connector_scope=&connector_session_key="
-                + connector_session_key
-            )
-            response = session.get(url, headers=headers, allow_redirects=False)
-            url_location = response.headers["location"]
-            parsed_redirect = urlparse(url_location)
-            code = parse_qs(parsed_redirect.query).get("code")[0]
+            # a session of its own for the sign-in cookies, closed with its connection pool once the code is known
+            with self._create_session() as session:
+                session.headers.update({"User-Agent": USER_AGENT_MOZILLA})
+                url = self.LOGIN_FORM_HOST + "/auth/account/signin"
+                headers = {"content-type": "application/x-www-form-urlencoded"}
+                data = {
+                    "client_id": "peukiaidm-online-sales",
+                    "encryptedPassword": "false",
+                    "username": username,
+                    "password": password,
+                    "redirect_uri": "https://www.kia.com/api/bin/oneid/login",
+                    "state": "aHR0cHM6Ly93d3cua2lhLmNvbTo0NDMvZGUvP3ZlZD0yYWhVS0V3akI2ZFc3dDQtUEF4WFBSZkVESGNDQ0J4UVFnVTk2QkFnY0VBZyZfdG09MTc1NTg1NTY2ODE2Mg==_default",
+                    "remember_me": "false",
+                }
+                response = session.post(url, headers=headers, data=data, cookies=cookies)
+
+                device_id = self._get_device_id(self._get_stamp())
+
+                # Authorize
+                url = (
+                    self.LOGIN_FORM_HOST
+                    + "/auth/api/v2/user/oauth2/authorize?response_type=code&client_id="
+                    + self.CCSP_SERVICE_ID
+                    + "&redirect_uri=https://"
+                    + self.BASE_URL
+                    + "/api/v1/user/oauth2/redirect&state=ccsp&lang=en"
+                )
+                headers = {
+                    "ccsp-application-id": self.APP_ID,
+                    "ccsp-service-id": self.CCSP_SERVICE_ID,
+                    "ccsp-device-id": device_id,
+                }
+                response = session.get(url, headers=headers, allow_redirects=False)
+                url_location = response.headers["location"]
+
+                # Authorize2: Get connector_session_key
+                response = session.get(url_location, headers=headers, allow_redirects=False)
+                url_location = response.headers["location"]
+                parsed_redirect = urlparse(url_location)
+                next_uri = parse_qs(parsed_redirect.query).get("next_uri")[0]
+                parsed_next_uri = urlparse(next_uri)
+                connector_session_key = parse_qs(parsed_next_uri.query).get(
+                    "connector_session_key"
+                )[0]
+
+                # Authorize3
+                response = session.get(url_location, headers=headers, allow_redirects=False)
+
+                # Authorize: Get Code
+                url = (
+                    self.LOGIN_FORM_HOST
+                    + "/auth/api/v2/user/oauth2/authorize?client_id="
+                    + self.CCSP_SERVICE_ID
+                    + "&redirect_uri=https://"
+                    + self.BASE_URL
+                    + "/api/v1/user/oauth2/redirect&response_type=code&scope=&state=ccsp&connector_client_id=hmgid1.0-"
+                    + self.CCSP_SERVICE_ID
+                    + "&ui_locales=de&connector_scope=&connector_session_key="
+                    + connector_session_key
+                )
+                response = session.get(url, headers=headers, allow_redirects=False)
+                url_location = response.headers["location"]
+                parsed_redirect = urlparse(url_location)
+                code = parse_qs(parsed_redirect.query).get("code")[0]
 
-            return code
+                return code
 
         else:
             url = self.LOGIN_FORM_URL
             headers = {"Content-type": "application/json"}
             data = {"email": username, "password": password}
-            response = requests.get(url, headers=headers, cookies=cookies)
-            _LOGGER.debug(f"{DOMAIN} - Sign In Response: {response}")
+            response = self.login_session.get(url, headers=headers, cookies=cookies)
+            _LOGGER.debug("%s - Sign In Response: %s", DOMAIN, response)
 
             url_redirect = response.url
             connector_session_key = re.search(
@@ -1219,7 +1538,7 @@ class KiaUvoApiEU(ApiImplType1):
                 "_csrf": "",
             }
 
-            response = requests.post(
+            response = self.login_session.post(
                 url, headers=headers, data=data, allow_redirects=False
             )
             location = response.headers["Location"]
@@ -1230,10 +1549,10 @@ class KiaUvoApiEU(ApiImplType1):
     def _get_authorization_code_with_form(self, username, password, cookies) -> str:
         url = self.USER_API_URL + "integrationinfo"
         headers = {"User-Agent": USER_AGENT_MOZILLA}
-        response = requests.get(url, headers=headers, cookies=cookies)
+        response = self.login_session.get(url, headers=headers, cookies=cookies)
         cookies = cookies | response.cookies.get_dict()
         response = response.json()
-        _LOGGER.debug(f"{DOMAIN} - IntegrationInfo Response: {response}")
+        _LOGGER.debug("%s - IntegrationInfo Response: %s", DOMAIN, response)
         user_id = response["userId"]
         service_id = response["serviceId"]
 
@@ -1241,7 +1560,7 @@ class KiaUvoApiEU(ApiImplType1):
         login_form_url = login_form_url.replace("$service_id", service_id)
         login_form_url = login_form_url.replace("$user_id", user_id)
 
-        response = requests.get(login_form_url, headers=headers, cookies=cookies)
+        response = self.login_session.get(login_form_url, headers=headers, cookies=cookies)
         cookies = cookies | response.cookies.get_dict()
         _LOGGER.debug(
             f"{DOMAIN} - LoginForm {login_form_url} - Response: {response.text}"
@@ -1259,7 +1578,7 @@ class KiaUvoApiEU(ApiImplType1):
             "Content-Type": "application/x-www-form-urlencoded",
             "User-Agent": USER_AGENT_MOZILLA,
         }
-        response = requests.post(
+        response = self.login_session.post(
             login_form_action_url,
             data=data,
             headers=headers,
@@ -1278,7 +1597,7 @@ class KiaUvoApiEU(ApiImplType1):
 
         redirect_url = response.headers["Location"]
         headers = {"User-Agent": USER_AGENT_MOZILLA}
-        response = requests.get(redirect_url, headers=headers, cookies=cookies)
+        response = self.login_session.get(redirect_url, headers=headers, cookies=cookies)
         cookies = cookies | response.cookies.get_dict()
         _LOGGER.debug(
             f"{DOMAIN} - Redirect User Id {redirect_url} - Response {response.url} - {response.text}"  # noqa
@@ -1293,7 +1612,7 @@ class KiaUvoApiEU(ApiImplType1):
                 "User-Agent": USER_AGENT_MOZILLA,
                 "followRedirects": "false",
             }
-            response = requests.post(
+            response = self.login_session.post(
                 login_form_action_url,
                 data=data,
                 headers=headers,
@@ -1314,18 +1633,24 @@ class KiaUvoApiEU(ApiImplType1):
             "User-Agent": USER_AGENT_MOZILLA,
             "ccsp-service-id": self.CCSP_SERVICE_ID,
         }
-        response = requests.post(
+        response = self.login_session.post(
             url,
             headers=headers,
             json={"intUserId": "0"},
             cookies=cookies,
         ).json()
-        _LOGGER.debug(f"{DOMAIN} - silentsignin Response {response}")
+        _LOGGER.debug("%s - silentsignin Response %s", DOMAIN, response)
         parsed_url = urlparse(response["redirectUrl"])
         authorization_code = "".join(parse_qs(parsed_url.query)["code"])
         return authorization_code
 
     def _get_access_token(self, stamp, authorization_code):
+        url, kwargs = self._access_token_request(stamp, authorization_code)
+        response = self.session.post(url, **kwargs)
+        return self._access_token_from_response(response.json())
+
+    def _access_token_request(self, stamp, authorization_code) -> tuple:
+        """URL and keyword arguments of the POST exchanging the authorization (or, for Kia, refresh) token"""
         if BRANDS[self.brand] == BRAND_HYUNDAI:
             url = self.USER_API_URL + "oauth2/token"
             headers = {
@@ -1344,7 +1669,7 @@ class KiaUvoApiEU(ApiImplType1):
                 + "%3A8080%2Fapi%2Fv1%2Fuser%2Foauth2%2Fredirect&code="
                 + authorization_code
             )
-            response = requests.post(url, data=data, headers=headers)
+            return url, {"data": data, "headers": headers}
         else:
             url = self.LOGIN_FORM_HOST + "/auth/api/v2/user/oauth2/token"
             data = {
@@ -1353,11 +1678,9 @@ class KiaUvoApiEU(ApiImplType1):
                 "client_id": self.CCSP_SERVICE_ID,
                 "client_secret": "secret",
             }
+            return url, {"data": data, "allow_redirects": False}
 
-            response = requests.post(url, data=data, allow_redirects=False)
-
-        response = response.json()
-
+    def _access_token_from_response(self, response: dict) -> tuple:
         token_type = response["token_type"]
         access_token = token_type + " " + response["access_token"]
         authorization_code = response["refresh_token"]
@@ -1381,7 +1704,7 @@ class KiaUvoApiEU(ApiImplType1):
             "grant_type=refresh_token&redirect_uri=https%3A%2F%2Fwww.getpostman.com%2Foauth2%2Fcallback&refresh_token="  # noqa
             + authorization_code
         )
-        response = requests.post(url, data=data, headers=headers)
+        response = self.session.post(url, data=data, headers=headers)
         response = response.json()
         token_type = response["token_type"]
         refresh_token = token_type + " " + response["access_token"]
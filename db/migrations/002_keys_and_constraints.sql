@@ -0,0 +1,33 @@
+-- Primary keys, lookup indexes and unique constraints.
+-- The unique constraints on trips.unix_timestamp and stats_per_day.date back the
+-- INSERT ... ON DUPLICATE KEY statements in DatabaseClient, so duplicates left over
+-- from older versions are removed before the constraints are added.
+
+ALTER TABLE `log`
+  ADD COLUMN `id` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST,
+  ADD INDEX `idx_log_unix_timestamp` (`unix_timestamp`),
+  ADD INDEX `idx_log_unix_last_vehicle_update_timestamp` (`unix_last_vehicle_update_timestamp`),
+  ADD INDEX `idx_log_odometer` (`odometer`);
+
+ALTER TABLE `errors`
+  ADD COLUMN `id` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST,
+  ADD INDEX `idx_errors_unix_timestamp` (`unix_timestamp`);
+
+ALTER TABLE `trips`
+  ADD COLUMN `id` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST;
+
+DELETE t1 FROM `trips` t1
+  JOIN `trips` t2 ON t1.`unix_timestamp` = t2.`unix_timestamp` AND t1.`id` > t2.`id`;
+
+ALTER TABLE `trips`
+  ADD UNIQUE KEY `uq_trips_unix_timestamp` (`unix_timestamp`);
+
+ALTER TABLE `stats_per_day`
+  ADD COLUMN `id` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST;
+
+DELETE s1 FROM `stats_per_day` s1
+  JOIN `stats_per_day` s2 ON s1.`date` = s2.`date` AND s1.`id` > s2.`id`;
+
+ALTER TABLE `stats_per_day`
+  ADD UNIQUE KEY `uq_stats_per_day_date` (`date`),
+  ADD INDEX `idx_stats_per_day_unix_timestamp` (`unix_timestamp`);
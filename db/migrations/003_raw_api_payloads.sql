@@ -0,0 +1,17 @@
+-- Raw API payloads are stored once as compressed JSON (see RawPayload.py) and referenced
+-- from 'log' instead of repeating the stringified status dict in every row.
+-- Legacy rows keep their 'raw_api_data' text until they are compacted (main.py --action compact_raw_data).
+
+CREATE TABLE IF NOT EXISTS `raw_api_payloads` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  `sha256` CHAR(64) NOT NULL,
+  `encoding` VARCHAR(32) NOT NULL,
+  `size_bytes` INT,
+  `payload` MEDIUMBLOB NOT NULL,
+  `unix_timestamp` INT,
+  UNIQUE KEY `uq_raw_api_payloads_sha256` (`sha256`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+ALTER TABLE `log`
+  ADD COLUMN `raw_api_payload_id` BIGINT NULL,
+  ADD INDEX `idx_log_raw_api_payload_id` (`raw_api_payload_id`);
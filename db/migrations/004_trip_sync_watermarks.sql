@@ -0,0 +1,21 @@
+-- Trip sync watermarks: what process_trips() already fetched from the API, so that unchanged
+-- months and days (and a car that has not moved) cost no API calls.
+-- 'complete' means every past day of the month with trips has been fetched, as of 'odometer'.
+-- 'odometer_since' is when that odometer value was first seen: trips of that day can only be fetched
+-- the day after, so a sync only covers the odometer if it ran on a later day.
+
+CREATE TABLE IF NOT EXISTS `trip_sync_months` (
+  `yyyymm` CHAR(6) NOT NULL PRIMARY KEY,
+  `trip_count` INT NOT NULL,
+  `distance` INT,
+  `complete` TINYINT NOT NULL DEFAULT 0,
+  `odometer` DOUBLE,
+  `odometer_since` INT,
+  `unix_timestamp` INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `trip_sync_days` (
+  `yyyymmdd` CHAR(8) NOT NULL PRIMARY KEY,
+  `trip_count` INT NOT NULL,
+  `unix_timestamp` INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
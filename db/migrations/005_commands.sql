@@ -0,0 +1,16 @@
+-- Remote commands sent to the car (start/stop charge...) and their outcome, as tracked by CommandQueue.
+-- 'action_id' is the msgId the API returned, used to poll the status of the command.
+-- 'status' is one of: queued, sending, pending, success, failed, timeout, error.
+
+CREATE TABLE IF NOT EXISTS `commands` (
+  `id` CHAR(32) NOT NULL PRIMARY KEY,
+  `command` VARCHAR(32) NOT NULL,
+  `action_id` VARCHAR(64),
+  `status` VARCHAR(16) NOT NULL,
+  `error` TEXT,
+  `status_checks` INT NOT NULL DEFAULT 0,
+  `created_at` INT NOT NULL,
+  `sent_at` INT,
+  `finished_at` INT,
+  KEY `idx_commands_status` (`status`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,9 @@
+-- Write-behind spool (Spool.py): the sequence number of the last spooled record written to the database.
+-- It is updated in the same transaction as the rows, so that replaying the spool file after a crash or an
+-- outage skips what was already written.
+
+CREATE TABLE IF NOT EXISTS `spool_state` (
+  `name` VARCHAR(64) NOT NULL PRIMARY KEY,
+  `seq` BIGINT NOT NULL,
+  `unix_timestamp` INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
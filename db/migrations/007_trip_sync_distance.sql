@@ -0,0 +1,4 @@
+-- The month distance of the trip sync watermark is compared with the distance the API returns, which has decimals:
+-- store it as it is, an INT column rounded it and the month never compared as unchanged.
+
+ALTER TABLE `trip_sync_months` MODIFY `distance` DOUBLE;
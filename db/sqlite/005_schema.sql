@@ -0,0 +1,106 @@
+-- SQLite schema, equivalent to the MySQL schema at version 5 (db_schema.sql and db/migrations up to 005).
+-- Later MySQL migrations get their SQLite counterpart in this directory, with the same number.
+
+CREATE TABLE IF NOT EXISTS stats_per_day (
+  id INTEGER PRIMARY KEY,
+  date TEXT,
+  unix_timestamp INTEGER,
+  total_consumed_kwh REAL,
+  engine_consumption_kwh REAL,
+  climate_consumption_kwh REAL,
+  onboard_electronics_consumption_kwh REAL,
+  battery_care_consumption_kwh REAL,
+  regenerated_energy_kwh REAL,
+  distance INTEGER,
+  average_consumption_kwh REAL,
+  average_consumption_regen_deducted_kwh REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stats_per_day_date ON stats_per_day(date);
+CREATE INDEX IF NOT EXISTS idx_stats_per_day_unix_timestamp ON stats_per_day(unix_timestamp);
+
+CREATE TABLE IF NOT EXISTS raw_api_payloads (
+  id INTEGER PRIMARY KEY,
+  sha256 TEXT NOT NULL,
+  encoding TEXT NOT NULL,
+  size_bytes INTEGER,
+  payload BLOB NOT NULL,
+  unix_timestamp INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_raw_api_payloads_sha256 ON raw_api_payloads(sha256);
+
+CREATE TABLE IF NOT EXISTS log (
+  id INTEGER PRIMARY KEY,
+  battery_percentage INTEGER,
+  accessory_battery_percentage INTEGER,
+  estimated_range_km INTEGER,
+  timestamp TEXT,
+  unix_timestamp INTEGER,
+  last_vehicule_update_timestamp TEXT,
+  unix_last_vehicle_update_timestamp INTEGER,
+  latitude TEXT,
+  longitude TEXT,
+  odometer INTEGER,
+  charging INTEGER,
+  engine_is_running INTEGER,
+  rough_charging_power_estimate_kw REAL,
+  returned_api_status TEXT,
+  ac_charge_limit_percent INTEGER,
+  dc_charge_limit_percent INTEGER,
+  target_climate_temperature INTEGER,
+  raw_api_data TEXT,
+  raw_api_payload_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_log_unix_timestamp ON log(unix_timestamp);
+CREATE INDEX IF NOT EXISTS idx_log_unix_last_vehicle_update_timestamp ON log(unix_last_vehicle_update_timestamp);
+CREATE INDEX IF NOT EXISTS idx_log_odometer ON log(odometer);
+CREATE INDEX IF NOT EXISTS idx_log_raw_api_payload_id ON log(raw_api_payload_id);
+
+CREATE TABLE IF NOT EXISTS errors (
+  id INTEGER PRIMARY KEY,
+  timestamp TEXT,
+  unix_timestamp INTEGER,
+  exc_type TEXT,
+  exc_args TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_errors_unix_timestamp ON errors(unix_timestamp);
+
+CREATE TABLE IF NOT EXISTS trips (
+  id INTEGER PRIMARY KEY,
+  unix_timestamp INTEGER,
+  date TEXT,
+  driving_time_minutes INTEGER,
+  idle_time_minutes INTEGER,
+  distance_km INTEGER,
+  avg_speed_kmh INTEGER,
+  max_speed_kmh INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_trips_unix_timestamp ON trips(unix_timestamp);
+
+CREATE TABLE IF NOT EXISTS trip_sync_months (
+  yyyymm TEXT NOT NULL PRIMARY KEY,
+  trip_count INTEGER NOT NULL,
+  distance INTEGER,
+  complete INTEGER NOT NULL DEFAULT 0,
+  odometer REAL,
+  odometer_since INTEGER,
+  unix_timestamp INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS trip_sync_days (
+  yyyymmdd TEXT NOT NULL PRIMARY KEY,
+  trip_count INTEGER NOT NULL,
+  unix_timestamp INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS commands (
+  id TEXT NOT NULL PRIMARY KEY,
+  command TEXT NOT NULL,
+  action_id TEXT,
+  status TEXT NOT NULL,
+  error TEXT,
+  status_checks INTEGER NOT NULL DEFAULT 0,
+  created_at INTEGER NOT NULL,
+  sent_at INTEGER,
+  finished_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_commands_status ON commands(status);
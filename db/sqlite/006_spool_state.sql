@@ -0,0 +1,7 @@
+-- Same as db/migrations/006_spool_state.sql.
+
+CREATE TABLE IF NOT EXISTS spool_state (
+  name TEXT NOT NULL PRIMARY KEY,
+  seq INTEGER NOT NULL,
+  unix_timestamp INTEGER NOT NULL
+);
@@ -0,0 +1,15 @@
+-- Same as db/migrations/007_trip_sync_distance.sql: SQLite can't change a column type, the table is rebuilt.
+
+CREATE TABLE trip_sync_months_new (
+  yyyymm TEXT NOT NULL PRIMARY KEY,
+  trip_count INTEGER NOT NULL,
+  distance REAL,
+  complete INTEGER NOT NULL DEFAULT 0,
+  odometer REAL,
+  odometer_since INTEGER,
+  unix_timestamp INTEGER NOT NULL
+);
+INSERT INTO trip_sync_months_new SELECT yyyymm, trip_count, distance, complete, odometer, odometer_since, unix_timestamp
+  FROM trip_sync_months;
+DROP TABLE trip_sync_months;
+ALTER TABLE trip_sync_months_new RENAME TO trip_sync_months;
@@ -1,28 +1,63 @@
+import functools
 import os
 import time
 import threading
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, make_response, Response, stream_with_context
 from hyundai_kia_connect_api.exceptions import RateLimitingError, InvalidAPIResponseError
 from pytz import timezone as pytz_timezone
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from VehicleClient import VehicleClient
 from Logger import Logger
+from RequestBudget import RequestBudget, Priority, BudgetExceededError
+from AdaptiveScheduler import AdaptiveScheduler, PollingPolicy
+from VehicleSnapshot import VehicleSnapshot
+from JobRunner import JobRunner
+from CommandQueue import CommandQueue, SUCCESS
+from EventBroadcaster import EventBroadcaster
+from SchedulerLock import SchedulerLock
+import Metrics
+from Metrics import timed, JOB_DURATION
+from Tracing import traced
 
 app = Flask(__name__)
 
 vehicle_client = None
+scheduler = None
 logger = Logger.get_logger(__name__)
 
+polling_policy = None
+adaptive_scheduler = None
+vehicle_snapshot = None
+job_runner = None
+command_queue = None
+event_broadcaster = None
+scheduler_lock = None
+_services_lock = threading.Lock()
+TRIPS_AFTER_DRIVE_JOB_ID = "trips_after_drive"
+
+def user_action(view):
+    """API calls made by this endpoint are user triggered: they may use the reserved part of the request budget"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with RequestBudget.priority(Priority.HIGH):
+            return view(*args, **kwargs)
+    return wrapper
+
+@app.errorhandler(BudgetExceededError)
+def handle_budget_exceeded(e):
+    return jsonify({"status": "error", "message": str(e)}), 429
+
 def safe_update_vehicle_state():
     """
-    Safely update vehicle state with automatic token refresh on expiry
+    Safely update vehicle state with automatic token refresh on expiry.
+    Concurrent callers share one API call.
     Returns True on success, False on failure
     """
     try:
-        vehicle_client.vm.update_all_vehicles_with_cached_state()
+        vehicle_client.update_cached_state()
         return True
     except Exception as e:
         # If token expired or other error, try to refresh
@@ -30,7 +65,7 @@ def safe_update_vehicle_state():
         if should_retry:
             try:
                 # Retry after token refresh
-                vehicle_client.vm.update_all_vehicles_with_cached_state()
+                vehicle_client.update_cached_state()
                 return True
             except Exception as retry_e:
                 logger.exception("Failed to update vehicle state even after token refresh:", exc_info=retry_e)
@@ -46,58 +81,71 @@ def index():
         "/": "This help page",
         "/status": "Get detailed vehicle status (battery, range, charging state, etc.)",
         "/battery": "Get battery percentage",
-        "/force_refresh": "Force refresh vehicle state",
-        "/force_trips": "Force refresh and save trip information to database",
+        "/force_refresh": "Force refresh vehicle state (background job)",
+        "/force_trips": "Force refresh and save trip information to database (background job)",
         "/force_daily_stats": "Force save daily statistics to database",
-        "/charge": "Control charging (parameters: action=[start|stop], synchronous=[true|false])"
+        "/charge": "Control charging (parameters: action=[start|stop], synchronous=[true|false]), returns a command id",
+        "/commands/<id>": "Status of a charge command (parameter: wait=<seconds> to wait until it is final)",
+        "/events": "Server-Sent Events stream of vehicle state changes (resumable with Last-Event-ID)",
+        "/jobs/<id>": "Status and result of a background job",
+        "/db_stats": "Database statistics",
+        "/budget": "API calls made in the last 24h and what is left of the daily quota",
+        "/schedule": "Next scheduled vehicle refresh and the reason for its timing",
+        "/snapshot_stats": "Age and refresh counts of the in-memory snapshot served by /status and /battery, coalesced API calls",
+        "/metrics": "Prometheus metrics: API and database latency, API errors, rows written, scheduled jobs, latest SoC"
     }
     return jsonify({
         "available_endpoints": endpoints,
-        "note": "All endpoints return JSON except /battery which returns plain text"
+        "note": "All endpoints return JSON except /battery and /metrics which return plain text"
     })
 
+def accepted(action: str, job: dict):
+    """202 answer for an operation running in the background, to be polled at /jobs/<id>"""
+    job_url = f"/jobs/{job['id']}"
+    response = jsonify({"action": action, "status": "accepted", "job_id": job["id"], "job_url": job_url})
+    response.status_code = 202
+    response.headers["Location"] = job_url
+    return response
+
 @app.route("/force_refresh")
+@user_action
 def force_refresh():
-    vehicle_client.vm.force_refresh_vehicle_state(vehicle_client.vehicle.id)
-    vehicle_client.vm.update_vehicle_with_cached_state(vehicle_client.vehicle.id)
-    vehicle_client.save_log()
-    return jsonify({"action": "force_refresh", "status": "success"})
+    """Wake the car up and fetch its state, in the background"""
+    def run():
+        vehicle_client.force_refresh()
+        vehicle_client.save_log()
+        publish_vehicle_snapshot()
+        return {"action": "force_refresh", "status": "success"}
+
+    return accepted("force_refresh", job_runner.submit("force_refresh", run))
 
 @app.route("/force_trips")
+@user_action
 def force_trips():
-    """Force refresh and save trip information to database"""
-    try:
-        # First ensure we have fresh vehicle data
-        if not safe_update_vehicle_state():
-            return jsonify({
-                "action": "force_trips",
-                "status": "error",
-                "message": "Failed to update vehicle state"
-            }), 500
+    """Force refresh and save trip information to database, in the background"""
+    return accepted("force_trips", job_runner.submit("force_trips", process_trips_job))
 
-        # Process and save trips to database
-        if vehicle_client.vehicle and hasattr(vehicle_client.vehicle, 'daily_stats') and vehicle_client.vehicle.daily_stats:
-            vehicle_client.process_trips()
-            return jsonify({
-                "action": "force_trips",
-                "status": "success",
-                "message": "Trip information refreshed and individual trips saved to database"
-            })
-        else:
-            return jsonify({
-                "action": "force_trips",
-                "status": "warning",
-                "message": "No daily stats available for trip processing"
-            })
-    except Exception as e:
-        logger.exception("Error during force trips operation:", exc_info=e)
-        return jsonify({
+def process_trips_job():
+    # First ensure we have fresh vehicle data
+    if not safe_update_vehicle_state():
+        raise RuntimeError("Failed to update vehicle state")
+
+    # Process and save trips to database
+    if vehicle_client.vehicle and hasattr(vehicle_client.vehicle, 'daily_stats') and vehicle_client.vehicle.daily_stats:
+        vehicle_client.process_trips()
+        return {
             "action": "force_trips",
-            "status": "error",
-            "message": f"Failed to process trips: {str(e)}"
-        }), 500
+            "status": "success",
+            "message": "Trip information refreshed and individual trips saved to database"
+        }
+    return {
+        "action": "force_trips",
+        "status": "warning",
+        "message": "No daily stats available for trip processing"
+    }
 
 @app.route("/force_daily_stats")
+@user_action
 def force_daily_stats():
     """Force save daily statistics to database"""
     try:
@@ -111,7 +159,8 @@ def force_daily_stats():
 
         # Save daily statistics to database
         if vehicle_client.vehicle and hasattr(vehicle_client.vehicle, 'daily_stats') and vehicle_client.vehicle.daily_stats:
-            vehicle_client.db_client.save_daily_stats()
+            with vehicle_client.locked():
+                vehicle_client.db_client.save_daily_stats()
             return jsonify({
                 "action": "force_daily_stats",
                 "status": "success",
@@ -131,13 +180,10 @@ def force_daily_stats():
             "message": f"Failed to save daily stats: {str(e)}"
         }), 500
 
-@app.route("/status")
-def get_cached_status():
+def refresh_vehicle_snapshot():
+    """Refresh the vehicle state for the snapshot, and save it if the vehicle sent newer data"""
     if not safe_update_vehicle_state():
-        return jsonify({
-            "status": "error",
-            "message": "Failed to update vehicle state"
-        }), 500
+        return False
 
     # Convert both timestamps to UTC for comparison
     last_vehicle_update = vehicle_client.vehicle.last_updated_at
@@ -150,64 +196,195 @@ def get_cached_status():
 
     if last_vehicle_update > last_db_update:
         vehicle_client.save_log()
+    return True
+
+def build_vehicle_snapshot():
+    """What /status and /battery serve, taken from the current vehicle state"""
+    with vehicle_client.locked():
+        return {
+            "battery_percentage": vehicle_client.vehicle.ev_battery_percentage,
+            "accessory_battery_percentage": vehicle_client.vehicle.car_battery_percentage,
+            "estimated_range_km": vehicle_client.vehicle.ev_driving_range,
+            "last_vehicule_update_timestamp": vehicle_client.vehicle.last_updated_at.isoformat(),
+            "odometer": vehicle_client.vehicle.odometer,
+            "charging": vehicle_client.vehicle.ev_battery_is_charging,
+            "engine_is_running": vehicle_client.vehicle.engine_is_running,
+            "rough_charging_power_estimate_kw": vehicle_client.charging_power_in_kilowatts,
+            "ac_charge_limit_percent": vehicle_client.vehicle.ev_charge_limits_ac,
+            "dc_charge_limit_percent": vehicle_client.vehicle.ev_charge_limits_dc,
+        }
+
+def publish_vehicle_snapshot():
+    """The vehicle state was refreshed outside of the snapshot (scheduled or forced refresh): serve it"""
+    if vehicle_snapshot is not None and vehicle_client.vehicle and vehicle_client.vehicle.last_updated_at:
+        try:
+            vehicle_snapshot.publish()
+        except Exception as e:
+            logger.error(f"Failed to publish vehicle snapshot: {str(e)}")
 
-    result = {
-        "battery_percentage": vehicle_client.vehicle.ev_battery_percentage,
-        "accessory_battery_percentage": vehicle_client.vehicle.car_battery_percentage,
-        "estimated_range_km": vehicle_client.vehicle.ev_driving_range,
-        "last_vehicule_update_timestamp": vehicle_client.vehicle.last_updated_at.isoformat(),
-        "odometer": vehicle_client.vehicle.odometer,
-        "charging": vehicle_client.vehicle.ev_battery_is_charging,
-        "engine_is_running": vehicle_client.vehicle.engine_is_running,
-        "rough_charging_power_estimate_kw": vehicle_client.charging_power_in_kilowatts,
-        "ac_charge_limit_percent": vehicle_client.vehicle.ev_charge_limits_ac,
-        "dc_charge_limit_percent": vehicle_client.vehicle.ev_charge_limits_dc,
-    }
-    return jsonify(result)
+def snapshot_response(body):
+    """
+    Serve the vehicle snapshot with ETag / Cache-Control / Age headers, 304 if the client already has it
+    :param body: callable building the response body from (snapshot, age)
+    """
+    snapshot, etag, age = vehicle_snapshot.get()
+    if snapshot is None:
+        return None
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        response = make_response("", 304)
+    else:
+        response = make_response(body(snapshot, age))
+    response.headers["ETag"] = etag
+    response.headers["Age"] = str(int(age))
+    response.headers["Cache-Control"] = f"max-age={max(0, int(vehicle_snapshot.ttl - age))}"
+    return response
+
+@app.route("/status")
+def get_cached_status():
+    response = snapshot_response(lambda snapshot, age: jsonify({**snapshot, "age": round(age, 1)}))
+    if response is None:
+        return jsonify({
+            "status": "error",
+            "message": "Failed to update vehicle state"
+        }), 500
+    return response
 
 @app.route("/battery")
 def get_battery_soc():
-    if not safe_update_vehicle_state():
+    response = snapshot_response(lambda snapshot, age: str(snapshot["battery_percentage"]))
+    if response is None:
         return "Error: Failed to update vehicle state", 500
-
-    # Convert both timestamps to UTC for comparison
-    last_vehicle_update = vehicle_client.vehicle.last_updated_at
-    if not last_vehicle_update.tzinfo:
-        last_vehicle_update = last_vehicle_update.replace(tzinfo=timezone.utc)
-
-    last_db_update = vehicle_client.db_client.get_last_update_timestamp()
-    if not last_db_update.tzinfo:
-        last_db_update = last_db_update.replace(tzinfo=timezone.utc)
-
-    if last_vehicle_update > last_db_update:
-        vehicle_client.save_log()
-    return str(vehicle_client.vehicle.ev_battery_percentage)
+    return response
 
 @app.route("/charge")
+@user_action
 def toggle_charge():
+    """
+    Queue a start/stop charge command and return its id at once, to be followed at /commands/<id>.
+    With synchronous=true, wait (up to CHARGE_STATUS_TIMEOUT_SECONDS) for the car to confirm.
+    """
     action = request.args.get('action', 'start')
-    wait_for_response = bool(request.args.get('synchronous', False))
+    wait_for_response = request.args.get('synchronous', 'false').lower() in ('true', '1', 'yes')
 
-    if action == "start":
-        vehicle_client.vm.start_charge(vehicle_client.vehicle.id)
-    elif action == "stop":
-        vehicle_client.vm.stop_charge(vehicle_client.vehicle.id)
-    else:
+    if action not in ("start", "stop"):
         return jsonify({"error": "Invalid action. Use 'start' or 'stop'"}), 400
 
+    command = command_queue.submit("charge_" + action)
     if wait_for_response:
-        time.sleep(5)
-        status = vehicle_client.vm.get_last_action_status(vehicle_client.vehicle.id)
-        return jsonify({"action": "charge_" + action, "status": status})
+        command = command_queue.wait(command["id"], int(os.getenv('CHARGE_STATUS_TIMEOUT_SECONDS', '60')))
+        return jsonify(command_response(command))
+
+    command_url = f"/commands/{command['id']}"
+    response = jsonify(command_response(command))
+    response.status_code = 202
+    response.headers["Location"] = command_url
+    return response
+
+def command_response(command: dict) -> dict:
+    return {"action": command["command"], "command_id": command["id"], "command_url": f"/commands/{command['id']}",
+            **command}
+
+@app.route("/commands/<command_id>")
+def get_command(command_id):
+    """Status of a remote command, wait=<seconds> (max 60) to long-poll until it is final"""
+    wait = min(60, max(0, request.args.get('wait', 0, type=int)))
+    command = command_queue.wait(command_id, wait) if wait else command_queue.get(command_id)
+    if command is None:
+        return jsonify({"status": "error", "message": f"Unknown command {command_id}"}), 404
+    return jsonify(command_response(command))
+
+def on_command_changed(command: dict):
+    if command["status"] == SUCCESS and command["command"].startswith("charge_") and adaptive_scheduler:
+        # the charging state changes: check it soon, so that the polling interval follows
+        adaptive_scheduler.run_soon(120, command["command"])
+
+@app.route("/db_stats")
+def get_db_stats():
+    """Database backend statistics (MySQL pool checkouts and reconnects, SQLite writes and write queue wait time)"""
+    return jsonify(vehicle_client.db_client.get_pool_stats())
+
+@app.route("/budget")
+def get_budget():
+    """API request budget: calls per endpoint in the rolling 24h window and what is left"""
+    if vehicle_client.request_budget is None:
+        return jsonify({"status": "error", "message": "Request budget is only available with the direct API"}), 404
+    return jsonify(vehicle_client.request_budget.stats())
+
+@app.route("/schedule")
+def get_schedule():
+    """When the next scheduled vehicle refresh happens, and why"""
+    if adaptive_scheduler is None:
+        return jsonify({"status": "error", "message": "Scheduler is not running"}), 404
+    return jsonify(adaptive_scheduler.status())
+
+@app.route("/events")
+def stream_events():
+    """
+    Server-Sent Events stream of the vehicle state: a "state" event with every field, then a "diff" event with the
+    changed fields each time a new state is saved. Reconnecting clients resume with the Last-Event-ID header.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        last_event_id = int(last_event_id) if last_event_id is not None else None
+    except ValueError:
+        last_event_id = None
+
+    subscription, backlog = event_broadcaster.subscribe(last_event_id)
+    if subscription is None:
+        response = jsonify({"status": "error",
+                            "message": f"Too many event subscribers (at most {event_broadcaster.max_subscribers}, "
+                                       f"see EVENTS_MAX_SUBSCRIBERS), poll /status instead or retry later"})
+        response.headers["Retry-After"] = "60"
+        return response, 503
 
-    return jsonify({"action": "charge_" + action, "status": "command_sent"})
+    keepalive = int(os.getenv('EVENTS_KEEPALIVE_SECONDS', '15'))
 
-def is_within_active_hours():
-    """Check if current time is within the configured active hours"""
-    current_hour = datetime.now().hour
-    start_hour = int(os.getenv('REFRESH_START_HOUR', '6'))
-    end_hour = int(os.getenv('REFRESH_END_HOUR', '22'))
-    return start_hour <= current_hour < end_hour
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            for event in backlog:
+                yield EventBroadcaster.format(event)
+            while not subscription.overflowed:
+                event = subscription.get(timeout=keepalive)
+                # a comment line keeps proxies from closing the idle connection, and detects gone clients
+                yield EventBroadcaster.format(event) if event else ": keepalive\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(stream_with_context(stream()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route("/jobs")
+def get_jobs():
+    """Background operations started by /force_refresh and /force_trips"""
+    return jsonify(job_runner.list())
+
+@app.route("/jobs/<job_id>")
+def get_job(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown job {job_id}"}), 404
+    return jsonify(job)
+
+@app.route("/snapshot_stats")
+def get_snapshot_stats():
+    """In-memory vehicle snapshot: age, TTL and background refreshes"""
+    return jsonify({**vehicle_snapshot.stats(), "upstream_calls": vehicle_client.single_flight.stats(),
+                    "events": event_broadcaster.stats()})
+
+@app.route("/metrics")
+def get_metrics():
+    """Prometheus metrics, in the text exposition format"""
+    return Response(Metrics.REGISTRY.render(), content_type=Metrics.CONTENT_TYPE)
+
+def vehicle_metric(get):
+    """Gauge function reading the current vehicle state when /metrics is scraped, None while there is none"""
+    def read():
+        vehicle = vehicle_client.vehicle if vehicle_client else None
+        return get(vehicle) if vehicle is not None else None
+    return read
 
 def get_min_aux_battery_soc():
     """Get minimum auxiliary battery SOC threshold from env, ensuring it's not below 60%"""
@@ -225,52 +402,56 @@ def is_aux_battery_ok():
     logger.debug(f"Current auxiliary battery SOC: {current_soc}%")
     return current_soc >= min_aux_soc
 
-def update_vehicle_state():
-    """Force refresh and update vehicle state"""
-    vehicle_client.vm.force_refresh_vehicle_state(vehicle_client.vehicle.id)
-    vehicle_client.vm.update_vehicle_with_cached_state(vehicle_client.vehicle.id)
-
-def scheduled_refresh():
-    """Perform scheduled refresh if within active hours and auxiliary battery is OK"""
-    try:
-        if not is_within_active_hours():
-            logger.info("Outside active hours, skipping scheduled refresh")
-            return
+@timed(JOB_DURATION, "adaptive_refresh")
+@traced("job.adaptive_refresh")
+def adaptive_refresh():
+    """
+    Scheduled refresh: update the vehicle state (cached, or forced when the cached data is stale and the 12V battery
+    is OK), save it, and tell the adaptive scheduler when the next refresh should happen.
+    :return: (seconds until the next refresh, reason)
+    """
+    vehicle = vehicle_client.vehicle
+    charging = bool(vehicle and vehicle.ev_battery_is_charging)
+    if not polling_policy.is_active() and not charging:
+        logger.info("Outside active hours, skipping scheduled refresh")
+        return polling_policy.next_delay()
 
-        if not is_aux_battery_ok():
-            logger.info("Auxiliary battery level too low, skipping scheduled refresh")
-            return
+    budget = vehicle_client.request_budget
+    used_before = budget.used() if budget else 0
+    previous_odometer = vehicle.odometer if vehicle else None
 
-        logger.info("Starting scheduled refresh")
-        
-        # Step 1: Update vehicle state
-        try:
-            update_vehicle_state()
-            logger.info("Step 1/2: Vehicle state updated successfully")
-        except Exception as e:
-            logger.error(f"Step 1/2: Failed to update vehicle state: {str(e)}")
-            return
-
-        # Step 2: Process and save data
-        try:
-            if vehicle_client.vehicle:
-                # Save current state to database
-                vehicle_client.save_log()
-                logger.info("Step 2/2: Vehicle data processed and saved successfully")
-            else:
-                logger.warning("Step 2/2: No vehicle data available to process")
-        except Exception as e:
-            logger.error(f"Step 2/2: Failed to process vehicle data: {str(e)}")
-        
-        logger.info("Scheduled refresh completed")
-        
+    logger.info("Starting scheduled refresh")
+    try:
+        mode = vehicle_client.update_state(polling_policy.force_refresh_interval(),
+                                           allow_force=is_aux_battery_ok())
+        logger.info(f"Vehicle state updated ({mode} refresh)")
+        vehicle_client.save_log()
+        publish_vehicle_snapshot()
     except Exception as e:
+        vehicle_client.handle_api_exception(e)
         logger.error(f"Scheduled refresh failed: {str(e)}")
 
+    vehicle = vehicle_client.vehicle
+    if previous_odometer is not None and vehicle and vehicle.odometer and vehicle.odometer > previous_odometer:
+        # the car was driven: the trip shows up in the API after a few minutes
+        logger.info("Odometer changed, processing trips in 15 minutes")
+        scheduler.add_job(scheduled_trip_processing, 'date', id=TRIPS_AFTER_DRIVE_JOB_ID, replace_existing=True,
+                          run_date=datetime.now(scheduler.timezone) + timedelta(minutes=15))
+
+    calls = budget.used() - used_before if budget else 1
+    return polling_policy.next_delay(calls, aux_battery_ok=is_aux_battery_ok())
+
+@timed(JOB_DURATION, "trip_processing")
+@traced("job.trip_processing")
 def scheduled_trip_processing():
     """Scheduled trip processing - runs every 2 hours during day"""
     try:
         logger.info("Starting scheduled trip processing")
+
+        # The odometer kept up to date by the adaptive refresh tells if there can be new trips at all
+        if vehicle_client.trips_up_to_date():
+            logger.info("Odometer unchanged since the last trip sync, skipping scheduled trip processing")
+            return
         
         # Ensure we have fresh vehicle data
         if not safe_update_vehicle_state():
@@ -287,6 +468,8 @@ def scheduled_trip_processing():
     except Exception as e:
         logger.error(f"Scheduled trip processing failed: {str(e)}")
 
+@timed(JOB_DURATION, "daily_stats")
+@traced("job.daily_stats")
 def scheduled_daily_stats():
     """Scheduled daily stats saving - runs once per day at 23:30"""
     try:
@@ -299,7 +482,8 @@ def scheduled_daily_stats():
         
         # Save daily stats if data is available
         if vehicle_client.vehicle and hasattr(vehicle_client.vehicle, 'daily_stats') and vehicle_client.vehicle.daily_stats:
-            vehicle_client.db_client.save_daily_stats()
+            with vehicle_client.locked():
+                vehicle_client.db_client.save_daily_stats()
             logger.info("Scheduled daily stats saving completed successfully")
         else:
             logger.warning("No daily stats data available for scheduled saving")
@@ -307,45 +491,151 @@ def scheduled_daily_stats():
     except Exception as e:
         logger.error(f"Scheduled daily stats saving failed: {str(e)}")
 
-if __name__ == "__main__":
-    # Load environment variables
-    load_dotenv()
+def start_scheduler():
+    """Scheduled jobs: adaptive vehicle refresh, trip processing and daily stats"""
+    global scheduler, polling_policy, adaptive_scheduler
 
-    # Initialize scheduler
     scheduler_timezone = os.getenv('UVO_TRACKER_TIMEZONE')
     if scheduler_timezone:
         scheduler = BackgroundScheduler(timezone=pytz_timezone(scheduler_timezone))
     else:
         scheduler = BackgroundScheduler()
-    refresh_interval = int(os.getenv('REFRESH_INTERVAL_MINUTES', '30'))
-    # Add scheduled jobs
-    scheduler.add_job(scheduled_refresh, 'interval', minutes=refresh_interval)
-    
     # Add trip processing job - every 2 hours during day
     scheduler.add_job(scheduled_trip_processing, 'cron', hour='8-22/2', minute=0)
-    
+
     # Add daily stats job - once per day at 23:30
     scheduler.add_job(scheduled_daily_stats, 'cron', hour=23, minute=30)
-    
+
     scheduler.start()
 
-    try:
+    # Vehicle refresh: the next run is planned from the vehicle state and the remaining API budget
+    polling_policy = PollingPolicy(
+        vehicle_client,
+        start_hour=int(os.getenv('REFRESH_START_HOUR', '6')),
+        end_hour=int(os.getenv('REFRESH_END_HOUR', '22')),
+        parked_interval=int(os.getenv('REFRESH_INTERVAL_MINUTES', '30')) * 60,
+        min_interval=int(os.getenv('MIN_REFRESH_INTERVAL_MINUTES', '5')) * 60,
+        timezone=scheduler.timezone,
+    )
+    adaptive_scheduler = AdaptiveScheduler(scheduler, adaptive_refresh)
+    adaptive_scheduler.start()
+
+def init_services():
+    """
+    Create what the endpoints share: the vehicle client, the snapshot and the job runner.
+    The scheduler is only started by the process holding the scheduler lock, so that it runs once
+    even when the app is served by several worker processes. Does nothing if already done.
+    """
+    global vehicle_client, vehicle_snapshot, job_runner, command_queue, event_broadcaster, scheduler_lock
+
+    with _services_lock:
+        if vehicle_client is not None:
+            return
+
+        # Load environment variables
+        load_dotenv()
+
         # Initialize vehicle client
-        vehicle_client = VehicleClient()
+        client = VehicleClient()
 
         while True:
             try:
-                vehicle_client.vm.check_and_refresh_token()
+                client.check_and_refresh_token()
                 break
             except RateLimitingError:
                 logger.error("Got rate limited. Will try again in 1 hour.")
                 time.sleep(60 * 60)
 
-        vehicle_client.vehicle = vehicle_client.vm.get_vehicle(os.environ["UVO_VEHICLE_UUID"])
+        client.vehicle = client.vm.get_vehicle(os.environ["UVO_VEHICLE_UUID"])
+        vehicle_client = client
+
+        # read when /metrics is scraped, nothing to record on the refresh path
+        Metrics.VEHICLE_SOC.set_function(vehicle_metric(lambda vehicle: vehicle.ev_battery_percentage))
+        Metrics.VEHICLE_RANGE.set_function(vehicle_metric(lambda vehicle: vehicle.ev_driving_range))
+        Metrics.VEHICLE_CHARGING_POWER.set_function(vehicle_metric(
+            lambda vehicle: vehicle_client.charging_power_in_kilowatts if vehicle.ev_battery_is_charging else 0))
+        if vehicle_client.request_budget is not None:
+            Metrics.API_BUDGET_USED.set_function(vehicle_client.request_budget.used)
+            Metrics.API_BUDGET_AVAILABLE.set_function(vehicle_client.request_budget.available)
+        if vehicle_client.db_client.spool is not None:
+            Metrics.DB_SPOOL_PENDING.set_function(vehicle_client.db_client.spool.pending_count)
+
+        # every saved vehicle state is pushed to the /events subscribers
+        # each subscriber holds a server thread: by default they get a quarter of them, the rest serve the requests
+        event_broadcaster = EventBroadcaster(
+            max_subscribers=int(os.getenv('EVENTS_MAX_SUBSCRIBERS', max(1, http_server_threads() // 4))))
+        vehicle_client.state_listeners.append(event_broadcaster.publish_state)
+
+        # /status and /battery are served from memory, refreshed in the background once older than the TTL.
+        # The scheduled refresh publishes to the snapshot, so by default the TTL is its interval: readers only
+        # trigger an upstream refresh when the scheduler has not run (outside the active hours, failed refresh)
+        vehicle_snapshot = VehicleSnapshot(
+            refresh_vehicle_snapshot,
+            build_vehicle_snapshot,
+            ttl=int(os.getenv('SNAPSHOT_TTL_SECONDS', int(os.getenv('REFRESH_INTERVAL_MINUTES', '30')) * 60)),
+            max_stale=int(os.getenv('SNAPSHOT_MAX_STALE_SECONDS', '3600')),
+        )
+        job_runner = JobRunner(max_workers=int(os.getenv('HTTP_JOB_WORKERS', '2')))
+        command_queue = CommandQueue(vehicle_client, timeout=int(os.getenv('COMMAND_TIMEOUT_SECONDS', '180')))
+        command_queue.add_listener(on_command_changed)
+        command_queue.start()
+
+        scheduler_lock = SchedulerLock(os.getenv('UVO_SCHEDULER_LOCK_PATH'))
+        if scheduler_lock.acquire():
+            start_scheduler()
+        else:
+            logger.info("Another process runs the scheduled jobs, not starting the scheduler")
+
+def shutdown_services():
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
+    if scheduler_lock is not None:
+        scheduler_lock.release()
+    if job_runner is not None:
+        job_runner.shutdown()
+    if command_queue is not None:
+        command_queue.stop()
+
+def create_app():
+    """
+    WSGI application factory, e.g.:
+    waitress-serve --call http_server:create_app
+    """
+    init_services()
+    return app
+
+def http_server_threads() -> int:
+    """Worker threads of the waitress server"""
+    return int(os.getenv('HTTP_SERVER_THREADS', '8'))
+
+def serve():
+    """Serve the app with waitress (HTTP_SERVER=waitress, the default) or Flask's development server"""
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', 5000))
+    if os.getenv('HTTP_SERVER', 'waitress').lower() == 'waitress':
+        try:
+            from waitress import serve as waitress_serve
+        except ImportError:
+            logger.warning("waitress is not installed, falling back to Flask's development server")
+        else:
+            waitress_serve(app, host=host, port=port,
+                           threads=http_server_threads(),
+                           connection_limit=int(os.getenv('HTTP_SERVER_CONNECTION_LIMIT', '100')),
+                           channel_timeout=int(os.getenv('HTTP_SERVER_CHANNEL_TIMEOUT', '120')),
+                           ident="kia-hyundai-tracker")
+            return
 
-        # Run Flask app
-        app.run(host='0.0.0.0',
-                port=int(os.getenv('PORT', 5000)),
-                debug=os.getenv('FLASK_DEBUG', 'false').lower() == 'true')
+    app.run(host=host,
+            port=port,
+            debug=os.getenv('FLASK_DEBUG', 'false').lower() == 'true',
+            use_reloader=False,
+            threaded=True)
+
+if __name__ == "__main__":
+    try:
+        init_services()
+        serve()
     except KeyboardInterrupt:
-        scheduler.shutdown()
+        pass
+    finally:
+        shutdown_services()
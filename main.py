@@ -8,7 +8,7 @@ def main():
 
     parser = argparse.ArgumentParser(description='Kia Hyundai Vehicle Tracker')
     parser.add_argument("--interval", type=int, help="Refresh interval in seconds")
-    parser.add_argument("--action", type=str, choices=['refresh', 'trips', 'daily_stats', 'all'], 
+    parser.add_argument("--action", type=str, choices=['refresh', 'trips', 'daily_stats', 'all', 'compact_raw_data'], 
                        default='refresh', help="Action to perform")
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
     
@@ -33,9 +33,9 @@ def main():
             
         elif args.action == 'trips':
             print("Processing and saving trip information...")
-            vehicle_client.vm.check_and_refresh_token()
+            vehicle_client.check_and_refresh_token()
             vehicle_client.vehicle = vehicle_client.vm.get_vehicle(os.environ["UVO_VEHICLE_UUID"])
-            vehicle_client.vm.update_all_vehicles_with_cached_state()
+            vehicle_client.update_cached_state()
             
             if vehicle_client.vehicle and hasattr(vehicle_client.vehicle, 'daily_stats') and vehicle_client.vehicle.daily_stats:
                 vehicle_client.process_trips()
@@ -45,9 +45,9 @@ def main():
                 
         elif args.action == 'daily_stats':
             print("Saving daily statistics...")
-            vehicle_client.vm.check_and_refresh_token()
+            vehicle_client.check_and_refresh_token()
             vehicle_client.vehicle = vehicle_client.vm.get_vehicle(os.environ["UVO_VEHICLE_UUID"])
-            vehicle_client.vm.update_all_vehicles_with_cached_state()
+            vehicle_client.update_cached_state()
             
             if vehicle_client.vehicle and hasattr(vehicle_client.vehicle, 'daily_stats') and vehicle_client.vehicle.daily_stats:
                 vehicle_client.db_client.save_daily_stats()
@@ -75,6 +75,11 @@ def main():
             except Exception as e:
                 print(f"Error saving log entry: {str(e)}")            
             print("Full refresh completed.")
+
+        elif args.action == 'compact_raw_data':
+            print("Compacting raw API data of older log entries...")
+            compacted = vehicle_client.db_client.compact_raw_api_data()
+            print(f"Raw API data of {compacted} log entries compacted.")
             
     except Exception as e:
         print(f"Error during {args.action}: {str(e)}")
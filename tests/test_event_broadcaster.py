@@ -0,0 +1,23 @@
+from EventBroadcaster import EventBroadcaster
+
+
+def test_subscribers_past_the_limit_are_refused():
+    broadcaster = EventBroadcaster(max_subscribers=2)
+    first, _ = broadcaster.subscribe()
+    second, _ = broadcaster.subscribe()
+
+    assert broadcaster.subscribe() == (None, None)
+    first.close()
+    third, _ = broadcaster.subscribe()
+    assert third is not None
+    assert broadcaster.stats()["subscribers"] == 2
+
+
+def test_subscribers_get_the_state_then_the_diffs():
+    broadcaster = EventBroadcaster()
+    broadcaster.publish_state({"battery": 80, "charging": False})
+    subscription, backlog = broadcaster.subscribe()
+    broadcaster.publish_state({"battery": 81, "charging": False})
+
+    assert backlog == [(1, "state", {"battery": 80, "charging": False})]
+    assert subscription.get(timeout=1) == (2, "diff", {"battery": 81})
@@ -0,0 +1,27 @@
+import pytest
+
+from fake_kia_api import VEHICLE_ID
+
+STATUS = "GET /api/v1/spa/vehicles/{id}/status"
+LOCATION = "GET /api/v1/spa/vehicles/{id}/location"
+
+
+def test_forced_refresh_fetches_the_location(vehicle_client, fake_api):
+    vehicle = vehicle_client.vm.get_vehicle(VEHICLE_ID)
+
+    vehicle_client.api.force_refresh_vehicle_state(vehicle_client.vm.token, vehicle)
+
+    assert fake_api.requests[STATUS] == 1
+    assert fake_api.requests[LOCATION] == 1
+    assert vehicle.location_latitude is not None
+
+
+def test_failed_forced_refresh_skips_the_location(vehicle_client, fake_api):
+    vehicle = vehicle_client.vm.get_vehicle(VEHICLE_ID)
+    fake_api.inject("vehicle_timeout", 1)
+
+    with pytest.raises(Exception):
+        vehicle_client.api.force_refresh_vehicle_state(vehicle_client.vm.token, vehicle)
+
+    assert fake_api.requests[STATUS] == 1
+    assert fake_api.requests[LOCATION] == 0
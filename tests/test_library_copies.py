@@ -0,0 +1,21 @@
+import hashlib
+import inspect
+
+from hyundai_kia_connect_api.ApiImplType1 import ApiImplType1
+
+# sha256 of the source of the ApiImplType1 methods copied into KiaUvoApiEU, as they were when copied
+COPIED_METHODS = {
+    "get_vehicles": "3d5137b7f0a6dc2014fd8ff4b542329ae7bccaefd86f9a9af471db71b82b0bc1",
+    "check_action_status": "e9ec348f8106f080371886e3cef10ff55d3da9ce9e1fdeb6ac244c956f6f20d0",
+    "start_charge": "d5661ea793d7a9bf86bd39af6f96f6c50ce7c9e4e95d875659d4be1f0347d9cc",
+    "stop_charge": "2f811cc338ccbf06a76ed942666ac6b7bf63b45d70bb55f61af601505f58dc6b",
+    "_get_control_token": "ae76594660fb8ae4eb905282a3f450039d1641b42d1b134accedefa2ee6fa0e4",
+}
+
+
+def test_copied_methods_are_unchanged_in_the_library():
+    # a method that changed in the library must be compared with its copy in KiaUvoApiEU (and AsyncKiaUvoApiEU),
+    # then its hash updated here
+    changed = [name for name, sha256 in COPIED_METHODS.items()
+               if hashlib.sha256(inspect.getsource(getattr(ApiImplType1, name)).encode()).hexdigest() != sha256]
+    assert changed == []
@@ -0,0 +1,82 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from custom_hyundai_kia_connect_api.KiaUvoApiEU import KiaUvoApiEU
+
+caller = contextvars.ContextVar("caller", default=None)
+
+
+@pytest.fixture(params=[4, 1], ids=["parallel", "sequential"])
+def api(request):
+    api = KiaUvoApiEU(region=1, brand=1, language="en", parallel_requests=request.param)
+    yield api
+    api.close()
+
+
+@pytest.fixture
+def parallel_api():
+    api = KiaUvoApiEU(region=1, brand=1, language="en", parallel_requests=4)
+    yield api
+    api.close()
+
+
+def slow(value, seconds: float):
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+
+def failing(exception, seconds: float = 0):
+    def call():
+        time.sleep(seconds)
+        raise exception
+    return call
+
+
+def test_results_are_in_call_order(api):
+    assert api._call_all(slow("first", 0.2), slow("second", 0), slow("third", 0.1)) == ["first", "second", "third"]
+
+
+def test_the_first_failed_call_is_raised(api):
+    # the second call fails before the first one: the error of the first one is raised anyway
+    with pytest.raises(ValueError, match="first"):
+        api._call_all(failing(ValueError("first"), 0.2), failing(KeyError("second")))
+
+
+def test_every_call_is_waited_for(parallel_api):
+    finished = threading.Event()
+
+    def last():
+        time.sleep(0.2)
+        finished.set()
+
+    with pytest.raises(ValueError):
+        parallel_api._call_all(failing(ValueError("first")), last)
+    assert finished.is_set()
+
+
+def test_sequential_calls_stop_at_the_first_failure():
+    api = KiaUvoApiEU(region=1, brand=1, language="en", parallel_requests=1)
+    made = []
+    with pytest.raises(ValueError):
+        api._call_all(failing(ValueError("first")), lambda: made.append("second"))
+    assert made == []
+    api.close()
+
+
+def test_calls_run_in_the_context_of_the_caller(api):
+    token = caller.set("refresh")
+    try:
+        assert api._call_all(caller.get, caller.get) == ["refresh", "refresh"]
+    finally:
+        caller.reset(token)
+
+
+def test_calls_run_at_the_same_time(parallel_api):
+    started = time.perf_counter()
+    parallel_api._call_all(slow(1, 0.3), slow(2, 0.3))
+    assert time.perf_counter() - started < 0.5
@@ -0,0 +1,38 @@
+import threading
+
+import RawPayload
+
+PAYLOAD = {"status": {"battery": 80}}
+
+
+def payload_ids(db_client):
+    with db_client.storage.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM raw_api_payloads")
+        return {row[0] for row in cur.fetchall()}
+
+
+def test_payload_id_of_another_transaction_is_not_reused(vehicle_client):
+    db_client = vehicle_client.db_client
+    sha256 = RawPayload.encode(PAYLOAD)[0]
+
+    # a transaction of another thread (compaction, spool flush) inserted the payload, and then rolled back
+    other = threading.Thread(target=lambda: setattr(db_client._raw_api_payloads, "last", (sha256, 999)))
+    other.start()
+    other.join()
+
+    payload_id = db_client.storage.write(lambda cur: db_client._save_raw_api_payload(cur, PAYLOAD))
+    assert payload_id != 999
+    assert payload_id in payload_ids(db_client)
+
+
+def test_unchanged_payload_is_stored_once_per_transaction(vehicle_client):
+    db_client = vehicle_client.db_client
+
+    def save_twice(cur):
+        db_client._raw_api_payloads.last = (None, None)
+        return db_client._save_raw_api_payload(cur, PAYLOAD), db_client._save_raw_api_payload(cur, PAYLOAD)
+
+    first, second = db_client.storage.write(save_twice)
+    assert first == second
+    assert payload_ids(db_client) == {first}
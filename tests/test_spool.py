@@ -0,0 +1,121 @@
+import json
+import os
+
+import pytest
+
+import Storage
+from Spool import Spool
+
+
+class Recorder:
+    """apply() of the spool: keeps the records it wrote, or fails like an unavailable database"""
+
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.records = []
+
+    def __call__(self, cur, records):
+        if not self.available:
+            raise ConnectionError("database unavailable")
+        self.records.extend(records)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage.SQLiteStorage(str(tmp_path / "tracker.db"))
+    storage.migrate()
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "spool.jsonl")
+
+
+def test_records_are_written_and_the_file_emptied(storage, path):
+    applied = Recorder()
+    spool = Spool(path, storage, applied, flush_delay=0)
+    spool.append("log", [{"odometer": 1}, {"odometer": 2}])
+
+    assert spool.flush(timeout=5)
+    spool.close()
+    assert [record["row"] for record in applied.records] == [{"odometer": 1}, {"odometer": 2}]
+    assert os.path.getsize(path) == 0
+
+
+def test_records_are_replayed_after_a_restart(storage, path):
+    spool = Spool(path, storage, Recorder(available=False), flush_delay=0)
+    spool.append("log", [{"odometer": 1}])
+    spool.append("trip", [{"distance": 2}])
+    spool.close(timeout=1)
+
+    applied = Recorder()
+    spool = Spool(path, storage, applied, flush_delay=0)
+    assert spool.flush(timeout=5)
+    spool.close()
+    assert [(record["seq"], record["kind"]) for record in applied.records] == [(1, "log"), (2, "trip")]
+    assert os.path.getsize(path) == 0
+
+
+def test_records_up_to_the_watermark_are_not_replayed(storage, path):
+    spool = Spool(path, storage, Recorder(), flush_delay=0)
+    spool.append("log", [{"odometer": 1}, {"odometer": 2}])
+    assert spool.flush(timeout=5)
+    spool.close()
+    # the process stopped after the transaction but before emptying the file
+    with open(path, "w") as f:
+        for seq in (1, 2):
+            f.write(json.dumps({"seq": seq, "kind": "log", "row": {"odometer": seq}}) + "\n")
+
+    applied = Recorder()
+    spool = Spool(path, storage, applied, flush_delay=0)
+    assert spool.pending() == []
+    spool.append("log", [{"odometer": 3}])
+    assert spool.flush(timeout=5)
+    spool.close()
+    assert [record["seq"] for record in applied.records] == [3]
+
+
+def test_an_incomplete_last_record_is_dropped(storage, path):
+    with open(path, "w") as f:
+        f.write(json.dumps({"seq": 1, "kind": "log", "row": {"odometer": 1}}) + "\n")
+        f.write('{"seq": 2, "kind": "log", "ro')
+
+    spool = Spool(path, storage, Recorder(available=False), flush_delay=0)
+    spool.close(timeout=1)
+    assert [record["seq"] for record in spool.pending()] == [1]
+    with open(path) as f:
+        assert f.read().endswith("}\n")
+
+
+def test_pending_records_are_as_a_replay_reads_them(storage, path):
+    spool = Spool(path, storage, Recorder(available=False), flush_delay=0)
+    spool.append("trip", [(1700000000, 12.5)])
+    spool.close(timeout=1)
+    live = spool.pending()
+
+    spool = Spool(path, storage, Recorder(available=False), flush_delay=0)
+    spool.close(timeout=1)
+    assert spool.pending() == live == [{"seq": 1, "kind": "trip", "row": [1700000000, 12.5]}]
+
+
+def test_a_spool_file_in_use_is_not_shared(storage, path):
+    first_applied, second_applied = Recorder(available=False), Recorder()
+    first = Spool(path, storage, first_applied, flush_delay=0)
+    first.append("log", [{"odometer": 1}])
+
+    # a second process starting with nothing pending must not empty the file of the first one
+    second = Spool(path, storage, second_applied, flush_delay=0)
+    assert (second.path, second.name) == (path + ".1", "db.1")
+    second.append("log", [{"odometer": 2}])
+    assert second.flush(timeout=5)
+    second.close()
+    assert [record["row"] for record in second_applied.records] == [{"odometer": 2}]
+
+    first.close(timeout=1)
+    applied = Recorder()
+    first = Spool(path, storage, applied, flush_delay=0)
+    assert first.flush(timeout=5)
+    first.close()
+    assert [(record["seq"], record["row"]) for record in applied.records] == [(1, {"odometer": 1})]
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+import Storage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage.SQLiteStorage(str(tmp_path / "tracker.db"))
+    storage.migrate()
+    yield storage
+    storage.close()
+
+
+def read(storage, sql, params=()):
+    with storage.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def test_sqlite_backend_has_to_be_asked_for(monkeypatch, tmp_path):
+    for name in ("UVO_DB_BACKEND", "UVO_DB_HOST", "UVO_DB_USER", "UVO_DB_NAME"):
+        monkeypatch.delenv(name, raising=False)
+    with pytest.raises(NameError, match="UVO_DB_NAME"):
+        Storage.create_storage()
+
+    monkeypatch.setenv("UVO_DB_BACKEND", "sqlite")
+    monkeypatch.setenv("UVO_DB_PATH", str(tmp_path / "tracker.db"))
+    storage = Storage.create_storage()
+    assert isinstance(storage, Storage.SQLiteStorage)
+    storage.close()
+
+
+def test_migrations_reach_the_last_version_once(storage):
+    versions = [version for version, _ in storage.get_migrations()]
+    assert versions == sorted(versions)
+    assert read(storage, "SELECT version FROM schema_version ORDER BY version") == [(version,) for version in versions]
+
+    storage.migrate()
+    assert read(storage, "SELECT COUNT(*) FROM schema_version") == [(len(versions),)]
+    assert len(versions) == len(os.listdir(Storage.SQLiteStorage.migrations_dir))
+
+
+def test_placeholders_are_translated_for_sqlite(storage):
+    assert Storage._qmark("SELECT * FROM trips WHERE unix_timestamp >= %s AND unix_timestamp < %s") == \
+        "SELECT * FROM trips WHERE unix_timestamp >= ? AND unix_timestamp < ?"
+    storage.write(lambda cur: cur.execute("INSERT INTO trip_sync_days(yyyymmdd, trip_count, unix_timestamp) "
+                                          "VALUES(%s, %s, %s)", ("20260105", 2, 1767571200)))
+    assert read(storage, "SELECT trip_count FROM trip_sync_days WHERE yyyymmdd = %s", ("20260105",)) == [(2,)]
+
+
+def test_upsert_updates_the_given_columns_only(storage):
+    columns = ("yyyymmdd", "trip_count", "unix_timestamp")
+    update_sql = storage.upsert_sql("trip_sync_days", columns, ("yyyymmdd",), update=("trip_count",))
+    keep_sql = storage.upsert_sql("trip_sync_days", columns, ("yyyymmdd",))
+
+    storage.write(lambda cur: cur.execute(update_sql, ("20260105", 2, 100)))
+    storage.write(lambda cur: cur.execute(update_sql, ("20260105", 3, 200)))
+    assert read(storage, "SELECT trip_count, unix_timestamp FROM trip_sync_days") == [(3, 100)]
+
+    def insert_existing(cur):
+        cur.execute(keep_sql, ("20260105", 4, 300))
+        return cur.rowcount
+    assert storage.write(insert_existing) == 0
+    assert read(storage, "SELECT trip_count, unix_timestamp FROM trip_sync_days") == [(3, 100)]
+
+
+def test_insert_or_get_id_returns_the_existing_row(storage):
+    columns = ("sha256", "encoding", "size_bytes", "payload", "unix_timestamp")
+
+    def insert(sha256):
+        return storage.write(lambda cur: storage.insert_or_get_id(
+            cur, "raw_api_payloads", columns, (sha256, "zlib", 3, b"abc", 100), "sha256"))
+
+    first_id, inserted = insert("a" * 64)
+    assert inserted
+    assert insert("a" * 64) == (first_id, False)
+    other_id, inserted = insert("b" * 64)
+    assert inserted and other_id != first_id
+
+
+def test_mysql_upserts():
+    storage = Storage.MySQLStorage("localhost", 3306, "user", "password", "database")
+    assert storage.upsert_sql("trip_sync_days", ("yyyymmdd", "trip_count"), ("yyyymmdd",), update=("trip_count",)) == \
+        "INSERT INTO trip_sync_days(yyyymmdd, trip_count) VALUES(%s, %s) " \
+        "ON DUPLICATE KEY UPDATE trip_count = VALUES(trip_count)"
+    # without columns to update the existing row is left untouched, and reports 0 affected rows
+    assert storage.upsert_sql("trip_sync_days", ("yyyymmdd", "trip_count"), ("yyyymmdd",)).endswith(
+        "ON DUPLICATE KEY UPDATE yyyymmdd = yyyymmdd")
@@ -0,0 +1,42 @@
+import datetime
+
+from hyundai_kia_connect_api.Token import Token
+from hyundai_kia_connect_api.exceptions import AuthenticationError
+
+from TokenStore import is_token_valid
+from fake_kia_api import VEHICLE_ID
+
+
+def test_is_token_valid_with_the_earliest_date():
+    token = Token(access_token="token", valid_until=datetime.datetime.min)
+    assert is_token_valid(token, 300) is False
+
+
+def test_is_token_valid_margin():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    token = Token(access_token="token", valid_until=now + datetime.timedelta(seconds=600))
+    assert is_token_valid(token, 300) is True
+    assert is_token_valid(token, 900) is False
+
+
+def test_expired_token_is_refreshed(vehicle_client, fake_api):
+    old_token = vehicle_client.vm.token
+    vehicle_client._token_refreshed_at = None
+
+    assert vehicle_client.handle_api_exception(AuthenticationError("Token is expired")) is True
+    assert vehicle_client.vm.token.access_token != old_token.access_token
+    assert is_token_valid(vehicle_client.vm.token, vehicle_client.TOKEN_REFRESH_MARGIN)
+    # the next check finds a valid token and makes no call
+    assert vehicle_client.check_and_refresh_token() is False
+
+
+def test_expired_token_answer_is_retried_after_a_refresh(vehicle_client, fake_api):
+    vehicle_client._token_refreshed_at = None
+    fake_api.inject("token_expired", 1)
+
+    vehicle = vehicle_client.vm.get_vehicle(VEHICLE_ID)
+    state = vehicle_client._retry_api_call(vehicle_client.api._get_cached_vehicle_state, vehicle_client.vm.token,
+                                           vehicle)
+
+    assert state is not None
+    assert fake_api.requests["POST /auth/api/v2/user/oauth2/token"] >= 1
@@ -0,0 +1,43 @@
+import datetime
+import logging
+
+from hyundai_kia_connect_api.Vehicle import DayTripCounts, TripInfo
+
+
+def test_month_distance_keeps_its_decimals(vehicle_client):
+    db_client = vehicle_client.db_client
+    db_client.save_trip_sync_month("202601", 3, 42.7, True, 12345.6, 1767225600)
+
+    synced_months, _ = db_client.get_trip_sync_state(["202601"])
+
+    assert synced_months["202601"]["distance"] == 42.7
+
+
+def test_days_are_skipped_only_when_synced_with_the_same_trip_count(vehicle_client):
+    db_client = vehicle_client.db_client
+    db_client.save_trip_sync_day("20260105", 2)
+
+    _, synced_days = db_client.get_trip_sync_state(["202601"])
+    synced = vehicle_client._day_trips_synced
+
+    assert synced(synced_days, DayTripCounts(yyyymmdd="20260105", trip_count=2))
+    assert not synced(synced_days, DayTripCounts(yyyymmdd="20260105", trip_count=3))
+    # a day never synced is fetched, even when the API reports no trip count to compare
+    assert not synced(synced_days, DayTripCounts(yyyymmdd="20260106", trip_count=None))
+
+
+def test_saved_trips_are_logged_once_each(vehicle_client, caplog):
+    db_client = vehicle_client.db_client
+    day = datetime.datetime(2026, 1, 5)
+    morning = TripInfo(hhmmss="081500", drive_time=20, idle_time=2, distance=12.5, avg_speed=40, max_speed=90)
+    evening = TripInfo(hhmmss="181500", drive_time=25, idle_time=3, distance=13.0, avg_speed=35, max_speed=80)
+
+    with caplog.at_level(logging.INFO):
+        db_client.save_trips([(day, morning)])
+        # the morning trip again is a duplicate the unique key ignores: only the evening one is logged
+        db_client.save_trips([(day, morning), (day, evening)])
+        if db_client.spool:
+            assert db_client.spool.flush(timeout=5)
+
+    assert [record.getMessage() for record in caplog.records if "Saved new trip" in record.getMessage()] == \
+        ["Saved new trip for 2026-01-05", "Saved new trip for 2026-01-05"]